@@ -0,0 +1,43 @@
+import argparse
+import os
+import tempfile
+import timeit
+
+import Crypto.PublicKey.RSA
+
+from edenred import ciphers
+from edenred.publickey import PublicKey
+
+
+def create_key_file(bits):
+    key = Crypto.PublicKey.RSA.generate(bits).publickey()
+    descriptor, path = tempfile.mkstemp(suffix='.pem', prefix='bench-')
+    with os.fdopen(descriptor, 'wb') as key_file:
+        key_file.write(key.exportKey('PEM'))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Card field encryptions per second for each RSA backend")
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--bits', type=int, default=2048)
+    args = parser.parse_args(argv)
+
+    path = create_key_file(args.bits)
+    try:
+        print("{:<16} {:>12} {:>10}".format('backend', 'encrypts/s', 'us/op'))
+        for backend in ciphers.BACKENDS:
+            if not backend.available():
+                print("{:<16} {:>12}".format(backend.name, 'missing'))
+                continue
+            key = PublicKey(path, backend=backend.name)
+            elapsed = min(timeit.repeat(lambda: key.encrypt('4111111111111111'), number=args.count, repeat=3))
+            print("{:<16} {:>12.0f} {:>10.1f}".format(
+                backend.name, args.count / elapsed, elapsed / args.count * 1000000
+            ))
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
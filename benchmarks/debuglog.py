@@ -0,0 +1,61 @@
+import argparse
+import logging
+import timeit
+
+from edenred import provider as provider_module
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey
+from edenred.transport import Transport
+
+RESPONSE = {
+    'Success': True,
+    'ErrorList': [],
+    'Pay': {'AuthorizeIdentifier': '123456789', 'Amount': 1990, 'CardToken': 'a' * 32, 'Description': 'order'},
+}
+
+
+class ConstantTransport(Transport):
+    def post(self, url, headers, payload):
+        return dict(RESPONSE, Pay=dict(RESPONSE['Pay']))
+
+
+class FormattingHandler(logging.Handler):
+    # formats every record like a real handler would, then drops it
+    def emit(self, record):
+        self.format(record)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cost of debug logging per request at different sample rates")
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    logger = provider_module.logger
+    logger.propagate = False
+    logger.addHandler(FormattingHandler())
+    debug_log = provider_module.debug_log
+    api_provider = APIProvider(
+        client_id='bench', client_secret='bench', base_url='http://edenred', public_key=StubPublicKey(),
+        access_token='token', transport=ConstantTransport()
+    )
+
+    def pay():
+        api_provider.pay('a' * 32, 1990, 'order')
+
+    def run(level, sample_rate):
+        logger.setLevel(level)
+        debug_log.sample_rate = sample_rate
+        return min(timeit.repeat(pay, number=args.count, repeat=3)) / args.count * 1000000
+
+    baseline = run(logging.INFO, 1.0)
+    print("{:<24} {:>10} {:>10}".format('logging', 'us/call', 'overhead'))
+    print("{:<24} {:>10.2f} {:>10}".format('debug off', baseline, '-'))
+    for sample_rate in (0.0, 0.001, 0.01, 0.1, 1.0):
+        elapsed = run(logging.DEBUG, sample_rate)
+        print("{:<24} {:>10.2f} {:>9.2f}%".format(
+            'debug, sample {}'.format(sample_rate), elapsed, (elapsed - baseline) / baseline * 100
+        ))
+
+
+if __name__ == '__main__':
+    main()
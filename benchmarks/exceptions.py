@@ -0,0 +1,73 @@
+import argparse
+import gc
+import json
+import tracemalloc
+
+import requests
+
+from edenred.exceptions import APIError, TransactionErrors
+
+BODY = json.dumps({
+    'Success': False,
+    'ErrorList': [
+        {'Code': 'ER104', 'Message': 'Tarjeta bloqueada'},
+        {'Code': 'ER101', 'Message': 'Saldo insuficiente'},
+    ],
+    'Authorize': None,
+}).encode('utf-8')
+
+
+class LegacyAPIError(Exception):
+    def __init__(self, response, description):
+        super(LegacyAPIError, self).__init__(response.status_code, description)
+        self.response = response
+        self.description = description
+
+
+class LegacyTransactionErrors(Exception):
+    def __init__(self, response, errors):
+        message = sorted(errors, key=lambda error: error['Code'])[0]['Message']
+        super(LegacyTransactionErrors, self).__init__(message, *[error['Code'] for error in errors])
+        self.errors = errors
+        self.response = response
+
+
+def create_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = 'Service Unavailable'
+    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    response._content = BODY
+    return response
+
+
+def measure(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    retained = [factory() for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory retained by exceptions during an error storm")
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    cases = [
+        ('APIError (legacy)', lambda: LegacyAPIError(create_response(503), 'Service Unavailable')),
+        ('APIError', lambda: APIError.create_from_response(create_response(503))),
+        ('TransactionErrors (legacy)', lambda: LegacyTransactionErrors(
+            json.loads(BODY), json.loads(BODY)['ErrorList'])),
+        ('TransactionErrors', lambda: TransactionErrors.create(json.loads(BODY)['ErrorList'])),
+    ]
+    print("{:<28} {:>12} {:>14}".format('exception', 'bytes/error', 'MiB retained'))
+    for name, factory in cases:
+        size = measure(factory, args.count)
+        print("{:<28} {:>12.0f} {:>14.1f}".format(name, float(size) / args.count, size / 1024.0 / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
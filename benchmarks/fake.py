@@ -0,0 +1,24 @@
+import argparse
+import time
+
+from edenred.fake import FakeAPIProvider
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Operations per second of the in-memory FakeAPIProvider")
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    provider = FakeAPIProvider()
+    provider.add_card('card')
+    started = time.perf_counter()
+    for _ in range(args.number):
+        identifier = provider.authorize('card', 100, 'bench').authorize_identifier
+        provider.capture('card', identifier, 100, 'bench')
+        provider.refund('card', identifier, 100, 'bench')
+    elapsed = time.perf_counter() - started
+    print("{:.0f} operations/s".format(args.number * 3 / elapsed))
+
+
+if __name__ == '__main__':
+    main()
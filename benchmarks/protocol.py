@@ -0,0 +1,31 @@
+import argparse
+import timeit
+
+from edenred import protocol
+
+RESPONSE = protocol.encode({
+    'Success': True, 'ErrorList': [],
+    'Authorize': {'CardToken': 'card', 'Amount': 100, 'Description': 'bench', 'AuthorizeIdentifier': '1'}
+})
+
+
+def build():
+    return protocol.authorize('card', 100, 'bench').encode()
+
+
+def parse():
+    return protocol.authorize('card', 100, 'bench').parse(RESPONSE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cost of the I/O-free protocol layer per authorize call")
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    for name, function in (('build+encode', build), ('decode+parse', parse)):
+        elapsed = min(timeit.repeat(function, number=args.number, repeat=3))
+        print("{:<14} {:>8.3f} us/call".format(name, elapsed / args.number * 1000000))
+
+
+if __name__ == '__main__':
+    main()
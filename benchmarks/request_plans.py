@@ -0,0 +1,53 @@
+import argparse
+import timeit
+
+from edenred.provider import APIProvider
+
+
+class NullTransport(object):
+    def post(self, url, headers, payload):
+        return {'Success': True, 'Authorize': {'AuthorizeIdentifier': '1'}}
+
+
+class LegacyAPIProvider(APIProvider):
+    # per-call URL formatting and header dict, as before precompiled endpoints
+    def request_resource(self, resource, action, payload, renew_on_unauthorized=True):
+        response = self.do_request(
+            url=self.get_endpoint_url(resource=resource, action=action, base_url=self.base_url),
+            headers=self._get_headers(),
+            payload=payload,
+            transport=self.transport
+        )
+        self.validate_response(response)
+        return response
+
+    def _get_headers(self):
+        return {
+            'Content-Type': self.CONTENT_TYPE,
+            'authorization': self.access_token
+        }
+
+
+def create(cls):
+    return cls(
+        client_id='bench', client_secret='bench', base_url='https://edenred.example.com/api', public_key=None,
+        access_token='token', transport=NullTransport()
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-call overhead of provider.authorize without I/O")
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    for name, cls in (('legacy', LegacyAPIProvider), ('precompiled', APIProvider)):
+        provider = create(cls)
+        elapsed = min(timeit.repeat(
+            lambda: provider.authorize(card_token='card', amount=100, description='bench'),
+            number=args.number, repeat=3
+        ))
+        print("{:<12} {:>8.3f} us/call".format(name, elapsed / args.number * 1000000))
+
+
+if __name__ == '__main__':
+    main()
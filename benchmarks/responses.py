@@ -0,0 +1,49 @@
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+
+from edenred import protocol
+
+BODY = json.dumps({
+    'Success': True,
+    'ErrorList': [],
+    'Authorize': {'AuthorizeIdentifier': '123456789', 'Amount': 1990},
+}).encode('utf-8')
+
+
+def parse_dict():
+    return json.loads(BODY.decode('utf-8'))['Authorize']
+
+
+def parse_record():
+    return protocol.authorize('card', 1990, 'bench').parse(BODY)
+
+
+def measure(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    retained = [factory() for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory retained and parse time of Authorize results")
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    print("{:<10} {:>14} {:>14}".format('result', 'bytes/result', 'us/parse'))
+    for name, factory in (('dict', parse_dict), ('record', parse_record)):
+        size = measure(factory, args.count)
+        elapsed = min(timeit.repeat(factory, number=args.count, repeat=3))
+        print("{:<10} {:>14.0f} {:>14.3f}".format(
+            name, float(size) / args.count, elapsed / args.count * 1000000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+from concurrent import futures
+
+from edenred.client import Edenred
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey, StubServer
+from edenred.transport import HTTP2Transport, RequestsTransport, Urllib3Transport
+
+
+def create_transports(pool_size):
+    # (name, factory, whether the stub must speak HTTP/2)
+    transports = [
+        ('requests', lambda: RequestsTransport(), False),
+        ('requests-pooled', lambda: RequestsTransport.create_pooled(pool_size=pool_size), False),
+        ('urllib3', lambda: Urllib3Transport(pool_size=pool_size), False),
+    ]
+    try:
+        import h2  # noqa
+        import httpx  # noqa
+    except ImportError:
+        print("httpx[http2] is not installed, skipping HTTP2Transport")
+    else:
+        # against an h2c stub, so requests are multiplexed over one connection rather than falling back
+        # to HTTP/1.1
+        transports.append(('http2', lambda: HTTP2Transport(prior_knowledge=True), True))
+    return transports
+
+
+def run(base_url, transport, requests, concurrency):
+    provider = APIProvider(
+        client_id='bench', client_secret='bench', base_url=base_url, public_key=StubPublicKey(),
+        transport=transport
+    )
+    card = Edenred(provider).retrieve_card('card-bench')
+    card.authorize('1.00', 'warmup')
+
+    started = time.time()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda i: card.authorize('1.00', 'bench'), range(requests)))
+    return time.time() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare transports against the local stub server")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--pool-size', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    transports = create_transports(args.pool_size)
+    print("{:<16} {:>10} {:>12} {:>12}".format('transport', 'req/s', 'mean ms', 'connections'))
+    for name, factory, http2 in transports:
+        with StubServer(latency=args.latency, http2=http2) as stub:
+            transport = factory()
+            try:
+                elapsed = run(stub.url, transport, args.requests, args.concurrency)
+            finally:
+                transport.close()
+        print("{:<16} {:>10.0f} {:>12.3f} {:>12}".format(
+            name, args.requests / elapsed, elapsed * 1000.0 * args.concurrency / args.requests,
+            stub.connections
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import logging
+import os
+import threading
+
+from concurrent import futures
+
+logger = logging.getLogger(__name__)
+
+
+def read_records(path, format=None):
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    if format == 'csv':
+        with io.open(path, 'r', newline='', encoding='utf-8') as records_file:
+            for record in csv.DictReader(records_file):
+                yield record
+    elif format in ('jsonl', 'json', 'ndjson'):
+        with io.open(path, 'r', encoding='utf-8') as records_file:
+            for line in records_file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        raise ValueError("Unsupported records format: {}".format(format))
+
+
+class IndexSet(object):
+    # one bit per record index, a few MiB for tens of millions of records
+    def __init__(self):
+        self._bits = bytearray()
+
+    def add(self, index):
+        byte = index >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytearray(byte - len(self._bits) + 1))
+        self._bits[byte] |= 1 << (index & 7)
+
+    def __contains__(self, index):
+        byte = index >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (index & 7)))
+
+
+def load_completed(path, key, completed=None, value=None):
+    # the keys found in a results file, or a dict of key -> value when value names a field
+    if completed is None:
+        completed = set() if value is None else {}
+    if not os.path.exists(path):
+        return completed
+    with io.open(path, 'r', encoding='utf-8') as results_file:
+        for line in results_file:
+            try:
+                result = json.loads(line)
+                if value is None:
+                    completed.add(result[key])
+                else:
+                    completed[result[key]] = result[value]
+            except (ValueError, KeyError, TypeError):
+                # a run killed mid-write leaves a truncated last line
+                continue
+    return completed
+
+
+class ResultWriter(object):
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = io.open(path, 'a+b')
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() > 0:
+            self._file.seek(-1, os.SEEK_END)
+            if self._file.read(1) != b'\n':
+                self._file.write(b'\n')
+
+    def write(self, result):
+        line = json.dumps(result, sort_keys=True).encode('utf-8') + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BoundedExecutor(object):
+    def __init__(self, threads, window):
+        self._executor = futures.ThreadPoolExecutor(max_workers=threads)
+        self._slots = threading.BoundedSemaphore(window)
+
+    def submit(self, function, *args):
+        # blocks once window calls are queued or running
+        self._slots.acquire()
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        self._slots.release()
+        if future.exception() is not None:
+            logger.error("Bulk operation failed", exc_info=future.exception())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,234 @@
+import argparse
+import collections
+import gzip
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+from concurrent import futures
+
+from .exceptions import APIError, InvalidResponse
+from .loadtest import LoadStats, format_summary
+from .provider import APIProvider
+from .redaction import Redactor
+from .stubserver import StubPublicKey
+from .transport import Transport, TransportResponse
+
+# endpoints as recorded, named like the load test operations
+OPERATIONS = {
+    'PaymentMethod/Create': 'register',
+    'Payment/Authorize': 'authorize',
+    'Payment/Capture': 'capture',
+    'Payment/Pay': 'pay',
+    'Payment/Refund': 'refund',
+}
+
+
+def endpoint(url):
+    segments = url.rstrip('/').split('/')
+    if segments[-1] == 'Login':
+        return 'Login'
+    if segments[-1] == 'Refund':
+        # Payment/<payment identifier>/Refund
+        return '{}/Refund'.format(segments[-3])
+    return '/'.join(segments[-2:])
+
+
+def read_cassette(path):
+    if path.endswith('.gz'):
+        cassette = io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8')
+    else:
+        cassette = io.open(path, 'r', encoding='utf-8')
+    with cassette:
+        return [json.loads(line) for line in cassette if line.strip()]
+
+
+class RecordingTransport(Transport):
+    # Wraps another transport and appends every exchange to a JSON lines cassette. Lines are written
+    # every chunk_size exchanges and on close(), each chunk as its own gzip member when the path ends
+    # in .gz, with single appends so forked workers can keep recording to the same file. Headers are
+    # never written.
+    def __init__(self, transport, path, redactor=None, chunk_size=256, clock=time.monotonic):
+        self.transport = transport
+        self.path = path
+        self.redactor = redactor or Redactor()
+        self.chunk_size = chunk_size
+        self.recorded = 0
+        self._clock = clock
+        self._started = clock()
+        self._compress = path.endswith('.gz')
+        self._pending = []
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o600)
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(self.transport, 'timeout', None)
+
+    def post(self, url, headers, payload):
+        started = self._clock()
+        entry = {
+            'at': round(started - self._started, 6),
+            'endpoint': endpoint(url),
+            'request': self.redactor.redact(payload),
+        }
+        try:
+            response = self.transport.post(url=url, headers=headers, payload=payload)
+        except APIError as error:
+            entry.update(status=error.status_code, reason=error.description)
+            self._record(entry, started)
+            raise
+        entry.update(status=200, response=self.redactor.redact(response))
+        self._record(entry, started)
+        return response
+
+    def _record(self, entry, started):
+        entry['elapsed'] = round(self._clock() - started, 6)
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True)
+        with self._lock:
+            self._pending.append(line + '\n')
+            self.recorded += 1
+            if len(self._pending) >= self.chunk_size:
+                self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        data = ''.join(self._pending).encode('utf-8')
+        self._pending = []
+        os.write(self._fd, gzip.compress(data) if self._compress else data)
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._write_pending()
+                os.close(self._fd)
+                self._fd = None
+        self.transport.close()
+
+    def reset_after_fork(self):
+        # lines still pending are the parent's to write
+        self._lock = threading.Lock()
+        self._pending = []
+        self.transport.reset_after_fork()
+
+
+class ReplayTransport(Transport):
+    # Answers each endpoint with its recorded responses in order. With latency=True every answer
+    # takes as long as it did when recorded, divided by speed; loop=True starts over when an
+    # endpoint runs out instead of failing.
+    def __init__(self, entries, latency=False, speed=1.0, loop=False):
+        self.latency = latency
+        self.speed = speed
+        self.loop = loop
+        self._recorded = collections.defaultdict(list)
+        for entry in entries:
+            # responses are served as bodies, so replays pay for serializing and decoding like real traffic
+            body = self.encode(entry['response']) if entry.get('response') is not None else None
+            self._recorded[entry['endpoint']].append((entry, body))
+        self._positions = collections.Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(read_cassette(path), **kwargs)
+
+    def post(self, url, headers, payload):
+        self.encode(payload)
+        entry, body = self._next(endpoint(url))
+        if self.latency and entry.get('elapsed'):
+            time.sleep(entry['elapsed'] / self.speed)
+        if body is None:
+            raise APIError.create_from_response(TransportResponse(entry['status'], entry.get('reason')))
+        return self.decode(body)
+
+    def _next(self, name):
+        with self._lock:
+            recorded = self._recorded.get(name)
+            if not recorded:
+                raise InvalidResponse("No recorded response for {}".format(name))
+            position = self._positions[name]
+            if position >= len(recorded):
+                if not self.loop:
+                    raise InvalidResponse("Recorded responses for {} exhausted".format(name))
+                position = 0
+            self._positions[name] = position + 1
+            return recorded[position]
+
+
+class Replayer(object):
+    # Sends the recorded requests through an APIProvider, either back to back or at their recorded
+    # offsets from the start of the cassette.
+    def __init__(self, provider, entries):
+        self.provider = provider
+        # a 403 is answered again on replay, and the request retried after it stands for the call
+        self.entries = [
+            entry for entry in entries if entry['endpoint'] in OPERATIONS and entry.get('status') != 403
+        ]
+        self.stats = LoadStats()
+
+    def send(self, entry):
+        resource, action = entry['endpoint'].split('/')
+        if action == 'Refund':
+            resource = '{}/{}'.format(resource, entry['request']['Pay']['PayIdentifier'])
+        started = time.perf_counter()
+        error = None
+        try:
+            self.provider.request_resource(resource=resource, action=action, payload=entry['request'])
+        except Exception as exception:
+            error = exception
+        self.stats.record(OPERATIONS[entry['endpoint']], time.perf_counter() - started, error)
+
+    def run(self, timing='fast', speed=1.0, concurrency=1):
+        self.stats.started = time.time()
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            if timing == 'recorded':
+                started = time.monotonic()
+                first = self.entries[0]['at'] if self.entries else 0.0
+                for entry in self.entries:
+                    delay = (entry['at'] - first) / speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                    executor.submit(self.send, entry)
+            else:
+                list(executor.map(self.send, self.entries))
+        self.stats.finished = time.time()
+        return self.stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a cassette recorded with RecordingTransport through the client, with no network"
+    )
+    parser.add_argument('cassette')
+    parser.add_argument('--timing', choices=('fast', 'recorded'), default='fast',
+                        help="fast: back to back with no latency; recorded: original arrival times and latencies")
+    parser.add_argument('--speed', type=float, default=1.0, help="time compression for --timing recorded")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help="replay the cassette this many times (fast timing)")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    entries = read_cassette(args.cassette)
+    transport = ReplayTransport(entries, latency=args.timing == 'recorded', speed=args.speed, loop=args.repeat > 1)
+    # a Login is only replayed when the recording has a 403 that needed one
+    provider = APIProvider(
+        client_id='replay', client_secret='replay', base_url='replay://edenred', public_key=StubPublicKey(),
+        access_token='replay', transport=transport
+    )
+    replayer = Replayer(provider, entries * args.repeat if args.timing == 'fast' else entries)
+    stats = replayer.run(timing=args.timing, speed=args.speed, concurrency=args.concurrency)
+    summary = stats.summary(token_renewals=provider.token_renewals)
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import importlib
+
+
+class Cipher(object):
+    # RSA PKCS#1 v1.5 encryption with a public key; every backend returns the raw ciphertext, so
+    # PublicKey sends the same base64 wire format whichever one is used
+    name = None
+    module = None
+
+    def __init__(self, pem):
+        raise NotImplementedError
+
+    @classmethod
+    def available(cls):
+        try:
+            importlib.import_module(cls.module)
+        except ImportError:
+            return False
+        return True
+
+    @property
+    def public_numbers(self):
+        raise NotImplementedError
+
+    def encrypt(self, data):
+        raise NotImplementedError
+
+
+class CryptographyCipher(Cipher):
+    # OpenSSL through the cryptography package
+    name = 'cryptography'
+    module = 'cryptography.hazmat.primitives.asymmetric.padding'
+
+    def __init__(self, pem):
+        from cryptography.hazmat.primitives.asymmetric import padding
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+        self.key = load_pem_public_key(pem)
+        self._padding = padding.PKCS1v15()
+
+    @property
+    def public_numbers(self):
+        numbers = self.key.public_numbers()
+        return numbers.n, numbers.e
+
+    def encrypt(self, data):
+        return self.key.encrypt(data, self._padding)
+
+
+class PyCryptoCipher(Cipher):
+    # pycrypto, or pycryptodome installed under the same Crypto package
+    name = 'pycrypto'
+    package = 'Crypto'
+    module = 'Crypto.Cipher.PKCS1_v1_5'
+
+    def __init__(self, pem):
+        rsa = importlib.import_module(self.package + '.PublicKey.RSA')
+        pkcs1_v1_5 = importlib.import_module(self.package + '.Cipher.PKCS1_v1_5')
+        self.key = rsa.importKey(pem)
+        self._cipher = pkcs1_v1_5.new(self.key)
+
+    @property
+    def public_numbers(self):
+        return self.key.n, self.key.e
+
+    def encrypt(self, data):
+        return self._cipher.encrypt(data)
+
+
+class CryptodomeCipher(PyCryptoCipher):
+    # pycryptodomex, which installs alongside pycrypto
+    name = 'pycryptodomex'
+    package = 'Cryptodome'
+    module = 'Cryptodome.Cipher.PKCS1_v1_5'
+
+
+# fastest first
+BACKENDS = (CryptographyCipher, CryptodomeCipher, PyCryptoCipher)
+
+
+def available_backends():
+    return [backend for backend in BACKENDS if backend.available()]
+
+
+def get_backend(name=None):
+    if name is None:
+        backends = available_backends()
+        if not backends:
+            raise ImportError("No RSA backend installed, install cryptography or pycryptodome")
+        return backends[0]
+    for backend in BACKENDS:
+        if backend.name == name:
+            if not backend.available():
+                raise ImportError("RSA backend {} is not installed".format(name))
+            return backend
+    raise ValueError("Unknown RSA backend {}, expected one of {}".format(
+        name, ', '.join(backend.name for backend in BACKENDS)
+    ))
@@ -1,7 +1,10 @@
 
 import os
 import decimal
+import functools
 
+from . import validation
+from .profiling import Profiler
 from .provider import APIProvider
 from .publickey import PublicKey
 
@@ -14,6 +17,10 @@ def cents_to_decimal(amount):
     return decimal.Decimal(amount) / 100
 
 
+def validates(api_provider):
+    return getattr(api_provider, 'validate', True)
+
+
 class Edenred(object):
     def __init__(self, api_provider):
         self.api_provider = api_provider
@@ -25,7 +32,11 @@ class Edenred(object):
         public_key_path = os.environ['EDENREDPAYMENTS_PUBLIC_KEY']
         base_url = os.environ['EDENREDPAYMENTS_URL']
         testing = bool(os.getenv('EDENREDPAYMENTS_TESTING'))
-        return cls.create_client(client_id, client_secret, public_key_path, base_url, testing)
+        client = cls.create_client(client_id, client_secret, public_key_path, base_url, testing)
+        profiler = Profiler.create_from_env()
+        if profiler is not None:
+            client.api_provider.profiler = profiler
+        return client
 
     @classmethod
     def create_client(cls, client_id, client_secret, public_key_path, base_url, testing=False):
@@ -39,6 +50,8 @@ class Edenred(object):
         return cls(api_provider)
 
     def register_card(self, card_number, cvv, expiration_month, expiration_year, username, user_id):
+        if validates(self.api_provider):
+            validation.check_card(card_number, expiration_month, expiration_year)
         response = self.api_provider.create_payment_method(
             card_number=card_number,
             cvv=cvv,
@@ -52,6 +65,13 @@ class Edenred(object):
     def retrieve_card(self, card_token):
         return Card(card_token, self.api_provider)
 
+    def enable_profiling(self, directory, sample_rate=1.0, max_files=100):
+        self.api_provider.profiler = Profiler(directory, sample_rate=sample_rate, max_files=max_files)
+        return self.api_provider.profiler
+
+    def disable_profiling(self):
+        self.api_provider.profiler = None
+
     def __eq__(self, other):
         return self.api_provider == other.api_provider
 
@@ -67,40 +87,51 @@ class Card(object):
         self.card_token = card_token
 
     def retrieve_authorization(self, charge_id):
-        return Authorization(charge_id, self.card_token, self.api_provider)
+        return Authorization(charge_id, self, self.api_provider)
 
-    def authorize(self, amount, description):
+    def retrieve_charge(self, charge_id):
+        return Charge(charge_id, self, self.api_provider)
 
-        response = self.api_provider.authorize(
-            card_token=self.card_token,
-            amount=amount_in_cents(amount),
-            description=description
-        )
-        return Authorization(response['AuthorizeIdentifier'], self, self.api_provider)
+    def authorize(self, amount, description):
+        amount = amount_in_cents(amount)
+        if validates(self.api_provider):
+            validation.check_amount(amount)
+        response = self._call(self.api_provider.authorize, amount=amount, description=description)
+        return Authorization(response['AuthorizeIdentifier'], self, self.api_provider, amount=amount)
 
     def capture(self, amount, description):
-        response = self.api_provider.pay(
-            card_token=self.card_token,
-            amount=amount_in_cents(amount),
-            description=description
-        )
+        amount = amount_in_cents(amount)
+        if validates(self.api_provider):
+            validation.check_amount(amount)
+        response = self._call(self.api_provider.pay, amount=amount, description=description)
         return Charge(response['AuthorizeIdentifier'], self, self.api_provider)
 
+    def _call(self, function, **kwargs):
+        negative_cache = getattr(self.api_provider, 'negative_cache', None)
+        if negative_cache is None:
+            return function(card_token=self.card_token, **kwargs)
+        return negative_cache.call(self.card_token, functools.partial(function, card_token=self.card_token), **kwargs)
+
     def __eq__(self, other):
         return self.api_provider == other.api_provider and self.card_token == other.card_token
 
 
 class Authorization(object):
-    def __init__(self, charge_id, card, api_provider):
+    # amount is the authorized amount in cents, when known
+    def __init__(self, charge_id, card, api_provider, amount=None):
         self.api_provider = api_provider
         self.charge_id = charge_id
         self.card = card
+        self.amount = amount
 
     def capture(self, amount, description):
+        amount = amount_in_cents(amount)
+        if validates(self.api_provider):
+            validation.check_capture(amount, self.amount)
         response = self.api_provider.capture(
             card_token=self.card.card_token,
             authorize_identifier=self.charge_id,
-            amount=amount_in_cents(amount),
+            amount=amount,
             description=description
         )
         return Charge(response['AuthorizeIdentifier'], self.card, self.api_provider)
@@ -118,12 +149,19 @@ class Charge(object):
         self.card = card
 
     def refund(self, amount, description):
+        amount = amount_in_cents(amount)
+        if validates(self.api_provider):
+            validation.check_amount(amount)
         response = self.api_provider.refund(
             card_token=self.card.card_token,
             payment_identifier=self.charge_id,
-            amount=amount_in_cents(amount),
+            amount=amount,
             description=description
         )
+        negative_cache = getattr(self.api_provider, 'negative_cache', None)
+        if negative_cache is not None:
+            # the refunded balance may be enough for the payment that failed
+            negative_cache.forget(self.card.card_token)
         return Refund(self, cents_to_decimal(response['Amount']), self.api_provider)
 
     def __eq__(self, other):
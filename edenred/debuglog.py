@@ -0,0 +1,55 @@
+import json
+import logging
+import os
+import random
+
+from .redaction import Redactor
+
+
+class Redacted(object):
+    # a payload that is only redacted and serialized if a handler formats the record
+    __slots__ = ('value', 'redactor')
+
+    def __init__(self, value, redactor):
+        self.value = value
+        self.redactor = redactor
+
+    def to_dict(self):
+        return self.redactor.redact(self.value)
+
+    def __str__(self):
+        return json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'), default=str)
+
+
+class DebugLog(object):
+    # Debug records for Edenred exchanges. One call in sample_rate is logged, request and response
+    # together; card data and secrets are redacted and card tokens replaced by pseudonyms. Records carry
+    # edenred_event, edenred_url and edenred_payload attributes for structured formatters.
+    def __init__(self, logger, sample_rate=1.0, redactor=None, random=random.random):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.redactor = redactor or Redactor()
+        self._random = random
+
+    @classmethod
+    def create_from_env(cls, logger):
+        return cls(logger, sample_rate=float(os.getenv('EDENREDPAYMENTS_DEBUG_SAMPLE_RATE', 1.0)))
+
+    def sample(self):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return False
+        return self.sample_rate >= 1 or self._random() < self.sample_rate
+
+    def request(self, url, payload):
+        self._log('request', url, payload)
+
+    def response(self, url, response):
+        self._log('response', url, response)
+
+    def _log(self, event, url, payload):
+        payload = Redacted(payload, self.redactor)
+        self.logger.debug("Edenred %s %s %s", event, url, payload, extra={
+            'edenred_event': event, 'edenred_url': url, 'edenred_payload': payload,
+        })
@@ -0,0 +1,266 @@
+import collections
+import logging
+import threading
+import time
+
+from concurrent import futures
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Dispatcher(object):
+    def __init__(self, max_in_flight=8, max_queued=64, submit_timeout=None):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be a positive integer")
+        self.max_in_flight = max_in_flight
+        self.submit_timeout = submit_timeout
+        self.in_flight = 0
+        self._queue = self._create_queue(max_queued)
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._workers = []
+        for index in range(max_in_flight):
+            worker = threading.Thread(target=self._work, name='edenred-dispatcher-{}'.format(index))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _create_queue(self, max_queued):
+        return queue.Queue(maxsize=max_queued)
+
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
+    def submit(self, function, *args, **kwargs):
+        return self._enqueue((futures.Future(), function, args, kwargs))
+
+    def _enqueue(self, item, **put_kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit calls after shutdown")
+        # blocks the producer while the queue is full
+        self._queue.put(item, timeout=self.submit_timeout, **put_kwargs)
+        future = item[0]
+        if self._shutdown:
+            # shutdown started while this call was being queued, possibly behind the sentinels where no
+            # worker will reach it; a worker that already took it skips it once cancelled
+            future.cancel()
+        return future
+
+    def authorize(self, card, amount, description):
+        return self.submit(card.authorize, amount, description)
+
+    def capture(self, card, amount, description):
+        return self.submit(card.capture, amount, description)
+
+    def capture_authorization(self, authorization, amount, description):
+        return self.submit(authorization.capture, amount, description)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+        # queued calls are drained before the workers see the sentinel; calls queued after it cancel
+        # themselves in _enqueue, so their futures resolve even when shutdown does not wait
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+            self._cancel_stragglers()
+
+    def _cancel_stragglers(self):
+        # calls that raced with shutdown and landed behind the sentinels
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item[0].cancel()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self.in_flight += 1
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=True)
+
+
+PAYMENT = 'payment'
+REFUND = 'refund'
+REGISTRATION = 'registration'
+
+
+class QueueStats(object):
+    __slots__ = ('count', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.count if self.count else 0.0
+
+    def record(self, wait):
+        self.count += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    def __repr__(self):  # pragma: no cover
+        return 'QueueStats(count={}, mean_wait={:.6f}, max_wait={:.6f})'.format(
+            self.count, self.mean_wait, self.max_wait
+        )
+
+
+class _WeightedQueue(object):
+    # One bounded deque per priority class, served by stride scheduling: while every class has work,
+    # each gets dispatch slots in proportion to its weight, and an idle class cannot bank slots for later.
+    def __init__(self, weights, maxsize, clock=time.monotonic):
+        self._queues = {name: collections.deque() for name in weights}
+        self._strides = {name: 1.0 / weight for name, weight in weights.items()}
+        self._passes = {name: 0.0 for name in weights}
+        self._virtual_time = 0.0
+        self._maxsize = maxsize
+        self._clock = clock
+        self._stops = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = {name: threading.Condition(self._lock) for name in weights}
+        self.stats = {name: QueueStats() for name in weights}
+
+    def qsize(self, priority=None):
+        with self._lock:
+            if priority is not None:
+                return len(self._queues[priority])
+            return sum(len(pending) for pending in self._queues.values())
+
+    def put(self, item, timeout=None, priority=None):
+        with self._lock:
+            if item is _STOP:
+                self._stops += 1
+                self._not_empty.notify()
+                return
+            pending = self._queues[priority]
+            if self._maxsize > 0:
+                deadline = None if timeout is None else self._clock() + timeout
+                while len(pending) >= self._maxsize:
+                    remaining = None if deadline is None else deadline - self._clock()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Full
+                    self._not_full[priority].wait(remaining)
+            if not pending:
+                self._passes[priority] = max(self._passes[priority], self._virtual_time)
+            pending.append((self._clock(), item))
+            self._not_empty.notify()
+
+    def get(self, block=True):
+        with self._lock:
+            while True:
+                ready = [name for name, pending in self._queues.items() if pending]
+                if ready:
+                    break
+                if self._stops:
+                    # sentinels only come out once every class is drained
+                    self._stops -= 1
+                    return _STOP
+                if not block:
+                    raise queue.Empty
+                self._not_empty.wait()
+            # lowest virtual finish time first, so a heavy class goes ahead of a light one that just woke up
+            name = min(ready, key=lambda name: self._passes[name] + self._strides[name])
+            self._virtual_time = self._passes[name]
+            self._passes[name] += self._strides[name]
+            enqueued, item = self._queues[name].popleft()
+            self.stats[name].record(self._clock() - enqueued)
+            self._not_full[name].notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class PriorityDispatcher(Dispatcher):
+    # Payments go ahead of refunds and card registrations; the weights keep the background classes
+    # moving at a fraction of the payment rate while payments are backlogged.
+    DEFAULT_WEIGHTS = {PAYMENT: 16, REFUND: 2, REGISTRATION: 1}
+
+    def __init__(self, max_in_flight=8, max_queued=64, submit_timeout=None, weights=None,
+                 default_priority=REGISTRATION):
+        self.weights = dict(weights or self.DEFAULT_WEIGHTS)
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError("weights must be positive")
+        if default_priority not in self.weights:
+            raise ValueError("Unknown priority class: {}".format(default_priority))
+        self.default_priority = default_priority
+        super(PriorityDispatcher, self).__init__(
+            max_in_flight=max_in_flight, max_queued=max_queued, submit_timeout=submit_timeout
+        )
+
+    def _create_queue(self, max_queued):
+        # max_queued bounds each class, so a registration backlog never blocks payment producers
+        return _WeightedQueue(self.weights, max_queued)
+
+    @property
+    def queue_stats(self):
+        return self._queue.stats
+
+    def queued_for(self, priority):
+        return self._queue.qsize(priority)
+
+    def submit(self, function, *args, **kwargs):
+        return self.submit_to(self.default_priority, function, *args, **kwargs)
+
+    def submit_to(self, priority, function, *args, **kwargs):
+        if priority not in self.weights:
+            raise ValueError("Unknown priority class: {}".format(priority))
+        return self._enqueue((futures.Future(), function, args, kwargs), priority=priority)
+
+    def authorize(self, card, amount, description):
+        return self.submit_to(PAYMENT, card.authorize, amount, description)
+
+    def capture(self, card, amount, description):
+        return self.submit_to(PAYMENT, card.capture, amount, description)
+
+    def capture_authorization(self, authorization, amount, description):
+        return self.submit_to(PAYMENT, authorization.capture, amount, description)
+
+    def refund(self, charge, amount, description):
+        return self.submit_to(REFUND, charge.refund, amount, description)
+
+    def register_card(self, client, card_number, cvv, expiration_month, expiration_year, username, user_id):
+        return self.submit_to(
+            REGISTRATION, client.register_card, card_number, cvv, expiration_month, expiration_year, username,
+            user_id
+        )
@@ -1,46 +1,124 @@
 # encoding=UTF-8
 from __future__ import unicode_literals
 
+import collections
+
+# all that is kept of an HTTP response, for code reading error.response.status_code
+ResponseStatus = collections.namedtuple('ResponseStatus', ['status_code', 'reason'])
+
 
 class APIError(Exception):
 
-    def __init__(self, response, description):
-        super(APIError, self).__init__(response.status_code, description)
-        self.response = response
+    def __init__(self, status_code, description):
+        if status_code is not None and not isinstance(status_code, int):
+            # APIError(response, description), the signature from when the response was kept; only its
+            # status code is stored now
+            status_code = status_code.status_code
+        super(APIError, self).__init__(status_code, description)
+        self.status_code = status_code
         self.description = description
 
     @property
-    def status_code(self):
-        return self.response.status_code
+    def response(self):
+        return ResponseStatus(self.status_code, self.description)
 
     @staticmethod
     def create_from_http_error(error):
-        if error.response.status_code == 403:
-            return Unauthorized(error.response)
-        if error.response.status_code == 401:
-            return InvalidCredentials(error.response)
-        return APIError(error.response, error.response.reason)
+        return APIError.create_from_response(error.response)
+
+    @staticmethod
+    def create_from_response(response):
+        if response.status_code == 403:
+            return Unauthorized()
+        if response.status_code == 401:
+            return InvalidCredentials()
+        return APIError(response.status_code, response.reason)
 
 
 class InvalidCredentials(APIError):
-    def __init__(self, response):
-        super(InvalidCredentials, self).__init__(response, "Invalid Credentials")
+    def __init__(self, status_code=401):
+        super(InvalidCredentials, self).__init__(status_code, "Invalid Credentials")
 
 
 class Unauthorized(APIError):
-    def __init__(self, response):
-        super(Unauthorized, self).__init__(response, "Unauthorized")
+    def __init__(self, status_code=403):
+        super(Unauthorized, self).__init__(status_code, "Unauthorized")
+
+
+class InvalidResponse(APIError):
+    def __init__(self, description="Invalid Response", status_code=None):
+        super(InvalidResponse, self).__init__(status_code, description)
 
 
 class TransactionErrors(Exception):
+    UNKNOWN_ERROR_MESSAGE = "Error desconocido"
+
+    error_classes = {}
+
+    def __init__(self, errors, response=None):
+        if isinstance(response, (list, tuple)):
+            # TransactionErrors(response, errors), the signature from when the response was kept
+            errors = response
+        self._errors = tuple((error['Code'], error.get('Message')) for error in errors)
+        self._message = None
+        super(TransactionErrors, self).__init__(*self.codes)
+
+    @property
+    def args(self):
+        # (message, *codes) as before, with the message still computed on first use
+        return (self.message,) + self.codes
+
+    @property
+    def codes(self):
+        return tuple(code for code, _ in self._errors)
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self._primary_message(self._errors)
+        return self._message
 
-    def __init__(self, response, errors):
-        error_message = self.extract_error_message(errors)
-        super(TransactionErrors, self).__init__(error_message, *[error['Code'] for error in errors])
-        self.errors = errors
-        self.response = response
+    @property
+    def errors(self):
+        return [{'Code': code, 'Message': message} for code, message in self._errors]
+
+    @property
+    def response(self):
+        # rebuilt from the errors, the response itself is not kept
+        return {'Success': False, 'ErrorList': self.errors}
+
+    def __str__(self):
+        return self.message
+
+    def __reduce__(self):
+        return self.__class__, (self.errors,)
+
+    @classmethod
+    def primary_code(cls, codes):
+        # the code that picks both the subclass and the message: the lowest registered code, else the lowest
+        registered = [code for code in codes if code in TransactionErrors.error_classes]
+        return min(registered or codes) if codes else None
+
+    @classmethod
+    def _primary_message(cls, errors):
+        code = cls.primary_code([code for code, _ in errors])
+        if code is None:
+            return cls.UNKNOWN_ERROR_MESSAGE
+        return next(message for error_code, message in errors if error_code == code)
+
+    @classmethod
+    def register(cls, *codes):
+        def decorator(error_class):
+            for code in codes:
+                TransactionErrors.error_classes[code] = error_class
+            return error_class
+        return decorator
+
+    @classmethod
+    def create(cls, errors):
+        error_class = cls.error_classes.get(cls.primary_code([error['Code'] for error in errors]))
+        return (error_class or cls)(errors)
 
     @classmethod
     def extract_error_message(cls, errors):
-        sorted_errors = sorted(errors, key=lambda error: error['Code'])
-        return sorted_errors[0]['Message'] if len(sorted_errors) > 0 else "Error desconocido"
+        return cls._primary_message([(error['Code'], error.get('Message')) for error in errors])
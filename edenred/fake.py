@@ -0,0 +1,238 @@
+# encoding=UTF-8
+import collections
+import itertools
+import random
+import threading
+import time
+
+from .exceptions import APIError, TransactionErrors
+from .provider import APIProvider
+
+# Edenred does not publish its error codes, so the fake raises its own
+CARD_NOT_FOUND = 'FAKE01'
+INSUFFICIENT_BALANCE = 'FAKE02'
+AUTHORIZATION_NOT_FOUND = 'FAKE03'
+ALREADY_CAPTURED = 'FAKE04'
+CAPTURE_EXCEEDS_AUTHORIZED = 'FAKE05'
+PAYMENT_NOT_FOUND = 'FAKE06'
+REFUND_EXCEEDS_PAID = 'FAKE07'
+INVALID_AMOUNT = 'FAKE08'
+
+
+class _Authorization(object):
+    __slots__ = ('card_token', 'amount', 'captured')
+
+    def __init__(self, card_token, amount):
+        self.card_token = card_token
+        self.amount = amount
+        self.captured = None
+
+
+class _Payment(object):
+    __slots__ = ('card_token', 'amount', 'refunded')
+
+    def __init__(self, card_token, amount):
+        self.card_token = card_token
+        self.amount = amount
+        self.refunded = 0
+
+
+class FakeAPIProvider(APIProvider):
+    # APIProvider with the Edenred state kept in memory: request_resource answers locally instead of going
+    # through a transport, so tracing, profiling, the limiter and the negative cache behave as they do with
+    # the real provider. Amounts are in cents, as APIProvider receives them. A card balance of None means
+    # unlimited. Results carry only the typed fields, not the request fields Edenred echoes back. Without
+    # a public key, card fields are sent unencrypted.
+    ERROR_MESSAGES = {
+        CARD_NOT_FOUND: "Tarjeta no encontrada",
+        INSUFFICIENT_BALANCE: "Saldo insuficiente",
+        AUTHORIZATION_NOT_FOUND: "Autorización no encontrada",
+        ALREADY_CAPTURED: "Autorización ya capturada",
+        CAPTURE_EXCEEDS_AUTHORIZED: "Monto mayor al autorizado",
+        PAYMENT_NOT_FOUND: "Pago no encontrado",
+        REFUND_EXCEEDS_PAID: "Monto mayor al pagado",
+        INVALID_AMOUNT: "Monto inválido",
+    }
+    # (resource, action) to the method answering it; refunds go to Payment/<identifier>
+    HANDLERS = {
+        ('PaymentMethod', 'Create'): '_create_payment_method',
+        ('Payment', 'Authorize'): '_authorize',
+        ('Payment', 'Pay'): '_pay',
+        ('Payment', 'Capture'): '_capture',
+        ('Payment', 'Refund'): '_refund',
+    }
+
+    def __init__(self, client_id='fake', client_secret='fake', base_url='fake://edenred', public_key=None,
+                 balance=None, token_ttl=None, failure_rate=0.0, failure=None, seed=None, clock=time.monotonic,
+                 validate=True, access_token=None, profiler=None, tracer=None, limiter=None, negative_cache=None):
+        super(FakeAPIProvider, self).__init__(
+            client_id, client_secret, base_url, public_key, access_token=access_token, profiler=profiler,
+            tracer=tracer, limiter=limiter, validate=validate, negative_cache=negative_cache
+        )
+        self.default_balance = balance
+        self.token_ttl = token_ttl
+        self.failure_rate = failure_rate
+        self.failure = failure or (lambda: APIError(503, 'Service Unavailable'))
+        self.clock = clock
+        self.cards = {}
+        self.authorizations = {}
+        self.payments = {}
+        self._token_issued = clock() if access_token is not None else None
+        self._random = random.Random(seed)
+        self._identifiers = itertools.count(1)
+        self._scheduled_failures = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def add_card(self, card_token, balance=None):
+        with self._lock:
+            self.cards[card_token] = balance if balance is not None else self.default_balance
+
+    def balance(self, card_token):
+        return self.cards[card_token]
+
+    def fail_next(self, operation, error, count=1):
+        # operation is the APIProvider method name, e.g. 'authorize', or None for any operation
+        with self._lock:
+            self._scheduled_failures[operation].extend([error] * count)
+
+    def expire_tokens(self):
+        with self._lock:
+            self.access_token = None
+
+    def update_token(self, stale_token=None):
+        with self._lock:
+            self._renew_token()
+
+    def reset_after_fork(self):
+        super(FakeAPIProvider, self).reset_after_fork()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encrypt_card(public_key, card_number, cvv, expiration_month, expiration_year):
+        if public_key is not None:
+            return APIProvider.encrypt_card(public_key, card_number, cvv, expiration_month, expiration_year)
+        return {
+            'card_number': card_number,
+            'cvv': cvv,
+            'expiration_month': expiration_month,
+            'expiration_year': expiration_year,
+        }
+
+    def request_resource(self, resource, action, payload, renew_on_unauthorized=True):
+        # the body Edenred would answer with; errors are raised as validate_response would raise them
+        if action == 'Refund' and resource.startswith('Payment/'):
+            resource = 'Payment'
+        handler = self.HANDLERS.get((resource, action))
+        if handler is None:
+            raise APIError(404, 'Not Found')
+        if self.limiter is None:
+            return getattr(self, handler)(payload)
+        with self.limiter.slot():
+            return getattr(self, handler)(payload)
+
+    def _create_payment_method(self, payload):
+        with self._lock:
+            self._begin('create_payment_method')
+            card_token = 'fake-card-{}'.format(next(self._identifiers))
+            self.cards[card_token] = self.default_balance
+        return {'Success': True, 'PaymentMethod': {'CardToken': card_token}}
+
+    def _authorize(self, payload):
+        request = payload['Authorize']
+        card_token, amount = request['CardToken'], request['Amount']
+        with self._lock:
+            self._begin('authorize')
+            self._debit(card_token, amount)
+            identifier = str(next(self._identifiers))
+            self.authorizations[identifier] = _Authorization(card_token, amount)
+        return {'Success': True, 'Authorize': {'AuthorizeIdentifier': identifier, 'Amount': amount}}
+
+    def _pay(self, payload):
+        request = payload['Pay']
+        card_token, amount = request['CardToken'], request['Amount']
+        with self._lock:
+            self._begin('pay')
+            self._debit(card_token, amount)
+            identifier = str(next(self._identifiers))
+            self.payments[identifier] = _Payment(card_token, amount)
+        return {'Success': True, 'Pay': {'AuthorizeIdentifier': identifier, 'Amount': amount}}
+
+    def _capture(self, payload):
+        request = payload['Capture']
+        card_token, amount = request['CardToken'], request['Amount']
+        authorize_identifier = request['AuthorizeIdentifier']
+        with self._lock:
+            self._begin('capture')
+            self._check_amount(amount)
+            authorization = self.authorizations.get(authorize_identifier)
+            if authorization is None or authorization.card_token != card_token:
+                self._error(AUTHORIZATION_NOT_FOUND)
+            if authorization.captured is not None:
+                self._error(ALREADY_CAPTURED)
+            if amount > authorization.amount:
+                self._error(CAPTURE_EXCEEDS_AUTHORIZED)
+            authorization.captured = amount
+            # a capture below the authorized amount releases the rest of the hold
+            self._credit(card_token, authorization.amount - amount)
+            self.payments[authorize_identifier] = _Payment(card_token, amount)
+        return {'Success': True, 'Capture': {'AuthorizeIdentifier': authorize_identifier, 'Amount': amount}}
+
+    def _refund(self, payload):
+        request = payload['Pay']
+        card_token, amount = request['CardToken'], request['Amount']
+        payment_identifier = request['PayIdentifier']
+        with self._lock:
+            self._begin('refund')
+            self._check_amount(amount)
+            payment = self.payments.get(payment_identifier)
+            if payment is None or payment.card_token != card_token:
+                self._error(PAYMENT_NOT_FOUND)
+            if payment.refunded + amount > payment.amount:
+                self._error(REFUND_EXCEEDS_PAID)
+            payment.refunded += amount
+            self._credit(card_token, amount)
+        return {'Success': True, 'Pay': {'PayIdentifier': payment_identifier, 'Amount': amount}}
+
+    def _begin(self, operation):
+        if self.access_token is None or (
+                self.token_ttl is not None and self.clock() - self._token_issued > self.token_ttl):
+            # what APIProvider does on a 403: log in again and carry on
+            self._renew_token()
+        for key in (operation, None):
+            scheduled = self._scheduled_failures.get(key)
+            if scheduled:
+                raise scheduled.popleft()
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise self.failure()
+
+    def _renew_token(self):
+        self.token_renewals += 1
+        self.access_token = 'fake-token-{}'.format(self.token_renewals)
+        self._token_issued = self.clock()
+
+    def _debit(self, card_token, amount):
+        self._check_amount(amount)
+        if card_token not in self.cards:
+            self._error(CARD_NOT_FOUND)
+        balance = self.cards[card_token]
+        if balance is not None:
+            if amount > balance:
+                self._error(INSUFFICIENT_BALANCE)
+            self.cards[card_token] = balance - amount
+
+    def _credit(self, card_token, amount):
+        balance = self.cards.get(card_token)
+        if balance is not None:
+            self.cards[card_token] = balance + amount
+
+    def _check_amount(self, amount):
+        if amount <= 0:
+            self._error(INVALID_AMOUNT)
+
+    def _error(self, code):
+        raise TransactionErrors.create([{'Code': code, 'Message': self.ERROR_MESSAGES[code]}])
+
+    def __repr__(self):  # pragma: no cover
+        return 'FakeAPIProvider({} cards, {} authorizations, {} payments)'.format(
+            len(self.cards), len(self.authorizations), len(self.payments)
+        )
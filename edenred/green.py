@@ -0,0 +1,54 @@
+import logging
+
+import gevent.lock
+import gevent.monkey
+import gevent.queue
+import urllib3
+
+from .provider import APIProvider
+from .transport import Urllib3Transport, _TracedHTTPConnectionPool, _TracedHTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class _GreenHTTPConnectionPool(_TracedHTTPConnectionPool):
+    QueueCls = gevent.queue.LifoQueue
+
+
+class _GreenHTTPSConnectionPool(_TracedHTTPSConnectionPool):
+    QueueCls = gevent.queue.LifoQueue
+
+
+def is_cooperative():
+    # without a patched socket every request blocks the hub, and with it every other greenlet
+    return gevent.monkey.is_module_patched('socket')
+
+
+class GreenTransport(Urllib3Transport):
+    # Urllib3Transport for gevent workers: connections are handed out through gevent queues, so greenlets
+    # beyond pool_size wait cooperatively for a free connection instead of opening more sockets
+    def __init__(self, pool_manager=None, pool_size=50, timeout=None, num_pools=10):
+        if not is_cooperative():
+            logger.warning("GreenTransport used without gevent.monkey.patch_all(): requests will block the hub")
+        if pool_manager is None:
+            pool_manager = urllib3.PoolManager(num_pools=num_pools, maxsize=pool_size, block=True)
+            pool_manager.pool_classes_by_scheme = {
+                'http': _GreenHTTPConnectionPool,
+                'https': _GreenHTTPSConnectionPool,
+            }
+        super(GreenTransport, self).__init__(pool_manager=pool_manager, timeout=timeout, num_pools=num_pools)
+
+
+class GreenAPIProvider(APIProvider):
+    # APIProvider for gevent workers. The single-flight token lock is a gevent semaphore, so greenlets
+    # waiting for a Login yield to the hub even when the provider was built before monkey-patching, and
+    # requests go through a GreenTransport unless another transport is given. gevent only: eventlet
+    # workers need the plain APIProvider, imported after eventlet.monkey_patch().
+    def __init__(self, *args, **kwargs):
+        if kwargs.get('transport') is None:
+            kwargs['transport'] = GreenTransport()
+        super(GreenAPIProvider, self).__init__(*args, **kwargs)
+
+    @staticmethod
+    def _create_lock():
+        return gevent.lock.Semaphore()
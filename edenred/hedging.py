@@ -0,0 +1,108 @@
+import collections
+import logging
+import threading
+import time
+
+from concurrent import futures
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeStats(object):
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @property
+    def hedge_rate(self):
+        return float(self.hedged) / self.calls if self.calls else 0.0
+
+    @property
+    def win_rate(self):
+        return float(self.hedge_wins) / self.hedged if self.hedged else 0.0
+
+    def __repr__(self):  # pragma: no cover
+        return "HedgeStats(calls={calls}, hedged={hedged}, hedge_wins={hedge_wins})".format(**vars(self))
+
+
+class Hedger(object):
+    # Sends a second copy of a call that is slower than the given percentile of recent calls. Latency is
+    # measured from the first send until the call returns or fails, so a hedge that wins cannot pull the
+    # delay below what the primary already took. Losers run until they return: use a transport with a
+    # timeout, or hung calls hold the max_workers threads and every later call waits behind them.
+    def __init__(self, percentile=0.95, initial_delay=0.5, min_delay=0.01, window=100, executor=None,
+                 max_workers=4):
+        if not 0 < percentile <= 1:
+            raise ValueError("percentile must be in (0, 1]")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.stats = HedgeStats()
+        self._latencies = collections.deque(maxlen=window)
+        self._owns_executor = executor is None
+        self._executor = executor or futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return self.initial_delay
+        return max(self.min_delay, percentile(latencies, self.percentile))
+
+    def call(self, function, *args, **kwargs):
+        started = time.time()
+        try:
+            return self._call(function, args, kwargs)
+        finally:
+            with self._lock:
+                self._latencies.append(time.time() - started)
+
+    def _call(self, function, args, kwargs):
+        delay = self.delay
+        primary = self._executor.submit(function, *args, **kwargs)
+        done, _ = futures.wait([primary], timeout=delay)
+        if done:
+            self._record(hedged=False, won=False)
+            return primary.result()
+
+        logger.debug("Hedging call after %.3fs", delay)
+        hedge = self._executor.submit(function, *args, **kwargs)
+        pending = {primary, hedge}
+        winner = None
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            successful = [future for future in done if future.exception() is None]
+            if successful:
+                winner = primary if primary in successful else hedge
+                break
+        for future in pending:
+            future.cancel()
+
+        self._record(hedged=True, won=winner is hedge)
+        if winner is None:
+            return primary.result()
+        return winner.result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def reset_after_fork(self):
+        # the parent's worker threads do not exist in the child, but the executor still counts them
+        # as idle and would queue calls that nothing runs
+        self._lock = threading.Lock()
+        if self._owns_executor:
+            self._executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _record(self, hedged, won):
+        with self._lock:
+            self.stats.calls += 1
+            if hedged:
+                self.stats.hedged += 1
+            if won:
+                self.stats.hedge_wins += 1
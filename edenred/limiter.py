@@ -0,0 +1,108 @@
+import contextlib
+import logging
+import threading
+import time
+
+from .exceptions import APIError, TransactionErrors
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter(object):
+    # AIMD on the number of requests in flight: while latency stays within latency_tolerance times the
+    # no-load latency and at least half the limit is in use, each request adds 1/limit to it, and the
+    # limit is multiplied by backoff when latency climbs or Edenred answers 5xx or the connection fails.
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=128, latency_tolerance=2.0, backoff=0.7,
+                 baseline_drift=0.01, clock=time.monotonic):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.baseline_drift = baseline_drift
+        self.in_flight = 0
+        self.baseline = None
+        self.increases = 0
+        self.decreases = 0
+        self._limit = float(initial_limit)
+        self._clock = clock
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @contextlib.contextmanager
+    def slot(self):
+        started = self.acquire()
+        error = None
+        try:
+            yield
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.release(started, self._clock() - started, overloaded=self.is_overload(error))
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self._clock()
+
+    def release(self, started, latency, overloaded=False):
+        with self._condition:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            if not overloaded:
+                self._update_baseline(latency)
+            if overloaded or latency > self.baseline * self.latency_tolerance:
+                self._decrease(started)
+            elif in_flight * 2 >= self._limit:
+                # a mostly idle limit says nothing about whether more concurrency would help
+                self._increase()
+            self._condition.notify()
+
+    def reset_after_fork(self):
+        # requests in flight in the parent never complete in the child; the learned limit still applies
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def is_overload(error):
+        if error is None or isinstance(error, TransactionErrors):
+            return False
+        if isinstance(error, APIError):
+            return error.status_code is None or error.status_code >= 500
+        return True
+
+    def _update_baseline(self, latency):
+        # the lowest latency seen, drifting up slowly so a permanently slower Edenred becomes the new normal
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * self.baseline_drift
+
+    def _increase(self):
+        limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+        if int(limit) > int(self._limit):
+            self.increases += 1
+            logger.debug("Concurrency limit raised to %d", int(limit))
+            self._condition.notify()
+        self._limit = limit
+
+    def _decrease(self, started):
+        # requests that were already in flight at the last cut reflect the old limit
+        if self._last_decrease is not None and started < self._last_decrease:
+            return
+        self._last_decrease = self._clock()
+        limit = max(self.min_limit, self._limit * self.backoff)
+        if int(limit) < int(self._limit):
+            self.decreases += 1
+            logger.debug("Concurrency limit lowered to %d", int(limit))
+        self._limit = limit
@@ -0,0 +1,279 @@
+import argparse
+import collections
+import json
+import random
+import sys
+import threading
+import time
+
+from concurrent import futures
+
+from .client import Edenred
+from .exceptions import APIError, TransactionErrors
+from .fake import FakeAPIProvider
+from .provider import APIProvider
+from .ratelimit import RateLimiter
+from .stats import percentile
+from .stubserver import StubPublicKey, StubServer
+from .transport import HTTP2Transport, RequestsTransport, Urllib3Transport
+
+OPERATIONS = ('register', 'authorize', 'capture', 'pay', 'refund')
+DEFAULT_MIX = 'register=1,authorize=4,capture=3,pay=2,refund=1'
+PERCENTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('p999', 0.999))
+TRANSPORTS = {
+    'requests': RequestsTransport.create_pooled,
+    'urllib3': Urllib3Transport,
+    'http2': HTTP2Transport,
+}
+
+
+def parse_mix(mix):
+    weights = collections.OrderedDict()
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError("Unknown operation: {}".format(name))
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("The operation mix needs at least one positive weight")
+    return weights
+
+
+def error_key(error):
+    if isinstance(error, TransactionErrors):
+        return ','.join(error.codes) or 'TransactionErrors'
+    if isinstance(error, APIError):
+        return 'HTTP {}'.format(error.status_code)
+    return type(error).__name__
+
+
+class LoadStats(object):
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.defaultdict(collections.Counter)
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, operation, latency, error=None):
+        with self._lock:
+            self.latencies[operation].append(latency)
+            if error is not None:
+                self.errors[operation][error_key(error)] += 1
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def summary(self, token_renewals=0):
+        operations = collections.OrderedDict()
+        total = 0
+        for operation in OPERATIONS:
+            latencies = sorted(self.latencies.get(operation, ()))
+            if not latencies:
+                continue
+            total += len(latencies)
+            entry = collections.OrderedDict()
+            entry['count'] = len(latencies)
+            entry['throughput'] = len(latencies) / self.elapsed
+            for name, fraction in PERCENTILES:
+                entry[name] = percentile(latencies, fraction)
+            entry['errors'] = dict(self.errors.get(operation, {}))
+            operations[operation] = entry
+        return {
+            'elapsed': self.elapsed,
+            'operations': total,
+            'throughput': total / self.elapsed if self.elapsed else 0.0,
+            'token_renewals': token_renewals,
+            'by_operation': operations,
+        }
+
+
+class LoadGenerator(object):
+    MAX_POOL = 10000
+
+    def __init__(self, client, mix=DEFAULT_MIX, amount='1.00', seed=None):
+        self.client = client
+        self.weights = parse_mix(mix) if not isinstance(mix, dict) else mix
+        self.amount = amount
+        self.stats = LoadStats()
+        self._random = random.Random(seed)
+        self._cards = []
+        self._authorizations = collections.deque(maxlen=self.MAX_POOL)
+        self._charges = collections.deque(maxlen=self.MAX_POOL)
+        self._lock = threading.Lock()
+
+    def choose(self):
+        with self._lock:
+            return self._random.choices(list(self.weights), weights=list(self.weights.values()))[0]
+
+    def run_once(self, operation=None):
+        operation = operation or self.choose()
+        started = time.perf_counter()
+        error = None
+        try:
+            getattr(self, '_' + operation)()
+        except Exception as exception:
+            error = exception
+        self.stats.record(operation, time.perf_counter() - started, error)
+
+    def run_concurrency(self, concurrency, duration=None, operations=None):
+        deadline, remaining = self._start(duration, operations)
+
+        def worker():
+            while self._proceed(deadline, remaining):
+                self.run_once()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats.finished = time.time()
+        return self.stats
+
+    def run_rate(self, rate, duration=None, operations=None, max_concurrency=64):
+        deadline, remaining = self._start(duration, operations)
+        limiter = RateLimiter(rate)
+        slots = threading.BoundedSemaphore(max_concurrency)
+
+        def run():
+            try:
+                self.run_once()
+            finally:
+                slots.release()
+        with futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while self._proceed(deadline, remaining):
+                limiter.acquire()
+                slots.acquire()
+                executor.submit(run)
+        self.stats.finished = time.time()
+        return self.stats
+
+    def _start(self, duration, operations):
+        if duration is None and operations is None:
+            raise ValueError("Either duration or operations is required")
+        self._seed_card()
+        self.stats.started = time.time()
+        deadline = time.time() + duration if duration is not None else None
+        remaining = [operations] if operations is not None else None
+        return deadline, remaining
+
+    def _proceed(self, deadline, remaining):
+        if deadline is not None and time.time() >= deadline:
+            return False
+        if remaining is not None:
+            with self._lock:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return True
+
+    def _seed_card(self):
+        if not self._cards:
+            self._register()
+
+    def _card(self):
+        self._seed_card()
+        with self._lock:
+            return self._random.choice(self._cards)
+
+    def _register(self):
+        card = self.client.register_card(
+            '4111111111111111', '123', '12', '2099', 'loadtest', str(self._random.randint(1, 10 ** 9))
+        )
+        with self._lock:
+            if len(self._cards) < self.MAX_POOL:
+                self._cards.append(card)
+
+    def _authorize(self):
+        self._authorizations.append(self._card().authorize(self.amount, 'loadtest'))
+
+    def _capture(self):
+        try:
+            authorization = self._authorizations.popleft()
+        except IndexError:
+            authorization = self._card().authorize(self.amount, 'loadtest')
+        self._charges.append(authorization.capture(self.amount, 'loadtest'))
+
+    def _pay(self):
+        self._charges.append(self._card().capture(self.amount, 'loadtest'))
+
+    def _refund(self):
+        try:
+            charge = self._charges.popleft()
+        except IndexError:
+            charge = self._card().capture(self.amount, 'loadtest')
+        charge.refund(self.amount, 'loadtest')
+
+
+def format_summary(summary):
+    lines = ["{:<10} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9}  errors".format(
+        'operation', 'count', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms', 'p999 ms')]
+    for operation, entry in summary['by_operation'].items():
+        lines.append("{:<10} {:>8} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}  {}".format(
+            operation, entry['count'], entry['throughput'],
+            *[entry[name] * 1000 for name, _ in PERCENTILES] + [
+                ', '.join('{}={}'.format(key, count) for key, count in sorted(entry['errors'].items())) or '-'
+            ]
+        ))
+    lines.append("total {} operations in {:.1f}s, {:.1f} ops/s, {} token renewals".format(
+        summary['operations'], summary['elapsed'], summary['throughput'], summary['token_renewals']))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Drive a mix of Edenred operations through the client and report latency percentiles. "
+                    "Without --stub, credentials come from the EDENREDPAYMENTS_* environment variables."
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--stub', action='store_true', help="run against an in-process stub server")
+    target.add_argument('--fake', action='store_true', help="run against the in-memory FakeAPIProvider")
+    parser.add_argument('--stub-latency', type=float, default=0.0)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="weights per operation, e.g. authorize=4,capture=3")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--rate', type=float, help="target operations per second (open loop)")
+    load.add_argument('--concurrency', type=int, default=8, help="concurrent workers (closed loop)")
+    parser.add_argument('--max-concurrency', type=int, default=64, help="in-flight cap when using --rate")
+    parser.add_argument('--duration', type=float, default=None, help="seconds to run")
+    parser.add_argument('--operations', type=int, default=None, help="operations to run")
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='requests')
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.duration is None and args.operations is None:
+        args.duration = 10.0
+
+    stub = StubServer(latency=args.stub_latency).start() if args.stub else None
+    transport = TRANSPORTS[args.transport]()
+    try:
+        if args.fake:
+            provider = FakeAPIProvider(seed=args.seed)
+        elif stub is not None:
+            provider = APIProvider(
+                client_id='loadtest', client_secret='loadtest', base_url=stub.url, public_key=StubPublicKey(),
+                transport=transport
+            )
+        else:
+            provider = Edenred.create_client_from_env().api_provider
+            provider.transport = transport
+        generator = LoadGenerator(Edenred(provider), mix=args.mix, seed=args.seed)
+        if args.rate:
+            stats = generator.run_rate(
+                args.rate, duration=args.duration, operations=args.operations, max_concurrency=args.max_concurrency
+            )
+        else:
+            stats = generator.run_concurrency(args.concurrency, duration=args.duration, operations=args.operations)
+        summary = stats.summary(token_renewals=provider.token_renewals)
+    finally:
+        transport.close()
+        if stub is not None:
+            stub.stop()
+
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
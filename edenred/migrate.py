@@ -0,0 +1,158 @@
+import argparse
+import collections
+import logging
+import os
+import sys
+
+from concurrent import futures
+
+from .bulk import BoundedExecutor, IndexSet, ResultWriter, load_completed, read_records
+from .client import Edenred
+from .exceptions import APIError, TransactionErrors
+from .provider import APIProvider
+from .publickey import PublicKey
+
+logger = logging.getLogger(__name__)
+
+CARD_FIELDS = ('card_number', 'cvv', 'expiration_month', 'expiration_year')
+
+_public_key = None
+
+
+def _init_encryptor(public_key_path, testing):
+    global _public_key
+    _public_key = PublicKey(public_key_path, testing=testing)
+
+
+def _encrypt_record(index, record, public_key=None):
+    # errors are returned rather than raised, here and in the process pool, so a malformed record
+    # fails alone instead of stopping the migration
+    try:
+        encrypted = APIProvider.encrypt_card(public_key or _public_key, *[record[field] for field in CARD_FIELDS])
+        return index, record['username'], record['user_id'], encrypted, None
+    except Exception as error:
+        user_id = record.get('user_id') if isinstance(record, dict) else None
+        return index, None, user_id, None, repr(error)
+
+
+class CardMigration(object):
+    def __init__(self, api_provider, output_path, failures_path, public_key_path=None, testing=False,
+                 processes=0, threads=8, window=256):
+        self.api_provider = api_provider
+        self.output_path = output_path
+        self.failures_path = failures_path
+        self.public_key_path = public_key_path
+        self.testing = testing
+        self.processes = processes
+        self.threads = threads
+        self.window = window
+        self.skipped = 0
+
+    def run(self, records):
+        completed = load_completed(self.output_path, 'index', IndexSet())
+        pending = self._pending(records, completed)
+        with ResultWriter(self.output_path) as output, ResultWriter(self.failures_path) as failures:
+            self._output = output
+            self._failures = failures
+            if self.processes:
+                self._run_with_processes(pending)
+            else:
+                self._run_inline(pending)
+            return output.count, failures.count, self.skipped
+
+    def _pending(self, records, completed):
+        for index, record in enumerate(records):
+            if index in completed:
+                self.skipped += 1
+                continue
+            yield index, record
+
+    def _run_inline(self, pending):
+        public_key = self.api_provider.public_key
+        with self._senders() as senders:
+            for index, record in pending:
+                senders.submit(self._register, _encrypt_record(index, record, public_key=public_key))
+
+    def _run_with_processes(self, pending):
+        encryptors = futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_encryptor,
+            initargs=(self.public_key_path, self.testing)
+        )
+        with encryptors, self._senders() as senders:
+            encrypting = collections.deque()
+            for index, record in pending:
+                encrypting.append((index, encryptors.submit(_encrypt_record, index, record)))
+                if len(encrypting) >= self.window:
+                    senders.submit(self._register, self._encrypted(*encrypting.popleft()))
+            while encrypting:
+                senders.submit(self._register, self._encrypted(*encrypting.popleft()))
+
+    @staticmethod
+    def _encrypted(index, future):
+        try:
+            return future.result()
+        except Exception as error:
+            # the record could not reach the pool or come back from it (pickling, a dead worker)
+            return index, None, None, None, repr(error)
+
+    def _senders(self):
+        return BoundedExecutor(self.threads, self.window)
+
+    def _register(self, item):
+        index, username, user_id, encrypted, error = item
+        if error is not None:
+            logger.warning("Card encryption failed for record %s: %s", index, error)
+            self._failures.write({'index': index, 'user_id': user_id, 'error': error})
+            return
+        try:
+            response = self.api_provider.create_encrypted_payment_method(
+                username=username, user_id=user_id, **encrypted
+            )
+        except TransactionErrors as error:
+            self._failures.write({'index': index, 'user_id': user_id, 'error': error.message, 'codes': error.codes})
+        except APIError as error:
+            self._failures.write({'index': index, 'user_id': user_id, 'error': error.description,
+                                  'status_code': error.status_code})
+        except Exception as error:
+            logger.exception("Card registration failed for record %s", index)
+            self._failures.write({'index': index, 'user_id': user_id, 'error': repr(error)})
+        else:
+            self._output.write({'index': index, 'user_id': user_id, 'card_token': response['CardToken']})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Register cards from a CSV/JSONL file with columns card_number, cvv, expiration_month, "
+                    "expiration_year, username and user_id. Credentials come from the EDENREDPAYMENTS_* "
+                    "environment variables. Re-running with the same output resumes where it stopped."
+    )
+    parser.add_argument('records')
+    parser.add_argument('--output', required=True, help="JSONL file receiving card tokens, also the checkpoint")
+    parser.add_argument('--failures', required=True, help="JSONL file receiving failed records")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default=None)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="encryption processes, 0 to encrypt in the calling process")
+    parser.add_argument('--threads', type=int, default=8, help="concurrent registration requests")
+    parser.add_argument('--window', type=int, default=256, help="records in flight at once")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = Edenred.create_client_from_env()
+    migration = CardMigration(
+        client.api_provider,
+        output_path=args.output,
+        failures_path=args.failures,
+        public_key_path=os.environ['EDENREDPAYMENTS_PUBLIC_KEY'],
+        testing=bool(os.getenv('EDENREDPAYMENTS_TESTING')),
+        processes=args.processes,
+        threads=args.threads,
+        window=args.window
+    )
+    registered, failed, skipped = migration.run(read_records(args.records, args.format))
+    print("registered={} failed={} skipped={}".format(registered, failed, skipped))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
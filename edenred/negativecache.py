@@ -0,0 +1,88 @@
+import collections
+import logging
+import threading
+import time
+
+from .exceptions import TransactionErrors
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeCache(object):
+    # Remembers card tokens that failed with one of the sticky codes (blocked card...) and fails further
+    # calls for them locally until ttl seconds have passed, without reaching Edenred. Codes in amount_codes
+    # (no balance...) only fail calls for at least the amount that failed, so a smaller payment still goes
+    # through. There is one entry per card token and code.
+    def __init__(self, codes, ttl=60.0, max_entries=10000, clock=time.monotonic, amount_codes=()):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.amount_codes = frozenset(amount_codes)
+        self.codes = frozenset(codes) | self.amount_codes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def call(self, card_token, function, *args, **kwargs):
+        amount = kwargs.get('amount')
+        error = self.get(card_token, amount)
+        if error is not None:
+            raise error
+        try:
+            return function(*args, **kwargs)
+        except TransactionErrors as error:
+            self.add(card_token, error, amount)
+            raise
+
+    def get(self, card_token, amount=None):
+        # a fresh copy of the cached exception, so concurrent raises do not share a traceback
+        with self._lock:
+            now = self._clock()
+            error = None
+            for code in sorted(self.codes):
+                key = (card_token, code)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                elif error is None and self._applies(code, entry[2], amount):
+                    error = entry[1]
+            if error is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return error.__class__(error.errors)
+
+    def _applies(self, code, failed_amount, amount):
+        if code not in self.amount_codes or failed_amount is None or amount is None:
+            return True
+        return amount >= failed_amount
+
+    def add(self, card_token, error, amount=None):
+        codes = self.codes.intersection(error.codes)
+        if not codes:
+            return False
+        with self._lock:
+            for code in codes:
+                self._entries.pop((card_token, code), None)
+                self._entries[(card_token, code)] = (self._clock() + self.ttl, error, amount)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug("Caching %s for %.0fs", error.codes, self.ttl)
+        return True
+
+    def forget(self, card_token):
+        with self._lock:
+            for code in self.codes:
+                self._entries.pop((card_token, code), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,98 @@
+import contextlib
+import cProfile
+import functools
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# only one cProfile profiler can be active per interpreter at a time
+_active = threading.Lock()
+
+
+def _reset_after_fork():
+    # a profile running in another thread of the parent never releases the lock in the child
+    global _active
+    _active = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class Profiler(object):
+    SUFFIX = '.prof'
+
+    def __init__(self, directory, sample_rate=1.0, max_files=100):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if max_files < 1:
+            raise ValueError("max_files must be a positive integer")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        # workers forked together may all create it at once
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def create_from_env(cls):
+        directory = os.getenv('EDENREDPAYMENTS_PROFILE_DIR')
+        if not directory:
+            return None
+        sample_rate = float(os.getenv('EDENREDPAYMENTS_PROFILE_SAMPLE_RATE', 1.0))
+        max_files = int(os.getenv('EDENREDPAYMENTS_PROFILE_MAX_FILES', 100))
+        return cls(directory, sample_rate=sample_rate, max_files=max_files)
+
+    @contextlib.contextmanager
+    def profile(self, operation):
+        if random.random() >= self.sample_rate or not _active.acquire(False):
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            _active.release()
+        self._dump(operation, profile)
+
+    def _dump(self, operation, profile):
+        filename = "{}-{}-{}{}".format(operation, os.getpid(), int(time.time() * 1000000), self.SUFFIX)
+        try:
+            profile.dump_stats(os.path.join(self.directory, filename))
+            self._prune()
+        except (IOError, OSError):
+            logger.exception("Could not write profile for %s", operation)
+
+    def _prune(self):
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(self.SUFFIX)
+        ]
+        if len(paths) <= self.max_files:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_files]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def profiled(method):
+    operation = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.profile(operation):
+            return method(self, *args, **kwargs)
+    return wrapper
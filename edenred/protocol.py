@@ -0,0 +1,158 @@
+import json
+
+from . import responses
+from .exceptions import InvalidResponse, TransactionErrors
+
+CONTENT_TYPE = 'application/json; charset=utf-8'
+LOGIN_HEADERS = {'Content-Type': CONTENT_TYPE}
+
+
+class Operation(object):
+    # one Edenred call as data: where it goes, what it sends, which key of the answer holds the result
+    # and the record type it is returned as
+    __slots__ = ('resource', 'action', 'payload', 'result_key', 'record')
+
+    def __init__(self, resource, action, payload, result_key, record=None):
+        self.resource = resource
+        self.action = action
+        self.payload = payload
+        self.result_key = result_key
+        self.record = record
+
+    def url(self, base_url):
+        return endpoint_url(base_url, self.resource, self.action)
+
+    def encode(self):
+        return encode(self.payload)
+
+    def result(self, data):
+        try:
+            result = data[self.result_key]
+        except (KeyError, TypeError):
+            raise InvalidResponse("Missing {} in response".format(self.result_key))
+        return self.record(result) if self.record is not None else result
+
+    def parse(self, body):
+        data = decode(body)
+        validate(data)
+        return self.result(data)
+
+    def __eq__(self, other):
+        if not isinstance(other, Operation):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):  # pragma: no cover
+        return 'Operation({!r}, {!r})'.format(self.resource, self.action)
+
+
+def endpoint_url(base_url, resource, action):
+    if resource is not None:
+        return "{}/{}/{}".format(base_url, resource, action)
+    return "{}/{}".format(base_url, action)
+
+
+def headers(access_token):
+    return {'Content-Type': CONTENT_TYPE, 'authorization': access_token}
+
+
+def login(client_id, client_secret):
+    payload = {
+        "Security": {
+            "ClientIdentifier": client_id,
+            "ClientSecret": client_secret
+        }
+    }
+    return Operation(None, 'Login', payload, 'access_token')
+
+
+def authorize(card_token, amount, description):
+    payload = {
+        "Authorize": {
+            "CardToken": card_token,
+            "Amount": amount,
+            "Description": description,
+        }
+    }
+    return Operation('Payment', 'Authorize', payload, 'Authorize', responses.AuthorizeResult)
+
+
+def pay(card_token, amount, description):
+    payload = {
+        "Pay": {
+            "CardToken": card_token,
+            "Amount": amount,
+            "Description": description,
+        }
+    }
+    return Operation('Payment', 'Pay', payload, 'Pay', responses.PayResult)
+
+
+def capture(card_token, authorize_identifier, amount, description):
+    payload = {
+        "Capture": {
+            "CardToken": card_token,
+            "Amount": amount,
+            "Description": description,
+            "AuthorizeIdentifier": authorize_identifier
+        }
+    }
+    return Operation('Payment', 'Capture', payload, 'Capture', responses.CaptureResult)
+
+
+def refund(card_token, payment_identifier, amount, description):
+    payload = {
+        "Pay": {
+            "CardToken": card_token,
+            "Amount": amount,
+            "Description": description,
+            "PayIdentifier": payment_identifier
+        }
+    }
+    return Operation('Payment/{}'.format(payment_identifier), 'Refund', payload, 'Pay', responses.RefundResult)
+
+
+def create_payment_method(card_number, cvv, expiration_month, expiration_year, username, user_id):
+    # card fields must already be encrypted with the merchant public key
+    payload = {
+        "PaymentMethod": {
+            "CardNumber": card_number,
+            "CardCVV": cvv,
+            "CardExpirationMonth": expiration_month,
+            "CardExpirationYear": expiration_year,
+            "UserLogin": username,
+            "UserIdentifier": user_id,
+            "CardToken": ""
+        }
+    }
+    return Operation('PaymentMethod', 'Create', payload, 'PaymentMethod', responses.PaymentMethodResult)
+
+
+def encode(payload):
+    return json.dumps(payload).encode('utf-8')
+
+
+def decode(body):
+    try:
+        data = json.loads(body.decode('utf-8'))
+    except ValueError:
+        raise InvalidResponse("Response body is not JSON")
+    if not isinstance(data, dict):
+        raise InvalidResponse("Response body is not a JSON object")
+    return data
+
+
+def validate(data):
+    if data.get('Success', False):
+        return
+    errors = data.get('ErrorList') or []
+    if not isinstance(errors, list) or not all(_is_error(error) for error in errors):
+        raise InvalidResponse("Malformed ErrorList")
+    raise TransactionErrors.create(errors)
+
+
+def _is_error(error):
+    return isinstance(error, dict) and isinstance(error.get('Code'), str)
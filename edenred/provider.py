@@ -1,158 +1,221 @@
 
+import functools
 import logging
+import os
+import threading
+import weakref
 
-import requests
-
-from .exceptions import APIError, Unauthorized, TransactionErrors
+from . import protocol
+from .debuglog import DebugLog
+from .exceptions import Unauthorized
+from .profiling import profiled
+from .tracing import phase, traced
+from .transport import default_transport
 
 logger = logging.getLogger(__name__)
+debug_log = DebugLog.create_from_env(logger)
 
+_ANY_TOKEN = object()
 
-class APIProvider(object):
-    CONTENT_TYPE = 'application/json; charset=utf-8'
+_providers = weakref.WeakSet()
+
+
+def _reset_providers_after_fork():
+    for provider in list(_providers):
+        provider.reset_after_fork()
 
-    def __init__(self, client_id, client_secret, base_url, public_key, access_token=None):
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_providers_after_fork)
+
+
+class APIProvider(object):
+    # One provider may be shared by any number of threads: the token and its headers are swapped
+    # atomically and renewals are single-flight, so a burst of 403s costs one Login. A provider built
+    # before os.fork() is reset in the child: connection pools and locks are replaced, while the parsed
+    # public key and the access token carry over.
+    CONTENT_TYPE = protocol.CONTENT_TYPE
+    LOGIN_HEADERS = protocol.LOGIN_HEADERS
+    # endpoints with a fixed URL, formatted once per provider
+    STATIC_ENDPOINTS = (
+        ('PaymentMethod', 'Create'),
+        ('Payment', 'Authorize'),
+        ('Payment', 'Pay'),
+        ('Payment', 'Capture'),
+    )
+    # Edenred and Card run edenred.validation before any request unless this is False
+    validate = True
+
+    def __init__(self, client_id, client_secret, base_url, public_key, access_token=None, transport=None,
+                 login_hedger=None, profiler=None, tracer=None, limiter=None, validate=True, negative_cache=None):
         self.public_key = public_key
         self.client_id = client_id
         self.client_secret = client_secret
         self.base_url = base_url
         self.access_token = access_token
+        self.transport = transport
+        self.login_hedger = login_hedger
+        self.profiler = profiler
+        self.tracer = tracer
+        self.limiter = limiter
+        self.validate = validate
+        self.negative_cache = negative_cache
+        self.token_renewals = 0
+        self._token_lock = self._create_lock()
+        _providers.add(self)
+        if login_hedger is not None and getattr(transport or default_transport, 'timeout', None) is None:
+            logger.warning("Hedged Login over a transport without timeout: hung Logins can exhaust the hedger")
+
+    @property
+    def base_url(self):
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, base_url):
+        self._base_url = base_url
+        self._urls = {
+            (resource, action): self.get_endpoint_url(resource=resource, action=action, base_url=base_url)
+            for resource, action in self.STATIC_ENDPOINTS
+        }
+
+    @property
+    def access_token(self):
+        return self._headers['authorization']
+
+    @access_token.setter
+    def access_token(self, access_token):
+        # the token lives only in the headers dict, which is swapped as a whole so concurrent
+        # requests never see a half-updated token
+        self._headers = protocol.headers(access_token)
 
     @classmethod
-    def create_access_token(cls, client_id, client_secret, public_key, base_url):
+    def create_access_token(cls, client_id, client_secret, public_key, base_url, transport=None):
         logger.debug("Retrieving Edenred access_token")
-        login_url = cls.get_endpoint_url(resource=None, action='Login', base_url=base_url)
-        payload = {
-            "Security": {
-                "ClientIdentifier": client_id,
-                "ClientSecret": client_secret
-            }
-        }
+        operation = protocol.login(client_id, client_secret)
+        login_url = cls.get_endpoint_url(resource=operation.resource, action=operation.action, base_url=base_url)
+        if debug_log.sample():
+            debug_log.request(login_url, operation.payload)
         response = cls.do_request(
-            url=login_url, payload=payload, headers={'Content-Type': cls.CONTENT_TYPE}
+            url=login_url, payload=operation.payload, headers=cls.LOGIN_HEADERS, transport=transport
         )
         cls.validate_response(response)
-        return response['access_token']
+        return operation.result(response)
 
     @classmethod
     def get_endpoint_url(cls, base_url, resource, action):
-        if resource is not None:
-            return "{}/{}/{}".format(base_url, resource, action)
-        return "{}/{}".format(base_url, action)
+        return protocol.endpoint_url(base_url, resource, action)
 
     @classmethod
-    def do_request(cls, url, headers, payload):
-        try:
-            logger.debug("Requesting %s", url)
-            response = requests.post(
-                url,
-                json=payload,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as http_error:
-            raise APIError.create_from_http_error(http_error)
+    def do_request(cls, url, headers, payload, transport=None):
+        return (transport or default_transport).post(url=url, headers=headers, payload=payload)
 
     @classmethod
     def validate_response(cls, response):
-        if not response.get('Success', False):
-            errors = response.get('ErrorList') or []
-            raise TransactionErrors(response, errors)
+        protocol.validate(response)
 
     def request_resource(self, resource, action, payload, renew_on_unauthorized=True):
+        url = self._urls.get((resource, action))
+        if url is None:
+            url = self.get_endpoint_url(resource=resource, action=action, base_url=self.base_url)
+        headers = self._get_headers()
+        debug = debug_log.sample()
+        if debug:
+            debug_log.request(url, payload)
         try:
-            response = self.do_request(
-                url=self.get_endpoint_url(resource=resource, action=action, base_url=self.base_url),
-                headers=self._get_headers(),
-                payload=payload
-            )
+            if self.limiter is None:
+                response = self.do_request(url=url, headers=headers, payload=payload, transport=self.transport)
+            else:
+                with self.limiter.slot():
+                    response = self.do_request(url=url, headers=headers, payload=payload, transport=self.transport)
         except Unauthorized:
             if renew_on_unauthorized:
-                self.update_token()
+                self.update_token(stale_token=headers['authorization'])
                 return self.request_resource(
                     resource=resource, action=action, payload=payload, renew_on_unauthorized=False
                 )
             raise
         else:
-            logger.debug('Response: %s', response)
+            if debug:
+                debug_log.response(url, response)
             self.validate_response(response)
             return response
 
+    def perform(self, operation):
+        data = self.request_resource(resource=operation.resource, action=operation.action, payload=operation.payload)
+        return operation.result(data)
+
+    @traced
+    @profiled
     def authorize(self, card_token, amount, description):
-        payload = {
-            "Authorize": {
-                "CardToken": card_token,
-                "Amount": amount,
-                "Description": description,
-            }
-        }
-        data = self.request_resource(resource='Payment', action='Authorize', payload=payload)
-        return data['Authorize']
+        return self.perform(protocol.authorize(card_token, amount, description))
 
+    @traced
+    @profiled
     def pay(self, card_token, amount, description):
-        payload = {
-            "Pay": {
-                "CardToken": card_token,
-                "Amount": amount,
-                "Description": description,
-            }
-        }
-        data = self.request_resource(resource='Payment', action='Pay', payload=payload)
-        return data['Pay']
+        return self.perform(protocol.pay(card_token, amount, description))
 
+    @traced
+    @profiled
     def capture(self, card_token, authorize_identifier, amount, description):
-        payload = {
-            "Capture": {
-                "CardToken": card_token,
-                "Amount": amount,
-                "Description": description,
-                "AuthorizeIdentifier": authorize_identifier
-            }
-        }
-        data = self.request_resource(resource='Payment', action='Capture', payload=payload)
-        return data['Capture']
+        return self.perform(protocol.capture(card_token, authorize_identifier, amount, description))
 
+    @traced
+    @profiled
     def refund(self, card_token, payment_identifier, amount, description):
-        payload = {
-            "Pay": {
-                "CardToken": card_token,
-                "Amount": amount,
-                "Description": description,
-                "PayIdentifier": payment_identifier
-            }
-        }
-        resource = 'Payment/{}'.format(payment_identifier)
-        data = self.request_resource(resource=resource, action='Refund', payload=payload)
-        return data['Pay']
+        return self.perform(protocol.refund(card_token, payment_identifier, amount, description))
 
+    @traced
+    @profiled
     def create_payment_method(self, card_number, cvv, expiration_month, expiration_year, username, user_id):
-        payload = {
-            "PaymentMethod": {
-                "CardNumber": self.public_key.encrypt(card_number),
-                "CardCVV": self.public_key.encrypt(cvv),
-                "CardExpirationMonth": self.public_key.encrypt(expiration_month),
-                "CardExpirationYear": self.public_key.encrypt(expiration_year),
-                "UserLogin": username,
-                "UserIdentifier": user_id,
-                "CardToken": ""
-            }
+        with phase('encrypt'):
+            encrypted = self.encrypt_card(self.public_key, card_number, cvv, expiration_month, expiration_year)
+        return self.create_encrypted_payment_method(username=username, user_id=user_id, **encrypted)
+
+    @staticmethod
+    def encrypt_card(public_key, card_number, cvv, expiration_month, expiration_year):
+        return {
+            'card_number': public_key.encrypt(card_number),
+            'cvv': public_key.encrypt(cvv),
+            'expiration_month': public_key.encrypt(expiration_month),
+            'expiration_year': public_key.encrypt(expiration_year),
         }
-        data = self.request_resource(resource='PaymentMethod', action='Create', payload=payload)
-        return data['PaymentMethod']
-
-    def update_token(self):
-        self.access_token = self.create_access_token(
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            public_key=self.public_key,
-            base_url=self.base_url
-        )
+
+    def create_encrypted_payment_method(self, card_number, cvv, expiration_month, expiration_year, username,
+                                        user_id):
+        return self.perform(protocol.create_payment_method(
+            card_number, cvv, expiration_month, expiration_year, username, user_id
+        ))
+
+    def update_token(self, stale_token=_ANY_TOKEN):
+        create_access_token = self.create_access_token
+        if self.login_hedger is not None:
+            create_access_token = functools.partial(self.login_hedger.call, create_access_token)
+        with phase('token_renewal', opaque=True), self._token_lock:
+            if stale_token is not _ANY_TOKEN and self.access_token != stale_token:
+                # another thread renewed the token while this one waited for the lock
+                return
+            self.token_renewals += 1
+            self.access_token = create_access_token(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                public_key=self.public_key,
+                base_url=self.base_url,
+                transport=self.transport
+            )
+
+    def reset_after_fork(self):
+        # called in the child by the at-fork hook; call it by hand where os.register_at_fork is missing
+        self._token_lock = self._create_lock()
+        for component in (self.transport or default_transport, self.login_hedger, self.limiter):
+            reset = getattr(component, 'reset_after_fork', None)
+            if reset is not None:
+                reset()
+
+    @staticmethod
+    def _create_lock():
+        return threading.Lock()
 
     def _get_headers(self):
         if self.access_token is None:
-            self.update_token()
-        return {
-            'Content-Type': self.CONTENT_TYPE,
-            'authorization': self.access_token
-        }
+            self.update_token(stale_token=None)
+        return self._headers
@@ -1,19 +1,21 @@
 
 import base64
 
+from .ciphers import get_backend
+
 
 class PublicKey(object):
-    def __init__(self, path, testing=False):
+    # backend is the name of an edenred.ciphers backend; by default the fastest one installed
+    def __init__(self, path, testing=False, backend=None):
         self.path = path
         self.testing = testing
-        self.rsa = self._import_rsa(path)
+        self.backend = get_backend(backend)
+        self._cipher = self.backend(self._read_pem(path))
 
     @staticmethod
-    def _import_rsa(path):
-        import Crypto.PublicKey.RSA
-
-        with open(path, 'r') as key_file:
-            return Crypto.PublicKey.RSA.importKey(key_file.read())
+    def _read_pem(path):
+        with open(path, 'rb') as key_file:
+            return key_file.read()
 
     def encrypt(self, data):
         if self.testing:
@@ -27,13 +29,7 @@ class PublicKey(object):
 
     @property
     def rsa(self):
-        return self._rsa
-
-    @rsa.setter
-    def rsa(self, rsa):
-        import Crypto.Cipher.PKCS1_v1_5
-        self._rsa = rsa
-        self._cipher = Crypto.Cipher.PKCS1_v1_5.new(rsa)
+        return self._cipher.key
 
     def __eq__(self, other):
-        return self.rsa == other.rsa and self.testing == other.testing
+        return self.cipher.public_numbers == other.cipher.public_numbers and self.testing == other.testing
@@ -0,0 +1,22 @@
+import threading
+import time
+
+
+class RateLimiter(object):
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            slot = now if self._next is None or self._next < now else self._next
+            self._next = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
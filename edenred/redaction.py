@@ -0,0 +1,47 @@
+import hashlib
+import hmac
+import os
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
+
+class Redactor(object):
+    # Card fields and secrets are dropped; identifiers become keyed hashes, so the same card token
+    # keeps the same pseudonym for as long as the key lives without being recoverable from it.
+    REDACTED_FIELDS = frozenset([
+        'CardNumber', 'CardCVV', 'CardExpirationMonth', 'CardExpirationYear', 'ClientSecret',
+    ])
+    PSEUDONYM_FIELDS = frozenset([
+        'CardToken', 'UserLogin', 'UserIdentifier', 'ClientIdentifier', 'access_token',
+    ])
+    REDACTED = '<redacted>'
+    SCALARS = (str, int, float, type(None))
+
+    def __init__(self, key=None):
+        self._key = key or os.urandom(16)
+
+    def pseudonym(self, value):
+        if value is None or value == '':
+            return value
+        return hmac.digest(self._key, str(value).encode('utf-8'), hashlib.sha256).hex()[:16]
+
+    def redact(self, value):
+        # scalars first: they are most of the values, and checking them against Mapping is slow
+        if isinstance(value, self.SCALARS):
+            return value
+        if isinstance(value, Mapping):
+            redacted = {}
+            for key, item in value.items():
+                if key in self.REDACTED_FIELDS:
+                    redacted[key] = self.REDACTED
+                elif key in self.PSEUDONYM_FIELDS:
+                    redacted[key] = self.pseudonym(item)
+                else:
+                    redacted[key] = self.redact(item)
+            return redacted
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        return value
@@ -0,0 +1,152 @@
+import argparse
+import decimal
+import logging
+import sys
+import threading
+
+from .bulk import BoundedExecutor, ResultWriter, load_completed, read_records
+from .client import Edenred
+from .exceptions import APIError, TransactionErrors
+from .ratelimit import RateLimiter
+from .scheduler import UNKNOWN, is_transient
+
+logger = logging.getLogger(__name__)
+
+
+def aggregate_refunds(records):
+    # partial refunds of one charge on adjacent rows become a single Refund call; only the current
+    # charge is held, so the input is streamed whatever its size
+    key = amount = None
+    for record in records:
+        record_key = (record['card_token'], record['payment_identifier'])
+        record_amount = decimal.Decimal(str(record['amount']))
+        if record_key == key:
+            amount += record_amount
+            continue
+        if key is not None:
+            yield key, amount
+        key, amount = record_key, record_amount
+    if key is not None:
+        yield key, amount
+
+
+class BulkRefund(object):
+    # Records must be sorted by payment_identifier (as strings) so the rows of a charge are adjacent. A
+    # charge that shows up out of order, or that a previous run refunded for a different amount, is
+    # written to the failures file instead of being refunded a second time. A refund whose answer was
+    # lost (connection error, timeout, 5xx) may still have been applied: it is written to the output with
+    # state unknown, and later runs leave the charge alone until someone reconciles that line.
+    def __init__(self, client, output_path, failures_path, rate=10.0, threads=8, description='Refund'):
+        self.client = client
+        self.output_path = output_path
+        self.failures_path = failures_path
+        self.rate_limiter = RateLimiter(rate)
+        self.threads = threads
+        self.description = description
+        self.skipped = 0
+        self.unknown = 0
+        self._unknown_written = 0
+        self._lock = threading.Lock()
+
+    def run(self, records):
+        completed = load_completed(self.output_path, 'payment_identifier', value='amount')
+        states = load_completed(self.output_path, 'payment_identifier', value='state')
+        last = None
+        with ResultWriter(self.output_path) as output, ResultWriter(self.failures_path) as failures:
+            self._output = output
+            self._failures = failures
+            with BoundedExecutor(self.threads, self.threads * 2) as executor:
+                for (card_token, payment_identifier), amount in aggregate_refunds(records):
+                    if last is not None and str(payment_identifier) <= last:
+                        self._reject(card_token, payment_identifier, amount, "records are not sorted by "
+                                     "payment_identifier, this charge may have been refunded already")
+                        continue
+                    last = str(payment_identifier)
+                    if states.get(payment_identifier) == UNKNOWN:
+                        logger.warning("Refund of %s not sent: a previous one has an unknown outcome",
+                                       payment_identifier)
+                        self.unknown += 1
+                        continue
+                    refunded = completed.get(payment_identifier)
+                    if refunded is not None:
+                        if decimal.Decimal(refunded) == amount:
+                            self.skipped += 1
+                        else:
+                            self._reject(card_token, payment_identifier, amount,
+                                         "a refund of {} was already made for this charge".format(refunded))
+                        continue
+                    self.rate_limiter.acquire()
+                    executor.submit(self._refund, card_token, payment_identifier, amount)
+            return output.count - self._unknown_written, failures.count, self.skipped
+
+    def _reject(self, card_token, payment_identifier, amount, error):
+        logger.warning("Refund of %s not sent: %s", payment_identifier, error)
+        self._failures.write({
+            'card_token': card_token, 'payment_identifier': payment_identifier, 'amount': str(amount), 'error': error
+        })
+
+    def _refund(self, card_token, payment_identifier, amount):
+        result = {'card_token': card_token, 'payment_identifier': payment_identifier, 'amount': str(amount)}
+        try:
+            charge = self.client.retrieve_card(card_token).retrieve_charge(payment_identifier)
+            refund = charge.refund(amount, self.description)
+        except TransactionErrors as error:
+            result.update(error=error.message, codes=error.codes)
+            self._failures.write(result)
+        except APIError as error:
+            result.update(error=error.description, status_code=error.status_code)
+            self._failed(result, error)
+        except Exception as error:
+            if not is_transient(error):
+                logger.exception("Refund of %s failed", payment_identifier)
+            result.update(error=repr(error))
+            self._failed(result, error)
+        else:
+            result.update(refunded=str(refund.amount), state='refunded')
+            self._output.write(result)
+
+    def _failed(self, result, error):
+        if not is_transient(error):
+            self._failures.write(result)
+            return
+        logger.warning("Refund of %s has an unknown outcome: %r", result['payment_identifier'], error)
+        result.update(state=UNKNOWN)
+        with self._lock:
+            self.unknown += 1
+            self._unknown_written += 1
+        self._output.write(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Refund charges listed in a CSV/JSONL file with columns card_token, payment_identifier and "
+                    "amount, sorted by payment_identifier. Credentials come from the EDENREDPAYMENTS_* environment "
+                    "variables. Charges already present in the output file with the same amount are skipped, so "
+                    "the command can be re-run safely. Refunds with an unknown outcome are written to the output "
+                    "with state unknown and skipped by later runs until reconciled."
+    )
+    parser.add_argument('records')
+    parser.add_argument('--output', required=True, help="JSONL file receiving completed refunds")
+    parser.add_argument('--failures', required=True, help="JSONL file receiving failed refunds")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default=None)
+    parser.add_argument('--rate', type=float, default=10.0, help="maximum refunds per second")
+    parser.add_argument('--threads', type=int, default=8, help="concurrent refund requests")
+    parser.add_argument('--description', default='Refund')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    runner = BulkRefund(
+        Edenred.create_client_from_env(),
+        output_path=args.output,
+        failures_path=args.failures,
+        rate=args.rate,
+        threads=args.threads,
+        description=args.description
+    )
+    refunded, failed, skipped = runner.run(read_records(args.records, args.format))
+    print("refunded={} failed={} skipped={} unknown={}".format(refunded, failed, skipped, runner.unknown))
+    return 1 if failed or runner.unknown else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
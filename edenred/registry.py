@@ -0,0 +1,71 @@
+import collections
+import threading
+
+from .client import Edenred
+from .provider import APIProvider
+from .publickey import PublicKey
+from .transport import RequestsTransport
+
+
+class EdenredRegistry(object):
+    DEFAULT_MAX_TENANTS = 1024
+
+    def __init__(self, public_key, base_url, max_tenants=DEFAULT_MAX_TENANTS, transport=None):
+        if max_tenants < 1:
+            raise ValueError("max_tenants must be a positive integer")
+        self.public_key = public_key
+        self.base_url = base_url
+        self.max_tenants = max_tenants
+        self.transport = transport if transport is not None else RequestsTransport.create_pooled()
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create_registry(cls, public_key_path, base_url, testing=False, max_tenants=DEFAULT_MAX_TENANTS):
+        public_key = PublicKey(public_key_path, testing=testing)
+        return cls(public_key=public_key, base_url=base_url, max_tenants=max_tenants)
+
+    def get_client(self, client_id, client_secret):
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is not None and client.api_provider.client_secret == client_secret:
+                self._clients.move_to_end(client_id)
+                return client
+            client = Edenred(self._create_provider(client_id, client_secret))
+            self._clients[client_id] = client
+            self._clients.move_to_end(client_id)
+            while len(self._clients) > self.max_tenants:
+                self._clients.popitem(last=False)
+            return client
+
+    def evict(self, client_id):
+        with self._lock:
+            return self._clients.pop(client_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def close(self):
+        self.clear()
+        self.transport.close()
+
+    def _create_provider(self, client_id, client_secret):
+        return APIProvider(
+            client_id=client_id,
+            client_secret=client_secret,
+            public_key=self.public_key,
+            base_url=self.base_url,
+            transport=self.transport
+        )
+
+    def __contains__(self, client_id):
+        return client_id in self._clients
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __repr__(self):  # pragma: no cover
+        return "EdenredRegistry({base_url}, tenants={count}/{max_tenants})".format(
+            base_url=self.base_url, count=len(self), max_tenants=self.max_tenants
+        )
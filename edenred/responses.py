@@ -0,0 +1,83 @@
+from collections.abc import Mapping
+
+from .exceptions import InvalidResponse
+
+_MISSING = object()
+
+
+class Record(Mapping):
+    # The fields the client reads are kept in slots; any other key Edenred sends goes to a dict that
+    # is only built when there is one. Records still read like the response dicts they replace, and a
+    # typed field reads None when Edenred left it out.
+    __slots__ = ('_absent', '_extra')
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._ATTRIBUTES = {key: attribute for attribute, key in cls.FIELDS}
+
+    def __init__(self, data):
+        if not isinstance(data, dict):
+            raise InvalidResponse("Expected an object, got {}".format(type(data).__name__))
+        absent = ()
+        for attribute, key in self.FIELDS:
+            value = data.get(key, _MISSING)
+            if value is _MISSING:
+                absent += (key,)
+                value = None
+            setattr(self, attribute, value)
+        self._absent = absent
+        self._extra = None
+        if len(data) > len(self.FIELDS) - len(absent):
+            self._extra = {key: value for key, value in data.items() if key not in self._ATTRIBUTES}
+
+    def __getitem__(self, key):
+        attribute = self._ATTRIBUTES.get(key)
+        if attribute is not None and key not in self._absent:
+            return getattr(self, attribute)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __iter__(self):
+        for _, key in self.FIELDS:
+            if key not in self._absent:
+                yield key
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return len(self.FIELDS) - len(self._absent) + len(self._extra or ())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(),)
+
+    def __repr__(self):  # pragma: no cover
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+
+class PaymentMethodResult(Record):
+    __slots__ = ('card_token',)
+    FIELDS = (('card_token', 'CardToken'),)
+
+
+class AuthorizeResult(Record):
+    __slots__ = ('authorize_identifier', 'amount')
+    FIELDS = (('authorize_identifier', 'AuthorizeIdentifier'), ('amount', 'Amount'))
+
+
+class PayResult(AuthorizeResult):
+    __slots__ = ()
+
+
+class CaptureResult(AuthorizeResult):
+    __slots__ = ()
+
+
+class RefundResult(Record):
+    __slots__ = ('pay_identifier', 'amount')
+    FIELDS = (('pay_identifier', 'PayIdentifier'), ('amount', 'Amount'))
@@ -0,0 +1,246 @@
+import collections
+import decimal
+import logging
+import sqlite3
+import threading
+import time
+
+from concurrent import futures
+
+from .client import Authorization, cents_to_decimal
+from .exceptions import APIError, InvalidResponse, TransactionErrors
+from .transport import is_connection_error
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+CAPTURING = 'capturing'
+CAPTURED = 'captured'
+FAILED = 'failed'
+EXPIRED = 'expired'
+# the capture did not go through, but an earlier attempt may have: check with Edenred before charging again
+UNKNOWN = 'unknown'
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS captures (
+        charge_id TEXT PRIMARY KEY,
+        card_token TEXT NOT NULL,
+        amount TEXT NOT NULL,
+        authorized_amount INTEGER,
+        description TEXT NOT NULL,
+        due_at REAL NOT NULL,
+        expires_at REAL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        updated_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS captures_due ON captures (state, due_at)",
+    "CREATE INDEX IF NOT EXISTS captures_expiry ON captures (state, expires_at)",
+)
+
+ScheduledCapture = collections.namedtuple('ScheduledCapture', [
+    'charge_id', 'card_token', 'amount', 'authorized_amount', 'description', 'due_at', 'expires_at', 'state',
+    'attempts', 'error',
+])
+COLUMNS = ', '.join(ScheduledCapture._fields)
+
+
+class CaptureScheduler(object):
+    # Authorizations waiting to be captured, kept in SQLite ordered by due time. run_pending() captures
+    # whatever is due in concurrent batches; connection errors and 5xx are retried with exponential backoff,
+    # anything else is final. A capture that ends without success after an attempt whose outcome is not
+    # known (a retried error, a crash) is marked unknown instead of failed. Any thread may schedule while
+    # another one runs the scheduler: the connection is shared and every use of it is serialized by a lock.
+    def __init__(self, client, path, expires_after=7 * 24 * 3600, batch_size=64, max_workers=8,
+                 retry_delay=60.0, max_attempts=5, description='Capture', clock=time.time):
+        self.client = client
+        self.path = path
+        self.expires_after = expires_after
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.description = description
+        self.clock = clock
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+            # a crash between sending a capture and storing its result: try again, a second capture of
+            # the same authorization is refused rather than charged
+            interrupted = self._connection.execute(
+                "UPDATE captures SET state = ? WHERE state = ?", (PENDING, CAPTURING)
+            ).rowcount
+        if interrupted:
+            logger.warning("%d captures were interrupted and will be retried", interrupted)
+
+    def schedule(self, authorization, due_at=None, amount=None, description=None, expires_at=None):
+        # amount defaults to the authorized amount when the authorization knows it
+        now = self.clock()
+        if amount is None:
+            if authorization.amount is None:
+                raise ValueError("amount is required when the authorized amount is unknown")
+            amount = cents_to_decimal(authorization.amount)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO captures (charge_id, card_token, amount, authorized_amount, description, due_at,
+                                      expires_at, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (charge_id) DO UPDATE SET
+                    amount = excluded.amount, description = excluded.description, due_at = excluded.due_at,
+                    expires_at = excluded.expires_at, updated_at = excluded.updated_at
+                WHERE state = 'pending'
+                """,
+                (
+                    str(authorization.charge_id), authorization.card.card_token, str(amount),
+                    authorization.amount, description or self.description,
+                    now if due_at is None else due_at,
+                    now + self.expires_after if expires_at is None else expires_at,
+                    PENDING, now,
+                )
+            )
+
+    def cancel(self, charge_id):
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM captures WHERE charge_id = ? AND state = ?", (str(charge_id), PENDING)
+            ).rowcount == 1
+
+    def get(self, charge_id):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT {} FROM captures WHERE charge_id = ?".format(COLUMNS), (str(charge_id),)
+            ).fetchone()
+        return ScheduledCapture(*row) if row is not None else None
+
+    def due(self, limit=None):
+        return self._select(
+            "state = ? AND due_at <= ? ORDER BY due_at LIMIT ?", (PENDING, self.clock(), limit or -1)
+        )
+
+    def expiring(self, within):
+        # pending authorizations that expire in the next `within` seconds, soonest first
+        return self._select(
+            "state = ? AND expires_at <= ? ORDER BY expires_at", (PENDING, self.clock() + within)
+        )
+
+    def next_due_at(self):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MIN(due_at) FROM captures WHERE state = ?", (PENDING,)
+            ).fetchone()
+        return row[0]
+
+    def counts(self):
+        with self._lock:
+            return dict(self._connection.execute("SELECT state, COUNT(*) FROM captures GROUP BY state"))
+
+    def expire(self):
+        with self._lock:
+            expired = self._select("state = ? AND expires_at <= ? ORDER BY expires_at", (PENDING, self.clock()))
+            if expired:
+                unknown = sum(1 for capture in expired if capture.attempts)
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE captures SET state = ?, updated_at = ? WHERE charge_id = ?",
+                        [(UNKNOWN if capture.attempts else EXPIRED, self.clock(), capture.charge_id)
+                         for capture in expired]
+                    )
+                if unknown < len(expired):
+                    logger.warning("%d authorizations expired before capture", len(expired) - unknown)
+                if unknown:
+                    logger.warning("%d authorizations expired after a capture attempt of unknown outcome", unknown)
+        return expired
+
+    def run_pending(self):
+        results = collections.Counter()
+        self.expire()
+        while True:
+            with self._lock:
+                batch = self.due(self.batch_size)
+                if not batch:
+                    return results
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE captures SET state = ?, attempts = attempts + 1 WHERE charge_id = ?",
+                        [(CAPTURING, capture.charge_id) for capture in batch]
+                    )
+            outcomes = list(self._executor.map(self._capture, batch))
+            updates = []
+            now = self.clock()
+            for capture, (state, error) in zip(batch, outcomes):
+                attempts = capture.attempts + 1
+                due_at = capture.due_at
+                if state == PENDING:
+                    if attempts >= self.max_attempts:
+                        state = FAILED
+                    else:
+                        due_at = now + self.retry_delay * 2 ** (attempts - 1)
+                if state == FAILED and capture.attempts:
+                    # a refusal now may be Edenred rejecting a second capture of the same authorization
+                    logger.warning("Capture of %s needs reconciliation after %d attempts", capture.charge_id, attempts)
+                    state = UNKNOWN
+                results[state] += 1
+                updates.append((state, error, due_at, now, capture.charge_id))
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    "UPDATE captures SET state = ?, error = ?, due_at = ?, updated_at = ? WHERE charge_id = ?",
+                    updates
+                )
+
+    def run(self, stop_event=None, poll_interval=1.0):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.run_pending()
+            next_due_at = self.next_due_at()
+            wait = poll_interval if next_due_at is None else min(poll_interval, next_due_at - self.clock())
+            stop_event.wait(max(0.0, wait))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _select(self, where, parameters):
+        with self._lock:
+            rows = self._connection.execute("SELECT {} FROM captures WHERE {}".format(COLUMNS, where), parameters)
+            return [ScheduledCapture(*row) for row in rows]
+
+    def _capture(self, capture):
+        card = self.client.retrieve_card(capture.card_token)
+        authorization = Authorization(
+            capture.charge_id, card, self.client.api_provider, amount=capture.authorized_amount
+        )
+        try:
+            authorization.capture(decimal.Decimal(capture.amount), capture.description)
+        except TransactionErrors as error:
+            logger.warning("Capture of %s rejected: %s", capture.charge_id, error.codes)
+            return FAILED, '{}: {}'.format(','.join(error.codes), error.message)
+        except Exception as error:
+            if not is_transient(error):
+                logger.exception("Capture of %s failed", capture.charge_id)
+                return FAILED, repr(error)
+            logger.warning("Capture of %s failed, will retry: %r", capture.charge_id, error)
+            return PENDING, repr(error)
+        return CAPTURED, None
+
+
+def is_transient(error):
+    # only a failed connection or a 5xx may go through on a retry; other HTTP errors, unreadable responses
+    # and bugs would fail the same way again
+    if isinstance(error, InvalidResponse):
+        return False
+    if isinstance(error, APIError):
+        return error.status_code is not None and error.status_code >= 500
+    return is_connection_error(error)
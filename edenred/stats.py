@@ -0,0 +1,10 @@
+import math
+
+
+def percentile(sorted_values, fraction):
+    # nearest rank: the smallest value with at least fraction of the values at or below it; the epsilon
+    # keeps 0.07 * 100 == 7.000000000000001 from rounding up to the next rank
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(fraction * len(sorted_values) - 1e-9))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
@@ -0,0 +1,232 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import BaseRequestHandler, TCPServer, ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import BaseRequestHandler, TCPServer, ThreadingMixIn
+
+CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+class StubPublicKey(object):
+    # the stub reads card fields in clear, like PublicKey(testing=True) without a key file
+    testing = True
+
+    def encrypt(self, data):
+        return data
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _ThreadingTCPServer(ThreadingMixIn, TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def _encode(response):
+    return json.dumps(response).encode('utf-8') if response is not None else b''
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.stub._lock:
+            self.server.stub.connections += 1
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        status, response = stub.handle(self.path, self.headers.get('authorization'), body)
+        content = _encode(response)
+        self.send_response(status)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class H2StubHandler(BaseRequestHandler):
+    # HTTP/2 over plain TCP with prior knowledge (h2c), needs the h2 package. Each stream is answered from
+    # its own thread, so requests multiplexed on one connection are served concurrently.
+    def handle(self):
+        import h2.config
+        import h2.connection
+        import h2.events
+        self.connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+        )
+        self.lock = threading.Lock()
+        with self.server.stub._lock:
+            self.server.stub.connections += 1
+        with self.lock:
+            self.connection.initiate_connection()
+            self.request.sendall(self.connection.data_to_send())
+        streams = {}
+        while True:
+            data = self.request.recv(65535)
+            if not data:
+                return
+            with self.lock:
+                events = self.connection.receive_data(data)
+                self.request.sendall(self.connection.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    streams[event.stream_id] = (dict(event.headers), [])
+                elif isinstance(event, h2.events.DataReceived):
+                    streams[event.stream_id][1].append(event.data)
+                    with self.lock:
+                        self.connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    headers, chunks = streams.pop(event.stream_id)
+                    worker = threading.Thread(target=self.respond, args=(event.stream_id, headers, b''.join(chunks)))
+                    worker.daemon = True
+                    worker.start()
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+
+    def respond(self, stream_id, headers, body):
+        status, response = self.server.stub.handle(headers[':path'], headers.get('authorization'), body)
+        content = _encode(response)
+        with self.lock:
+            self.connection.send_headers(stream_id, [
+                (':status', str(status)), ('content-type', CONTENT_TYPE), ('content-length', str(len(content))),
+            ], end_stream=not content)
+            if content:
+                self.connection.send_data(stream_id, content, end_stream=True)
+            try:
+                self.request.sendall(self.connection.data_to_send())
+            except OSError:
+                # the client went away before this stream was answered
+                pass
+
+
+class StubServer(object):
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, token_ttl=None, http2=False):
+        self.latency = latency
+        self.token_ttl = token_ttl
+        self.logins = 0
+        self.requests = 0
+        self.connections = 0
+        self._tokens = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        if http2:
+            self._server = _ThreadingTCPServer((host, port), H2StubHandler)
+        else:
+            self._server = _ThreadingHTTPServer((host, port), StubHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def serve_forever(self, poll_interval=0.05):
+        self._server.serve_forever(poll_interval=poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def expire_tokens(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def handle(self, path, authorization, body):
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        try:
+            payload = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            return 400, None
+        action = path.rstrip('/').rsplit('/', 1)[-1]
+        with self._lock:
+            self.requests += 1
+            if action == 'Login':
+                self.logins += 1
+                token = 'token-{}'.format(next(self._counter))
+                self._tokens[token] = time.time()
+                return 200, {'Success': True, 'access_token': token, 'ErrorList': None}
+            if not self._valid_token(authorization):
+                return 403, None
+            identifier = str(next(self._counter))
+        return 200, self._respond(action, payload, identifier)
+
+    def _valid_token(self, token):
+        issued = self._tokens.get(token)
+        if issued is None:
+            return False
+        if self.token_ttl is not None and time.time() - issued > self.token_ttl:
+            del self._tokens[token]
+            return False
+        return True
+
+    @staticmethod
+    def _respond(action, payload, identifier):
+        if action == 'Create':
+            return {'Success': True, 'ErrorList': [], 'PaymentMethod': {'CardToken': 'card-' + identifier}}
+        if action in ('Authorize', 'Pay'):
+            return {
+                'Success': True, 'ErrorList': [],
+                action: dict(payload.get(action, {}), AuthorizeIdentifier=identifier)
+            }
+        if action == 'Capture':
+            return {'Success': True, 'ErrorList': [], 'Capture': dict(payload.get('Capture', {}))}
+        if action == 'Refund':
+            return {'Success': True, 'ErrorList': [], 'Pay': dict(payload.get('Pay', {}))}
+        return {'Success': False, 'ErrorList': [{'Code': 'STUB404', 'Message': 'Unknown action'}]}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub of the Edenred payments API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--token-ttl', type=float, default=None)
+    parser.add_argument('--http2', action='store_true', help="serve HTTP/2 with prior knowledge (h2c)")
+    args = parser.parse_args(argv)
+    stub = StubServer(
+        host=args.host, port=args.port, latency=args.latency, token_ttl=args.token_ttl, http2=args.http2
+    )
+    print("Serving Edenred stub on {}".format(stub.url))
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
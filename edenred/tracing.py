@@ -0,0 +1,134 @@
+import contextlib
+import functools
+import threading
+import time
+
+clock = time.perf_counter
+
+_local = threading.local()
+
+
+class Span(object):
+    __slots__ = ('operation', 'started', 'duration', 'phases', 'error', '_stack')
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.started = time.time()
+        self.duration = None
+        self.phases = {}
+        self.error = None
+        self._stack = []
+
+    def add(self, name, elapsed):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @property
+    def unaccounted(self):
+        return self.duration - sum(self.phases.values()) if self.duration is not None else None
+
+    def __repr__(self):  # pragma: no cover
+        return "Span({operation}, duration={duration}, phases={phases})".format(
+            operation=self.operation, duration=self.duration, phases=self.phases
+        )
+
+
+class _Phase(object):
+    __slots__ = ('span', 'name', 'opaque', 'started', 'children')
+
+    def __init__(self, span, name, opaque):
+        self.span = span
+        self.name = name
+        self.opaque = opaque
+        self.children = 0.0
+
+    def __enter__(self):
+        self.span._stack.append(self)
+        self.started = clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = clock() - self.started
+        stack = self.span._stack
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        # phases are exclusive: time spent in nested phases is attributed to them only
+        self.span.add(self.name, elapsed - self.children)
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def current_span():
+    return getattr(_local, 'span', None)
+
+
+def phase(name, opaque=False):
+    span = getattr(_local, 'span', None)
+    if span is None:
+        return _NULL_PHASE
+    stack = span._stack
+    if stack and stack[-1].opaque:
+        return _NULL_PHASE
+    return _Phase(span, name, opaque)
+
+
+class InMemoryCollector(object):
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def collect(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self):
+        with self._lock:
+            del self.spans[:]
+
+
+class Tracer(object):
+    def __init__(self, collector=None):
+        self.collector = collector if collector is not None else InMemoryCollector()
+
+    @contextlib.contextmanager
+    def span(self, operation):
+        parent = current_span()
+        if parent is not None:
+            yield parent
+            return
+        span = Span(operation)
+        _local.span = span
+        started = clock()
+        try:
+            yield span
+        except Exception as error:
+            span.error = error
+            raise
+        finally:
+            span.duration = clock() - started
+            _local.span = None
+            self.collector.collect(span)
+
+
+def traced(method):
+    operation = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = self.tracer
+        if tracer is None:
+            return method(self, *args, **kwargs)
+        with tracer.span(operation):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,242 @@
+import collections
+import logging
+import sys
+import threading
+
+import requests
+import urllib3
+
+from . import protocol, tracing
+from .exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+TransportResponse = collections.namedtuple('TransportResponse', ['status_code', 'reason'])
+
+
+class _TracedHTTPConnection(urllib3.connection.HTTPConnection):
+    def connect(self):
+        with tracing.phase('connect'):
+            return super(_TracedHTTPConnection, self).connect()
+
+
+class _TracedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    def connect(self):
+        with tracing.phase('connect'):
+            return super(_TracedHTTPSConnection, self).connect()
+
+
+class _TracedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        with tracing.phase('pool_wait'):
+            return super(_TracedHTTPConnectionPool, self)._get_conn(timeout)
+
+
+class _TracedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+    def _get_conn(self, timeout=None):
+        with tracing.phase('pool_wait'):
+            return super(_TracedHTTPSConnectionPool, self)._get_conn(timeout)
+
+
+def instrument_pool_manager(pool_manager):
+    pool_manager.pool_classes_by_scheme = {
+        'http': _TracedHTTPConnectionPool,
+        'https': _TracedHTTPSConnectionPool,
+    }
+    return pool_manager
+
+
+def is_connection_error(error):
+    # requests and socket errors are OSErrors and urllib3 raises its own HTTPError; httpx is only
+    # checked once HTTP2Transport has imported it
+    if isinstance(error, (OSError, urllib3.exceptions.HTTPError)):
+        return True
+    httpx = sys.modules.get('httpx')
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+def reset_pools(pool_manager, num_pools):
+    # swap in the pools container a new PoolManager builds instead of calling clear(): its lock, and
+    # those of the pools, may have been held by another thread of the parent at fork time. num_pools
+    # is the one pool_manager was built with.
+    pool_manager.pools = urllib3.PoolManager(num_pools).pools
+    return pool_manager
+
+
+class Transport(object):
+    def post(self, url, headers, payload):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def reset_after_fork(self):
+        pass
+
+    @staticmethod
+    def encode(payload):
+        with tracing.phase('serialize'):
+            return protocol.encode(payload)
+
+    @staticmethod
+    def decode(body):
+        with tracing.phase('decode'):
+            return protocol.decode(body)
+
+
+class RequestsTransport(Transport):
+    # timeout, in seconds, applies to connecting and to each read; None waits forever. num_pools is the
+    # pool_connections of the session's adapters, restored after a fork.
+    def __init__(self, session=None, timeout=None, num_pools=requests.adapters.DEFAULT_POOLSIZE):
+        self.session = session
+        self.timeout = timeout
+        self.num_pools = num_pools
+
+    @classmethod
+    def create_pooled(cls, pool_size=10, timeout=None):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        instrument_pool_manager(adapter.poolmanager)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return cls(session, timeout=timeout, num_pools=1)
+
+    def post(self, url, headers, payload):
+        body = self.encode(payload)
+        try:
+            with tracing.phase('ttfb'):
+                response = (self.session or requests).post(
+                    url,
+                    data=body,
+                    headers=headers,
+                    stream=True,
+                    timeout=self.timeout
+                )
+            with tracing.phase('read'):
+                content = response.content
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as http_error:
+            raise APIError.create_from_http_error(http_error)
+        return self.decode(content)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def reset_after_fork(self):
+        if self.session is None:
+            return
+        for adapter in self.session.adapters.values():
+            if isinstance(adapter, requests.adapters.HTTPAdapter):
+                reset_pools(adapter.poolmanager, self.num_pools)
+                for proxy_manager in adapter.proxy_manager.values():
+                    reset_pools(proxy_manager, self.num_pools)
+
+
+class Urllib3Transport(Transport):
+    # num_pools is the number of hosts the pool manager keeps pools for; give the one a pool_manager passed
+    # in was built with, as it is restored after a fork
+    def __init__(self, pool_manager=None, pool_size=10, timeout=None, num_pools=10):
+        if pool_manager is None:
+            pool_manager = instrument_pool_manager(
+                urllib3.PoolManager(num_pools=num_pools, maxsize=pool_size, block=True)
+            )
+        self.pool_manager = pool_manager
+        self.num_pools = num_pools
+        self.timeout = timeout
+        # without a timeout of its own the transport keeps whatever the pool manager was built with
+        self._request_options = {} if timeout is None else {'timeout': timeout}
+
+    def post(self, url, headers, payload):
+        body = self.encode(payload)
+        with tracing.phase('ttfb'):
+            response = self.pool_manager.request(
+                'POST', url, body=body, headers=headers, preload_content=False, **self._request_options
+            )
+        with tracing.phase('read'):
+            content = response.read()
+            response.release_conn()
+        if response.status >= 400:
+            raise APIError.create_from_response(TransportResponse(response.status, response.reason))
+        return self.decode(content)
+
+    def close(self):
+        self.pool_manager.clear()
+
+    def reset_after_fork(self):
+        reset_pools(self.pool_manager, self.num_pools)
+
+
+class _StreamOpening(object):
+    # holds the transport's lock from the start of a send until httpcore has written the request body,
+    # as reported by the httpx trace extension, or until the send fails
+    def __init__(self, lock):
+        lock.acquire()
+        self._lock = lock
+        self._held = True
+
+    def trace(self, event, info):
+        if event.endswith('send_request_body.complete'):
+            self.release()
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._lock.release()
+
+
+class HTTP2Transport(Transport):
+    # prior_knowledge speaks HTTP/2 to plain http URLs too (h2c), instead of falling back to HTTP/1.1.
+    # Safe to share between threads: httpcore picks a stream id and sends its headers in two steps, so
+    # concurrent sends could open streams out of order and the server would drop the connection. Streams
+    # are opened one at a time, and only the waits for responses overlap.
+    def __init__(self, client=None, prior_knowledge=False, timeout=5.0):
+        self.prior_knowledge = prior_knowledge
+        self._open_lock = threading.Lock()
+        self._owns_client = client is None
+        if client is None:
+            self.timeout = timeout
+            client = self._create_client()
+        else:
+            self.timeout = client.timeout.read
+        self.client = client
+
+    def _create_client(self):
+        import httpx
+        return httpx.Client(http1=not self.prior_knowledge, http2=True, timeout=self.timeout)
+
+    def post(self, url, headers, payload):
+        request = self.client.build_request('POST', url, content=self.encode(payload), headers=headers)
+        opening = _StreamOpening(self._open_lock)
+        request.extensions['trace'] = opening.trace
+        try:
+            with tracing.phase('ttfb'):
+                response = self.client.send(request, stream=True)
+        finally:
+            opening.release()
+        try:
+            with tracing.phase('read'):
+                content = response.read()
+        finally:
+            response.close()
+        if response.status_code >= 400:
+            raise APIError.create_from_response(TransportResponse(response.status_code, response.reason_phrase))
+        return self.decode(content)
+
+    def close(self):
+        self.client.close()
+
+    def reset_after_fork(self):
+        # an HTTP/2 connection is one multiplexed socket, so the child needs a client of its own
+        self._open_lock = threading.Lock()
+        if self._owns_client:
+            self.client = self._create_client()
+        else:
+            logger.warning("HTTP2Transport with a shared httpx client used across a fork")
+
+
+default_transport = RequestsTransport()
@@ -0,0 +1,81 @@
+# encoding=UTF-8
+from __future__ import unicode_literals
+
+import datetime
+
+from .exceptions import TransactionErrors
+
+# checks that would fail at Edenred anyway, run before encrypting or sending anything
+INVALID_CARD_NUMBER = 'LOCAL01'
+INVALID_EXPIRATION = 'LOCAL02'
+CARD_EXPIRED = 'LOCAL03'
+INVALID_AMOUNT = 'LOCAL04'
+CAPTURE_EXCEEDS_AUTHORIZED = 'LOCAL05'
+
+ERROR_MESSAGES = {
+    INVALID_CARD_NUMBER: "Número de tarjeta inválido",
+    INVALID_EXPIRATION: "Fecha de expiración inválida",
+    CARD_EXPIRED: "Tarjeta expirada",
+    INVALID_AMOUNT: "Monto inválido",
+    CAPTURE_EXCEEDS_AUTHORIZED: "Monto mayor al autorizado",
+}
+
+# Luhn: the value of each digit in an odd position from the right once doubled
+_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+# str.isdigit() also accepts non-ASCII digits such as '١'
+_DIGITS = frozenset('0123456789')
+
+
+@TransactionErrors.register(*ERROR_MESSAGES)
+class ValidationErrors(TransactionErrors):
+    @classmethod
+    def from_codes(cls, codes):
+        return cls([{'Code': code, 'Message': ERROR_MESSAGES[code]} for code in codes])
+
+
+def _is_digits(value):
+    return bool(value) and _DIGITS.issuperset(value)
+
+
+def is_valid_card_number(card_number):
+    if not 12 <= len(card_number) <= 19 or not _is_digits(card_number):
+        return False
+    total = 0
+    for index, digit in enumerate(reversed(card_number)):
+        digit = ord(digit) - 48
+        total += _DOUBLED[digit] if index & 1 else digit
+    return total % 10 == 0
+
+
+def card_errors(card_number, expiration_month, expiration_year, today=None):
+    errors = []
+    if not is_valid_card_number(str(card_number)):
+        errors.append(INVALID_CARD_NUMBER)
+    month, year = str(expiration_month), str(expiration_year)
+    if not (_is_digits(month) and 1 <= int(month) <= 12 and _is_digits(year) and len(year) in (2, 4)):
+        errors.append(INVALID_EXPIRATION)
+    else:
+        today = today or datetime.date.today()
+        year = int(year) + (2000 if len(year) == 2 else 0)
+        # cards are valid through the last day of their expiration month
+        if (year, int(month)) < (today.year, today.month):
+            errors.append(CARD_EXPIRED)
+    return errors
+
+
+def check_card(card_number, expiration_month, expiration_year, today=None):
+    errors = card_errors(card_number, expiration_month, expiration_year, today)
+    if errors:
+        raise ValidationErrors.from_codes(errors)
+
+
+def check_amount(amount):
+    # amount in cents
+    if amount <= 0:
+        raise ValidationErrors.from_codes([INVALID_AMOUNT])
+
+
+def check_capture(amount, authorized_amount):
+    check_amount(amount)
+    if authorized_amount is not None and amount > authorized_amount:
+        raise ValidationErrors.from_codes([CAPTURE_EXCEEDS_AUTHORIZED])
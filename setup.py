@@ -6,9 +6,21 @@ import edenred
 setup(
     name='edenred-payments',
     version=edenred.__VERSION__,
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
-    install_requires=['requests', 'pycrypto'],
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'benchmarks']),
+    # cryptography is the default RSA backend, the others are optional, see edenred.ciphers
+    install_requires=['requests', 'cryptography'],
+    extras_require={
+        'pycryptodome': ['pycryptodome'],
+        'pycryptodomex': ['pycryptodomex'],
+        'http2': ['httpx[http2]'],
+    },
     test_suite='nose.collector',
     tests_require=['nose', 'mock'],
+    entry_points={
+        'console_scripts': [
+            'edenred-migrate-cards = edenred.migrate:main',
+            'edenred-bulk-refund = edenred.refunds:main',
+        ],
+    },
     license="MIT"
 )
@@ -0,0 +1,109 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from edenred.bulk import IndexSet, ResultWriter, load_completed, read_records
+
+
+class BulkTestMixin(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='edenred-bulk-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+
+class TestReadRecords(BulkTestMixin, unittest.TestCase):
+    def test_csv(self):
+        path = self.write_file('cards.csv', u"user_id,amount\n1,10.00\n2,5.50\n")
+
+        self.assertEqual(
+            [{'user_id': '1', 'amount': '10.00'}, {'user_id': '2', 'amount': '5.50'}],
+            list(read_records(path))
+        )
+
+    def test_jsonl(self):
+        path = self.write_file('cards.jsonl', u'{"user_id": 1}\n\n{"user_id": 2}\n')
+
+        self.assertEqual([{'user_id': 1}, {'user_id': 2}], list(read_records(path)))
+
+    def test_explicit_format(self):
+        path = self.write_file('cards.txt', u'{"user_id": 1}\n')
+
+        self.assertEqual([{'user_id': 1}], list(read_records(path, format='jsonl')))
+
+    def test_unsupported_format(self):
+        path = self.write_file('cards.xml', u'')
+
+        with self.assertRaises(ValueError):
+            list(read_records(path))
+
+
+class TestIndexSet(unittest.TestCase):
+    def test_add_contains(self):
+        indices = IndexSet()
+        for index in (0, 7, 8, 1000003):
+            indices.add(index)
+
+        for index in (0, 7, 8, 1000003):
+            self.assertIn(index, indices)
+        for index in (1, 9, 1000002, 5000000):
+            self.assertNotIn(index, indices)
+
+
+class TestLoadCompleted(BulkTestMixin, unittest.TestCase):
+    def test_missing_file(self):
+        self.assertEqual(set(), load_completed(os.path.join(self.directory, 'missing.jsonl'), 'index'))
+
+    def test_truncated_line(self):
+        path = self.write_file('output.jsonl', u'{"index": 1}\n{"index": 2}\n{"ind')
+
+        self.assertEqual({1, 2}, load_completed(path, 'index'))
+
+    def test_values(self):
+        path = self.write_file('output.jsonl', u'{"id": "a", "amount": "1.00"}\n{"id": "b", "amount": "2.00"}\n')
+
+        self.assertEqual({'a': '1.00', 'b': '2.00'}, load_completed(path, 'id', value='amount'))
+
+    def test_index_set(self):
+        path = self.write_file('output.jsonl', u'{"index": 3}\n')
+
+        completed = load_completed(path, 'index', IndexSet())
+
+        self.assertIsInstance(completed, IndexSet)
+        self.assertIn(3, completed)
+
+
+class TestResultWriter(BulkTestMixin, unittest.TestCase):
+    def read_lines(self, path):
+        with io.open(path, 'r', encoding='utf-8') as results:
+            return results.read().splitlines()
+
+    def test_write(self):
+        path = os.path.join(self.directory, 'output.jsonl')
+
+        with ResultWriter(path) as writer:
+            writer.write({'index': 1, 'card_token': 'card-1'})
+            writer.write({'index': 2, 'card_token': 'card-2'})
+
+        self.assertEqual(2, writer.count)
+        self.assertEqual([{'index': 1, 'card_token': 'card-1'}, {'index': 2, 'card_token': 'card-2'}],
+                         [json.loads(line) for line in self.read_lines(path)])
+
+    def test_append_after_truncated_line(self):
+        path = self.write_file('output.jsonl', u'{"index": 1}\n{"ind')
+
+        with ResultWriter(path) as writer:
+            writer.write({'index': 2})
+
+        self.assertEqual(['{"index": 1}', '{"ind', '{"index": 2}'], self.read_lines(path))
+        self.assertEqual({1, 2}, load_completed(path, 'index'))
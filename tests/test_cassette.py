@@ -0,0 +1,192 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred import cassette
+from edenred.cassette import RecordingTransport, Replayer, ReplayTransport
+from edenred.client import Edenred
+from edenred.exceptions import APIError, InvalidResponse
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey, StubServer
+from edenred.transport import Urllib3Transport
+
+CARD_NUMBER = '4111111111111111'
+
+
+class TestEndpoint(unittest.TestCase):
+    def test_endpoint(self):
+        self.assertEqual('Login', cassette.endpoint('https://edenred/api/Login'))
+        self.assertEqual('Payment/Pay', cassette.endpoint('https://edenred/api/Payment/Pay/'))
+        self.assertEqual('Payment/Refund', cassette.endpoint('https://edenred/api/Payment/123/Refund'))
+
+
+class CassetteMixin(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def record(self, name):
+        path = os.path.join(self.directory, name)
+        with StubServer() as stub:
+            transport = RecordingTransport(Urllib3Transport(), path, chunk_size=2)
+            provider = APIProvider(
+                client_id='id', client_secret='secret', base_url=stub.url, public_key=StubPublicKey(),
+                transport=transport
+            )
+            card = Edenred(provider).register_card(CARD_NUMBER, '123', '12', '2099', 'user', '1')
+            authorization = card.authorize('10.00', 'order')
+            stub.expire_tokens()
+            charge = authorization.capture('10.00', 'order')
+            charge.refund('5.00', 'order')
+            card.capture('1.00', 'order')
+            transport.close()
+        self.assertEqual(8, transport.recorded)
+        return path
+
+
+class TestRecordingTransport(CassetteMixin, unittest.TestCase):
+    def test_record(self):
+        path = self.record('cassette.jsonl')
+
+        entries = cassette.read_cassette(path)
+        self.assertEqual(
+            ['Login', 'PaymentMethod/Create', 'Payment/Authorize', 'Payment/Capture', 'Login', 'Payment/Capture',
+             'Payment/Refund', 'Payment/Pay'],
+            [entry['endpoint'] for entry in entries]
+        )
+        self.assertEqual([200, 200, 200, 403, 200, 200, 200, 200], [entry['status'] for entry in entries])
+        self.assertEqual(sorted(entry['at'] for entry in entries), [entry['at'] for entry in entries])
+        self.assertTrue(all(entry['elapsed'] >= 0 for entry in entries))
+        with open(path) as recorded:
+            content = recorded.read()
+        for secret in (CARD_NUMBER, 'secret', 'token-1', 'card-'):
+            self.assertNotIn(secret, content)
+        self.assertEqual(0o600, os.stat(path).st_mode & 0o777)
+
+    def test_record_gzip(self):
+        path = self.record('cassette.jsonl.gz')
+
+        self.assertEqual(8, len(cassette.read_cassette(path)))
+
+    def test_record_api_error(self):
+        transport = mock.Mock()
+        transport.post.side_effect = APIError(503, 'Service Unavailable')
+        path = os.path.join(self.directory, 'errors.jsonl')
+        recording = RecordingTransport(transport, path)
+
+        with self.assertRaises(APIError):
+            recording.post('http://edenred/Payment/Pay', {}, {'Pay': {'Amount': 100}})
+        recording.close()
+
+        entry, = cassette.read_cassette(path)
+        self.assertEqual(503, entry['status'])
+        self.assertEqual('Service Unavailable', entry['reason'])
+        self.assertNotIn('response', entry)
+
+
+class TestReplayTransport(unittest.TestCase):
+    ENTRIES = [
+        {'endpoint': 'Payment/Pay', 'status': 200, 'elapsed': 0.1,
+         'response': {'Success': True, 'ErrorList': [], 'Pay': {'AuthorizeIdentifier': '1'}}},
+        {'endpoint': 'Payment/Pay', 'status': 503, 'reason': 'Service Unavailable', 'elapsed': 0.1},
+    ]
+
+    def test_replay_in_order(self):
+        transport = ReplayTransport(self.ENTRIES)
+
+        self.assertEqual('1', transport.post('http://x/Payment/Pay', {}, {})['Pay']['AuthorizeIdentifier'])
+        with self.assertRaises(APIError) as context:
+            transport.post('http://x/Payment/Pay', {}, {})
+        self.assertEqual(503, context.exception.status_code)
+        with self.assertRaises(InvalidResponse):
+            transport.post('http://x/Payment/Pay', {}, {})
+        with self.assertRaises(InvalidResponse):
+            transport.post('http://x/Payment/Refund', {}, {})
+
+    def test_loop(self):
+        transport = ReplayTransport(self.ENTRIES[:1], loop=True)
+
+        for _ in range(3):
+            transport.post('http://x/Payment/Pay', {}, {})
+
+    def test_recorded_latency(self):
+        transport = ReplayTransport(self.ENTRIES[:1], latency=True, speed=2.0)
+
+        started = time.time()
+        transport.post('http://x/Payment/Pay', {}, {})
+
+        self.assertGreaterEqual(time.time() - started, 0.045)
+
+    def test_responses_are_copies(self):
+        transport = ReplayTransport(self.ENTRIES[:1], loop=True)
+
+        transport.post('http://x/Payment/Pay', {}, {})['Pay']['AuthorizeIdentifier'] = 'changed'
+
+        self.assertEqual('1', transport.post('http://x/Payment/Pay', {}, {})['Pay']['AuthorizeIdentifier'])
+
+
+class TestReplayer(CassetteMixin, unittest.TestCase):
+    def replay(self, path, **kwargs):
+        entries = cassette.read_cassette(path)
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='replay://edenred', public_key=StubPublicKey(),
+            access_token='replay', transport=ReplayTransport(entries)
+        )
+        return provider, Replayer(provider, entries).run(**kwargs)
+
+    def test_replay(self):
+        path = self.record('cassette.jsonl')
+
+        provider, stats = self.replay(path, concurrency=1)
+
+        summary = stats.summary()
+        self.assertEqual(5, summary['operations'])
+        self.assertEqual(['register', 'authorize', 'capture', 'pay', 'refund'], list(summary['by_operation']))
+        self.assertTrue(all(not entry['errors'] for entry in summary['by_operation'].values()))
+        # the recorded 403 is answered again and costs the same Login
+        self.assertEqual(1, provider.token_renewals)
+
+    def test_replay_recorded_timing(self):
+        entries = [
+            {'endpoint': 'Payment/Pay', 'at': 10.0 + index * 0.05, 'elapsed': 0.0, 'status': 200,
+             'request': {'Pay': {}}, 'response': {'Success': True, 'ErrorList': [], 'Pay': {}}}
+            for index in range(4)
+        ]
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='replay://edenred', public_key=StubPublicKey(),
+            access_token='replay', transport=ReplayTransport(entries)
+        )
+
+        stats = Replayer(provider, entries).run(timing='recorded', concurrency=2)
+
+        self.assertGreaterEqual(stats.finished - stats.started, 0.14)
+        self.assertEqual(4, len(stats.latencies['pay']))
+
+    def test_replay_transaction_errors(self):
+        entries = [{
+            'endpoint': 'Payment/Pay', 'at': 0.0, 'elapsed': 0.0, 'status': 200, 'request': {'Pay': {}},
+            'response': {'Success': False, 'ErrorList': [{'Code': 'ER101', 'Message': 'Saldo'}]},
+        }]
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='replay://edenred', public_key=StubPublicKey(),
+            access_token='replay', transport=ReplayTransport(entries)
+        )
+
+        stats = Replayer(provider, entries).run()
+
+        self.assertEqual({'ER101': 1}, dict(stats.errors['pay']))
+
+    @mock.patch('edenred.cassette.print', create=True)
+    def test_main(self, print):
+        path = self.record('cassette.jsonl.gz')
+
+        self.assertEqual(0, cassette.main([path, '--repeat', '3', '--concurrency', '4']))
+
+        output = print.call_args[0][0]
+        self.assertIn('total 15 operations', output)
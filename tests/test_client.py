@@ -6,7 +6,9 @@ try:
 except ImportError:
     import mock
 
+from edenred import validation
 from edenred.client import Edenred, Card, Authorization, Charge, Refund, cents_to_decimal, amount_in_cents
+from edenred.exceptions import TransactionErrors
 from edenred.provider import APIProvider
 
 
@@ -98,6 +100,21 @@ class TestClient(unittest.TestCase):
         )
         self.assertEqual(create_client.return_value, result)
 
+    @mock.patch('edenred.client.Profiler')
+    @mock.patch('edenred.client.Edenred.create_client')
+    def test_factore_create_from_env_profiling(self, create_client, Profiler):
+        environ = {
+            'EDENREDPAYMENTS_ID': 'client_id',
+            'EDENREDPAYMENTS_SECRET': 'client_secret',
+            'EDENREDPAYMENTS_PUBLIC_KEY': 'public_key_path',
+            'EDENREDPAYMENTS_URL': 'base_url',
+        }
+
+        with mock.patch.dict('edenred.client.os.environ', environ):
+            result = Edenred.create_client_from_env()
+
+        self.assertEqual(Profiler.create_from_env.return_value, result.api_provider.profiler)
+
     @mock.patch('edenred.client.PublicKey')
     @mock.patch('edenred.client.APIProvider')
     def test_factory_create(self, APIProvider, PublicKey):
@@ -140,10 +157,10 @@ class TestClient(unittest.TestCase):
         self.assertEqual(expected, client)
 
     def test_register_card(self):
-        card_number = mock.Mock()
-        cvv = mock.Mock()
-        expiration_month = mock.Mock()
-        expiration_year = mock.Mock()
+        card_number = '4111111111111111'
+        cvv = '123'
+        expiration_month = '12'
+        expiration_year = '2099'
         username = mock.Mock()
         user_id = mock.Mock()
         card_token = mock.Mock()
@@ -186,11 +203,18 @@ class TestCard(unittest.TestCase):
 
     def test_retrieve_authorization(self):
         charge_id = mock.Mock()
-        expected = Authorization(charge_id, self.card_token, self.provider)
         card = Card(self.card_token, self.provider)
+        expected = Authorization(charge_id, card, self.provider)
 
         self.assertEqual(expected, card.retrieve_authorization(charge_id))
 
+    def test_retrieve_charge(self):
+        charge_id = mock.Mock()
+        card = Card(self.card_token, self.provider)
+        expected = Charge(charge_id, card, self.provider)
+
+        self.assertEqual(expected, card.retrieve_charge(charge_id))
+
     def test_authorize(self):
         card = Card(self.card_token, self.provider)
         charge_id = mock.Mock()
@@ -253,6 +277,57 @@ class TestAuthorization(unittest.TestCase):
         )
 
 
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.provider = mock.Mock(spec=APIProvider)
+        self.client = Edenred(self.provider)
+        self.card = Card('token', self.provider)
+
+    def assert_rejected(self, code, function, *args):
+        with self.assertRaises(TransactionErrors) as context:
+            function(*args)
+        self.assertEqual((code,), context.exception.codes)
+
+    def test_register_card(self):
+        self.assert_rejected(
+            validation.INVALID_CARD_NUMBER, self.client.register_card, '4111111111111112', '123', '12', '2099',
+            'user', '1'
+        )
+        self.assert_rejected(
+            validation.CARD_EXPIRED, self.client.register_card, '4111111111111111', '123', '12', '2001', 'user', '1'
+        )
+        self.provider.create_payment_method.assert_not_called()
+
+    def test_amounts(self):
+        self.assert_rejected(validation.INVALID_AMOUNT, self.card.authorize, '0', 'description')
+        self.assert_rejected(validation.INVALID_AMOUNT, self.card.capture, '-1.00', 'description')
+        self.assert_rejected(
+            validation.INVALID_AMOUNT, Charge('1', self.card, self.provider).refund, '0.001', 'description'
+        )
+        self.provider.authorize.assert_not_called()
+        self.provider.pay.assert_not_called()
+        self.provider.refund.assert_not_called()
+
+    def test_capture_more_than_authorized(self):
+        self.provider.authorize.return_value = {'AuthorizeIdentifier': '1'}
+        authorization = self.card.authorize('10.00', 'description')
+
+        self.assertEqual(1000, authorization.amount)
+        self.assert_rejected(validation.CAPTURE_EXCEEDS_AUTHORIZED, authorization.capture, '10.01', 'description')
+        self.provider.capture.assert_not_called()
+
+        self.provider.capture.return_value = {'AuthorizeIdentifier': '1'}
+        authorization.capture('10.00', 'description')
+
+    def test_disabled(self):
+        self.provider.validate = False
+        self.provider.authorize.return_value = {'AuthorizeIdentifier': '1'}
+
+        self.card.authorize('0', 'description')
+
+        self.provider.authorize.assert_called_once_with(card_token='token', amount=0, description='description')
+
+
 class TestRefund(unittest.TestCase):
     def setUp(self):
         self.provider = mock.Mock(spec=APIProvider)
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from concurrent import futures
+
+from edenred.client import Edenred
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey, StubServer
+from edenred.transport import RequestsTransport, Urllib3Transport
+
+THREADS = 16
+
+
+def run_threads(function, count=THREADS):
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        return function(index)
+    with futures.ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(run, range(count)))
+
+
+class TestTokenRenewal(unittest.TestCase):
+    def setUp(self):
+        self.logins = []
+
+        def create_access_token(**kwargs):
+            time.sleep(0.05)
+            self.logins.append(kwargs)
+            return 'token-{}'.format(len(self.logins))
+        patcher = mock.patch.object(APIProvider, 'create_access_token', side_effect=create_access_token)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_provider(self, access_token=None):
+        return APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=StubPublicKey(),
+            access_token=access_token
+        )
+
+    def test_first_login_single_flight(self):
+        provider = self.create_provider()
+
+        headers = run_threads(lambda index: provider._get_headers())
+
+        self.assertEqual(1, len(self.logins))
+        self.assertEqual(1, provider.token_renewals)
+        self.assertEqual({'token-1'}, {header['authorization'] for header in headers})
+
+    def test_stale_renewal_single_flight(self):
+        provider = self.create_provider(access_token='expired')
+
+        run_threads(lambda index: provider.update_token(stale_token='expired'))
+
+        self.assertEqual(1, len(self.logins))
+        self.assertEqual('token-1', provider.access_token)
+
+    def test_forced_renewal(self):
+        provider = self.create_provider(access_token='token')
+
+        provider.update_token()
+        provider.update_token()
+
+        self.assertEqual(2, len(self.logins))
+
+
+class TestSharedClientStress(unittest.TestCase):
+    OPERATIONS = 30
+    TOKEN_TTL = 0.5
+
+    def stress(self, transport):
+        # every token lives TOKEN_TTL from its Login, well above a request round trip, so the one
+        # retry after a renewal always finds a valid token
+        with StubServer(latency=0.001, token_ttl=self.TOKEN_TTL) as stub:
+            provider = APIProvider(
+                client_id='id', client_secret='secret', base_url=stub.url, public_key=StubPublicKey(),
+                transport=transport
+            )
+            client = Edenred(provider)
+            card = client.register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+
+            def work(index):
+                for operation in range(self.OPERATIONS):
+                    authorization = card.authorize('1.00', 'stress {}'.format(index))
+                    charge = authorization.capture('1.00', 'stress')
+                    if operation % 5 == 0:
+                        charge.refund('1.00', 'stress')
+                return index
+
+            started = time.time()
+            try:
+                results = run_threads(work)
+            finally:
+                transport.close()
+            elapsed = time.time() - started
+
+        self.assertEqual(list(range(THREADS)), results)
+        self.assertGreater(provider.token_renewals, 1)
+        # one Login per expiry at most, however many threads saw the 403
+        self.assertEqual(stub.logins, provider.token_renewals)
+        self.assertLessEqual(provider.token_renewals, elapsed / self.TOKEN_TTL + 2)
+
+    def test_requests_transport(self):
+        self.stress(RequestsTransport.create_pooled(pool_size=THREADS))
+
+    def test_urllib3_transport(self):
+        self.stress(Urllib3Transport(pool_size=THREADS))
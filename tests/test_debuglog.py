@@ -0,0 +1,105 @@
+import logging
+import os
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred import provider as provider_module
+from edenred.debuglog import DebugLog, Redacted
+from edenred.provider import APIProvider
+from edenred.redaction import Redactor
+from edenred.stubserver import StubPublicKey
+
+
+class TestDebugLog(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('edenred.tests.debuglog')
+        self.logger.setLevel(logging.DEBUG)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+
+    def test_invalid_sample_rate(self):
+        with self.assertRaises(ValueError):
+            DebugLog(self.logger, sample_rate=1.5)
+
+    def test_sample(self):
+        draws = iter([0.05, 0.5])
+        debug_log = DebugLog(self.logger, sample_rate=0.1, random=lambda: next(draws))
+
+        self.assertTrue(debug_log.sample())
+        self.assertFalse(debug_log.sample())
+
+    def test_sample_disabled_level(self):
+        random = mock.Mock()
+        self.logger.setLevel(logging.INFO)
+
+        self.assertFalse(DebugLog(self.logger, random=random).sample())
+        self.assertFalse(DebugLog(self.logger, sample_rate=0.5, random=random).sample())
+        random.assert_not_called()
+
+    @mock.patch.dict(os.environ, {'EDENREDPAYMENTS_DEBUG_SAMPLE_RATE': '0.25'})
+    def test_create_from_env(self):
+        self.assertEqual(0.25, DebugLog.create_from_env(self.logger).sample_rate)
+
+    def test_redacted_record(self):
+        debug_log = DebugLog(self.logger, redactor=Redactor(key=b'key'))
+
+        with self.assertLogs(self.logger, logging.DEBUG) as logs:
+            debug_log.request('http://edenred/Payment/Pay', {'Pay': {'CardToken': 'card-1', 'Amount': 100}})
+
+        record, = logs.records
+        self.assertNotIn('card-1', logs.output[0])
+        self.assertIn('"Amount":100', logs.output[0])
+        self.assertEqual('request', record.edenred_event)
+        self.assertEqual('http://edenred/Payment/Pay', record.edenred_url)
+        self.assertEqual(100, record.edenred_payload.to_dict()['Pay']['Amount'])
+
+    def test_formats_lazily(self):
+        redactor = mock.Mock(spec=Redactor)
+        handler = logging.Handler()
+        handler.emit = mock.Mock()
+        self.logger.addHandler(handler)
+        self.logger.propagate = False
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+        DebugLog(self.logger, redactor=redactor).response('url', {'Success': True})
+
+        redactor.redact.assert_not_called()
+        handler.emit.assert_called_once_with(mock.ANY)
+
+    def test_str(self):
+        self.assertEqual('{"a":1}', str(Redacted({'a': 1}, Redactor())))
+
+
+class TestProviderDebugLog(unittest.TestCase):
+    def setUp(self):
+        self.transport = mock.Mock()
+        self.provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='http://edenred', public_key=StubPublicKey(),
+            transport=self.transport
+        )
+        self.transport.post.side_effect = [
+            {'Success': True, 'access_token': 'token-1', 'ErrorList': None},
+            {'Success': True, 'ErrorList': [], 'Pay': {'AuthorizeIdentifier': '1', 'CardToken': 'card-1'}},
+        ]
+
+    def test_logs_redacted_exchange(self):
+        with self.assertLogs('edenred.provider', logging.DEBUG) as logs:
+            self.provider.pay('card-1', 100, 'order')
+
+        output = '\n'.join(logs.output)
+        for secret in ('card-1', 'secret', 'token-1'):
+            self.assertNotIn(secret, output)
+        self.assertEqual(
+            ['request', 'request', 'response'],
+            [record.edenred_event for record in logs.records if hasattr(record, 'edenred_event')]
+        )
+
+    def test_sampled_out(self):
+        with mock.patch.object(provider_module.debug_log, 'sample_rate', 0.0), \
+                self.assertLogs('edenred.provider', logging.DEBUG) as logs:
+            self.provider.pay('card-1', 100, 'order')
+
+        self.assertFalse(any(hasattr(record, 'edenred_event') for record in logs.records))
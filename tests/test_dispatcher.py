@@ -0,0 +1,243 @@
+import threading
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from concurrent import futures
+
+from edenred.client import Authorization, Card, Charge, Edenred
+from edenred.dispatcher import PAYMENT, REFUND, REGISTRATION, Dispatcher, PriorityDispatcher
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+
+def submit_racing_shutdown(dispatcher, submit):
+    # shutdown(wait=False) runs between the shutdown check in submit and the put, so the call is
+    # queued behind the sentinels
+    put = dispatcher._queue.put
+
+    def racing_put(item, **kwargs):
+        dispatcher.shutdown(wait=False)
+        put(item, **kwargs)
+    with mock.patch.object(dispatcher._queue, 'put', side_effect=racing_put):
+        future = submit()
+    for worker in dispatcher._workers:
+        worker.join(timeout=1)
+    return future
+
+
+class TestDispatcher(unittest.TestCase):
+    def test_init_invalid(self):
+        with self.assertRaises(ValueError):
+            Dispatcher(max_in_flight=0)
+
+    def test_submit(self):
+        function = mock.Mock()
+
+        with Dispatcher(max_in_flight=2) as dispatcher:
+            future = dispatcher.submit(function, 1, key='value')
+
+            self.assertEqual(function.return_value, future.result(timeout=1))
+        function.assert_called_once_with(1, key='value')
+
+    def test_submit_exception(self):
+        with Dispatcher(max_in_flight=1) as dispatcher:
+            future = dispatcher.submit(mock.Mock(side_effect=ValueError))
+
+            with self.assertRaises(ValueError):
+                future.result(timeout=1)
+
+    def test_submit_after_shutdown(self):
+        dispatcher = Dispatcher(max_in_flight=1)
+        dispatcher.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit(mock.Mock())
+
+    def test_submit_racing_shutdown(self):
+        function = mock.Mock()
+        dispatcher = Dispatcher(max_in_flight=2)
+
+        future = submit_racing_shutdown(dispatcher, lambda: dispatcher.submit(function))
+
+        with self.assertRaises(futures.CancelledError):
+            future.result(timeout=1)
+        function.assert_not_called()
+
+    def test_bounded_in_flight(self):
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def call():
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.01)
+            with lock:
+                state['current'] -= 1
+
+        with Dispatcher(max_in_flight=3, max_queued=100) as dispatcher:
+            results = [dispatcher.submit(call) for _ in range(30)]
+        for future in results:
+            future.result()
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_backpressure(self):
+        release = threading.Event()
+        dispatcher = Dispatcher(max_in_flight=1, max_queued=1, submit_timeout=0.05)
+        dispatcher.submit(release.wait)
+        time.sleep(0.05)
+        dispatcher.submit(mock.Mock())
+
+        with self.assertRaises(queue.Full):
+            dispatcher.submit(mock.Mock())
+        release.set()
+        dispatcher.shutdown()
+
+    def test_shutdown_drains(self):
+        function = mock.Mock()
+        dispatcher = Dispatcher(max_in_flight=1, max_queued=50)
+        results = [dispatcher.submit(function) for _ in range(20)]
+
+        dispatcher.shutdown(wait=True)
+
+        self.assertTrue(all(future.done() for future in results))
+        self.assertEqual(20, function.call_count)
+        self.assertEqual(0, dispatcher.in_flight)
+
+    def test_cancelled_future_skipped(self):
+        release = threading.Event()
+        function = mock.Mock()
+        dispatcher = Dispatcher(max_in_flight=1)
+        dispatcher.submit(release.wait)
+        future = dispatcher.submit(function)
+
+        self.assertTrue(future.cancel())
+        release.set()
+        dispatcher.shutdown()
+        function.assert_not_called()
+
+    def test_client_operations(self):
+        card = mock.Mock(spec=Card)
+        authorization = mock.Mock(spec=Authorization)
+
+        with Dispatcher(max_in_flight=2) as dispatcher:
+            authorized = dispatcher.authorize(card, 10, 'description')
+            charged = dispatcher.capture(card, 10, 'description')
+            captured = dispatcher.capture_authorization(authorization, 10, 'description')
+
+        self.assertEqual(card.authorize.return_value, authorized.result())
+        self.assertEqual(card.capture.return_value, charged.result())
+        self.assertEqual(authorization.capture.return_value, captured.result())
+        card.authorize.assert_called_once_with(10, 'description')
+        card.capture.assert_called_once_with(10, 'description')
+        authorization.capture.assert_called_once_with(10, 'description')
+
+
+class TestPriorityDispatcher(unittest.TestCase):
+    def run_blocked(self, dispatcher, submissions, hold=0.0):
+        # hold the only worker until everything is queued, then record the execution order
+        gate = threading.Event()
+        order = []
+        dispatcher.submit_to(PAYMENT, gate.wait)
+        time.sleep(0.05)
+        results = [dispatcher.submit_to(priority, order.append, name) for priority, name in submissions]
+        time.sleep(hold)
+        gate.set()
+        for future in results:
+            future.result(timeout=1)
+        return order
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            PriorityDispatcher(weights={PAYMENT: 0})
+        with self.assertRaises(ValueError):
+            PriorityDispatcher(default_priority='other')
+
+    def test_payments_first(self):
+        submissions = [(REGISTRATION, 'register')] * 3 + [(REFUND, 'refund')] * 2 + [(PAYMENT, 'pay')] * 5
+
+        with PriorityDispatcher(max_in_flight=1) as dispatcher:
+            order = self.run_blocked(dispatcher, submissions)
+
+        self.assertEqual(['pay'] * 5 + ['refund'] * 2 + ['register'] * 3, order)
+
+    def test_background_not_starved(self):
+        submissions = [(REGISTRATION, 'register')] * 4 + [(PAYMENT, 'pay')] * 64
+
+        with PriorityDispatcher(max_in_flight=1, max_queued=100) as dispatcher:
+            order = self.run_blocked(dispatcher, submissions)
+
+        positions = [index for index, name in enumerate(order) if name == 'register']
+        # one registration per 16 payments while payments are backlogged, counting the gate call
+        self.assertEqual([15, 32, 49, 66], positions)
+
+    def test_queue_stats(self):
+        with PriorityDispatcher(max_in_flight=1) as dispatcher:
+            self.run_blocked(dispatcher, [(REFUND, 'refund'), (PAYMENT, 'pay')], hold=0.05)
+            stats = dispatcher.queue_stats
+
+        self.assertEqual(2, stats[PAYMENT].count)
+        self.assertEqual(1, stats[REFUND].count)
+        self.assertEqual(0, stats[REGISTRATION].count)
+        self.assertGreater(stats[REFUND].max_wait, 0.04)
+        self.assertGreater(stats[REFUND].mean_wait, 0.04)
+
+    def test_bounded_per_class(self):
+        gate = threading.Event()
+        with PriorityDispatcher(max_in_flight=1, max_queued=1, submit_timeout=0.01) as dispatcher:
+            dispatcher.submit_to(PAYMENT, gate.wait)
+            time.sleep(0.05)
+            dispatcher.submit(mock.Mock())
+            with self.assertRaises(queue.Full):
+                dispatcher.submit(mock.Mock())
+
+            dispatcher.submit_to(PAYMENT, mock.Mock())
+            self.assertEqual(1, dispatcher.queued_for(REGISTRATION))
+            self.assertEqual(2, dispatcher.queued)
+            gate.set()
+
+    def test_shutdown_drains(self):
+        function = mock.Mock()
+        dispatcher = PriorityDispatcher(max_in_flight=2)
+        futures = [dispatcher.submit(function) for _ in range(5)] + [dispatcher.submit_to(PAYMENT, function)]
+
+        dispatcher.shutdown(wait=True)
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(6, function.call_count)
+
+    def test_submit_racing_shutdown(self):
+        function = mock.Mock()
+        dispatcher = PriorityDispatcher(max_in_flight=2)
+
+        future = submit_racing_shutdown(dispatcher, lambda: dispatcher.submit_to(REFUND, function))
+
+        with self.assertRaises(futures.CancelledError):
+            future.result(timeout=1)
+        function.assert_not_called()
+
+    def test_helpers(self):
+        card = mock.Mock(spec=Card)
+        authorization = mock.Mock(spec=Authorization)
+        charge = mock.Mock(spec=Charge)
+        client = mock.Mock(spec=Edenred)
+
+        with PriorityDispatcher(max_in_flight=1) as dispatcher:
+            dispatcher.authorize(card, '1.00', 'order').result(timeout=1)
+            dispatcher.capture_authorization(authorization, '1.00', 'order').result(timeout=1)
+            dispatcher.refund(charge, '1.00', 'order').result(timeout=1)
+            dispatcher.register_card(client, '4111', '123', '12', '2099', 'user', '1').result(timeout=1)
+            stats = dispatcher.queue_stats
+
+        card.authorize.assert_called_once_with('1.00', 'order')
+        authorization.capture.assert_called_once_with('1.00', 'order')
+        charge.refund.assert_called_once_with('1.00', 'order')
+        client.register_card.assert_called_once_with('4111', '123', '12', '2099', 'user', '1')
+        self.assertEqual((2, 1, 1), (stats[PAYMENT].count, stats[REFUND].count, stats[REGISTRATION].count))
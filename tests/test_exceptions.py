@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 try:
@@ -5,43 +6,135 @@ try:
 except ImportError:
     import mock
 
-from edenred.exceptions import APIError, InvalidCredentials, Unauthorized
+from edenred.exceptions import APIError, InvalidCredentials, Unauthorized, TransactionErrors
 
 
 class TestCreateAPIError(unittest.TestCase):
-    def assert_error(self, error, response, description, cls=APIError):
+    def assert_error(self, error, status_code, description, cls=APIError):
         self.assertIsInstance(error, cls)
-        self.assertEqual(response, error.response)
+        self.assertEqual(status_code, error.status_code)
         self.assertEqual(description, error.description)
+        self.assertEqual((status_code, description), error.response)
+        self.assertIsNot(self.response, error.response)
 
     def setUp(self):
-        self.response = mock.Mock()
+        self.response = mock.Mock(status_code=500)
         self.http_error = mock.Mock()
         self.http_error.response = self.response
 
     def test_init(self):
         description = mock.Mock()
-        error = APIError(self.response, description)
+        error = APIError(self.response.status_code, description)
 
-        self.assertEqual(self.response, error.response)
         self.assertEqual(description, error.description)
         self.assertEqual(self.response.status_code, error.status_code)
 
+    def test_init_from_response(self):
+        self.response.status_code = 502
+
+        error = APIError(self.response, 'Bad Gateway')
+
+        self.assert_error(error, 502, 'Bad Gateway')
+        self.assertEqual((502, 'Bad Gateway'), error.args)
+
+    def test_subclass_init_from_response(self):
+        self.response.status_code = 403
+
+        self.assert_error(Unauthorized(self.response), 403, 'Unauthorized', Unauthorized)
+
     def test_create_from_403(self):
         self.response.status_code = 403
 
         error = APIError.create_from_http_error(self.http_error)
 
-        self.assert_error(error, self.response, 'Unauthorized', Unauthorized)
+        self.assert_error(error, 403, 'Unauthorized', Unauthorized)
 
     def test_create_from_401(self):
         self.response.status_code = 401
 
         error = APIError.create_from_http_error(self.http_error)
 
-        self.assert_error(error, self.response, 'Invalid Credentials', InvalidCredentials)
+        self.assert_error(error, 401, 'Invalid Credentials', InvalidCredentials)
 
     def test_create_from_xxx(self):
         error = APIError.create_from_http_error(self.http_error)
 
-        self.assert_error(error, self.response, self.response.reason)
+        self.assert_error(error, self.response.status_code, self.response.reason)
+
+    def test_create_from_response(self):
+        self.response.status_code = 503
+
+        error = APIError.create_from_response(self.response)
+
+        self.assert_error(error, 503, self.response.reason)
+
+
+class TestTransactionErrors(unittest.TestCase):
+    def setUp(self):
+        self.errors = [
+            {'Code': "ER104", 'Message': "Error 104"},
+            {'Code': "ER101", 'Message': "Error 101"},
+        ]
+
+    def test_init(self):
+        error = TransactionErrors(self.errors)
+
+        self.assertEqual(("ER104", "ER101"), error.codes)
+        self.assertEqual(("Error 101", "ER104", "ER101"), error.args)
+        self.assertEqual(self.errors, error.errors)
+        self.assertEqual({'Success': False, 'ErrorList': self.errors}, error.response)
+
+    def test_init_with_response(self):
+        error = TransactionErrors({'Success': False, 'ErrorList': self.errors}, self.errors)
+
+        self.assertEqual(("ER104", "ER101"), error.codes)
+        self.assertEqual("Error 101", error.message)
+
+    def test_pickle(self):
+        error = pickle.loads(pickle.dumps(TransactionErrors(self.errors)))
+
+        self.assertEqual(("ER104", "ER101"), error.codes)
+        self.assertEqual("Error 101", str(error))
+
+    def test_message_lowest_code(self):
+        error = TransactionErrors(self.errors)
+
+        self.assertEqual("Error 101", error.message)
+        self.assertEqual("Error 101", str(error))
+
+    def test_message_no_errors(self):
+        error = TransactionErrors([])
+
+        self.assertEqual("Error desconocido", error.message)
+        self.assertEqual((), error.codes)
+
+    def test_message_lazy(self):
+        error = TransactionErrors(self.errors)
+
+        self.assertIsNone(error._message)
+        error.message
+        self.assertEqual("Error 101", error._message)
+
+    def test_extract_error_message(self):
+        self.assertEqual("Error 101", TransactionErrors.extract_error_message(self.errors))
+
+    def test_create_unregistered(self):
+        error = TransactionErrors.create(self.errors)
+
+        self.assertIs(TransactionErrors, type(error))
+
+    def test_create_registered(self):
+        @TransactionErrors.register("ER104")
+        class CardBlocked(TransactionErrors):
+            pass
+
+        try:
+            error = TransactionErrors.create(self.errors)
+            message = error.message
+        finally:
+            del TransactionErrors.error_classes["ER104"]
+
+        self.assertIsInstance(error, CardBlocked)
+        self.assertEqual(("ER104", "ER101"), error.codes)
+        # the message comes from the code that picked the class
+        self.assertEqual("Error 104", message)
@@ -0,0 +1,210 @@
+import decimal
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred import fake, protocol
+from edenred.client import Edenred
+from edenred.exceptions import APIError, TransactionErrors
+from edenred.fake import FakeAPIProvider
+from edenred.limiter import AdaptiveLimiter
+from edenred.negativecache import NegativeCache
+from edenred.provider import APIProvider
+from edenred.responses import AuthorizeResult
+from edenred.tracing import Tracer
+
+
+class TestFakeAPIProvider(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakeAPIProvider(balance=10000, seed=1)
+        self.client = Edenred(self.provider)
+        self.card = self.client.register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+
+    def assert_error(self, code, function, *args):
+        with self.assertRaises(TransactionErrors) as context:
+            function(*args)
+        self.assertEqual((code,), context.exception.codes)
+
+    def test_register(self):
+        self.assertIn(self.card.card_token, self.provider.cards)
+        self.assertEqual(10000, self.provider.balance(self.card.card_token))
+
+    def test_authorize_capture_refund(self):
+        authorization = self.card.authorize('30.00', 'order')
+        self.assertEqual(7000, self.provider.balance(self.card.card_token))
+
+        charge = authorization.capture('25.00', 'order')
+        self.assertEqual(7500, self.provider.balance(self.card.card_token))
+
+        refund = charge.refund('5.00', 'order')
+        self.assertEqual(decimal.Decimal('5'), refund.amount)
+        self.assertEqual(8000, self.provider.balance(self.card.card_token))
+
+    def test_returns_records(self):
+        result = self.provider.authorize(self.card.card_token, 100, 'order')
+
+        self.assertIsInstance(result, AuthorizeResult)
+        self.assertEqual(100, result.amount)
+
+    def test_unknown_card(self):
+        self.assert_error(fake.CARD_NOT_FOUND, self.client.retrieve_card('unknown').authorize, '1.00', 'order')
+
+    def test_added_card(self):
+        self.provider.add_card('known', balance=100)
+
+        self.client.retrieve_card('known').capture('1.00', 'order')
+
+        self.assertEqual(0, self.provider.balance('known'))
+
+    def test_insufficient_balance(self):
+        self.assert_error(fake.INSUFFICIENT_BALANCE, self.card.authorize, '100.01', 'order')
+
+    def test_unlimited_balance(self):
+        provider = FakeAPIProvider()
+        card = Edenred(provider).register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+
+        card.capture('1000000.00', 'order')
+
+        self.assertIsNone(provider.balance(card.card_token))
+
+    def test_invalid_amount(self):
+        self.provider.validate = False
+        self.assert_error(fake.INVALID_AMOUNT, self.card.authorize, '0', 'order')
+
+    def test_capture_more_than_authorized(self):
+        self.provider.validate = False
+        authorization = self.card.authorize('10.00', 'order')
+
+        self.assert_error(fake.CAPTURE_EXCEEDS_AUTHORIZED, authorization.capture, '10.01', 'order')
+
+    def test_capture_twice(self):
+        authorization = self.card.authorize('10.00', 'order')
+        authorization.capture('10.00', 'order')
+
+        self.assert_error(fake.ALREADY_CAPTURED, authorization.capture, '10.00', 'order')
+
+    def test_capture_other_card(self):
+        authorization = self.card.authorize('10.00', 'order')
+        other = self.client.register_card('4111111111111111', '123', '12', '2099', 'user', '2')
+
+        self.assert_error(
+            fake.AUTHORIZATION_NOT_FOUND, other.retrieve_authorization(authorization.charge_id).capture,
+            '1.00', 'order'
+        )
+
+    def test_refund_more_than_paid(self):
+        charge = self.card.capture('10.00', 'order')
+        charge.refund('6.00', 'order')
+
+        self.assert_error(fake.REFUND_EXCEEDS_PAID, charge.refund, '4.01', 'order')
+
+    def test_refund_unknown_payment(self):
+        self.assert_error(fake.PAYMENT_NOT_FOUND, self.card.retrieve_charge('404').refund, '1.00', 'order')
+
+    def test_fail_next(self):
+        error = APIError(502, 'Bad Gateway')
+        self.provider.fail_next('authorize', error, count=2)
+
+        for _ in range(2):
+            with self.assertRaises(APIError):
+                self.card.authorize('1.00', 'order')
+        self.card.authorize('1.00', 'order')
+
+    def test_fail_next_any_operation(self):
+        self.provider.fail_next(None, APIError(502, 'Bad Gateway'))
+
+        with self.assertRaises(APIError):
+            self.card.capture('1.00', 'order')
+
+    def test_failure_rate(self):
+        provider = FakeAPIProvider(failure_rate=0.5, seed=1)
+        provider.add_card('card')
+        failures = 0
+        for _ in range(1000):
+            try:
+                provider.pay('card', 100, 'order')
+            except APIError as error:
+                self.assertEqual(503, error.status_code)
+                failures += 1
+
+        self.assertTrue(400 < failures < 600)
+
+    def test_token_expiry(self):
+        now = [0.0]
+        provider = FakeAPIProvider(token_ttl=60, clock=lambda: now[0])
+        provider.add_card('card')
+
+        provider.pay('card', 100, 'order')
+        now[0] = 30
+        provider.pay('card', 100, 'order')
+        self.assertEqual(1, provider.token_renewals)
+
+        now[0] = 91
+        provider.pay('card', 100, 'order')
+        self.assertEqual(2, provider.token_renewals)
+
+        provider.expire_tokens()
+        provider.pay('card', 100, 'order')
+        self.assertEqual(3, provider.token_renewals)
+
+    def test_provider_interface(self):
+        for name in dir(APIProvider):
+            if not name.startswith('_'):
+                self.assertTrue(hasattr(self.provider, name), name)
+        for name in ('limiter', 'tracer', 'profiler', 'negative_cache', 'transport', 'login_hedger'):
+            self.assertTrue(hasattr(self.provider, name), name)
+
+    def test_perform(self):
+        result = self.provider.perform(protocol.pay(self.card.card_token, 100, 'order'))
+
+        self.assertEqual(100, result.amount)
+        self.assertEqual(9900, self.provider.balance(self.card.card_token))
+
+    def test_request_resource(self):
+        response = self.provider.request_resource(
+            'Payment', 'Authorize', protocol.authorize(self.card.card_token, 100, 'order').payload
+        )
+
+        self.assertTrue(response['Success'])
+        with self.assertRaises(APIError):
+            self.provider.request_resource('Payment', 'Unknown', {})
+
+    def test_encrypt_card(self):
+        public_key = mock.Mock()
+        public_key.encrypt.side_effect = lambda value: 'encrypted ' + value
+
+        self.assertEqual('4111', FakeAPIProvider.encrypt_card(None, '4111', '123', '12', '2099')['card_number'])
+        self.assertEqual(
+            'encrypted 4111', FakeAPIProvider.encrypt_card(public_key, '4111', '123', '12', '2099')['card_number']
+        )
+
+    def test_tracer_and_limiter(self):
+        tracer = Tracer()
+        limiter = AdaptiveLimiter()
+        provider = FakeAPIProvider(tracer=tracer, limiter=limiter)
+        provider.add_card('card')
+
+        provider.pay('card', 100, 'order')
+
+        self.assertEqual(['pay'], [span.operation for span in tracer.collector.spans])
+        self.assertEqual(0, limiter.in_flight)
+        self.assertIsNotNone(limiter.baseline)
+
+    def test_negative_cache(self):
+        provider = FakeAPIProvider(balance=100, negative_cache=NegativeCache(codes=(fake.INSUFFICIENT_BALANCE,)))
+        card = Edenred(provider).register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+        self.assert_error(fake.INSUFFICIENT_BALANCE, card.capture, '2.00', 'order')
+        provider.add_card(card.card_token, balance=1000)
+
+        self.assert_error(fake.INSUFFICIENT_BALANCE, card.capture, '2.00', 'order')
+        self.assertEqual(1, provider.negative_cache.hits)
+
+    def test_reset_after_fork(self):
+        lock = self.provider._lock
+
+        self.provider.reset_after_fork()
+
+        self.assertIsNot(lock, self.provider._lock)
+        self.card.capture('1.00', 'order')
@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+try:
+    import gevent
+    import gevent.lock
+    import gevent.queue
+    from edenred.green import GreenAPIProvider, GreenTransport
+except ImportError:
+    gevent = None
+
+from edenred.stubserver import StubPublicKey
+
+GREENLETS = 2000
+
+# runs in a child interpreter, so monkey-patching does not leak into the rest of the suite
+STRESS_SCRIPT = """
+from gevent import monkey
+monkey.patch_all()
+
+import json
+import sys
+
+import gevent
+
+from edenred.client import Edenred
+from edenred.green import GreenAPIProvider, GreenTransport
+from edenred.stubserver import StubPublicKey, StubServer
+
+greenlets = int(sys.argv[1])
+with StubServer(latency=0.001) as stub:
+    transport = GreenTransport(pool_size=64)
+    provider = GreenAPIProvider(
+        client_id='id', client_secret='secret', base_url=stub.url, public_key=StubPublicKey(), transport=transport
+    )
+    card = Edenred(provider).register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+    completed = []
+
+    def work(index):
+        charge = card.authorize('1.00', 'green {}'.format(index)).capture('1.00', 'green')
+        completed.append(index)
+        if len(completed) == greenlets // 2:
+            # every request in flight gets a 403 and asks for a new token at once
+            stub.expire_tokens()
+        return charge.charge_id
+
+    jobs = [gevent.spawn(work, index) for index in range(greenlets)]
+    gevent.joinall(jobs, raise_error=True)
+    transport.close()
+
+print(json.dumps({
+    'charges': len({job.value for job in jobs}),
+    'completed': len(completed),
+    'logins': stub.logins,
+    'renewals': provider.token_renewals,
+}))
+"""
+
+
+@unittest.skipIf(gevent is None, "gevent is not installed")
+class TestGreenAPIProvider(unittest.TestCase):
+    def setUp(self):
+        self.logins = []
+
+        def create_access_token(**kwargs):
+            gevent.sleep(0.01)
+            self.logins.append(kwargs)
+            return 'token-{}'.format(len(self.logins))
+        patcher = mock.patch.object(GreenAPIProvider, 'create_access_token', side_effect=create_access_token)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_provider(self, access_token=None):
+        return GreenAPIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=StubPublicKey(),
+            access_token=access_token, transport=mock.Mock()
+        )
+
+    def test_first_login_single_flight(self):
+        provider = self.create_provider()
+
+        jobs = [gevent.spawn(provider._get_headers) for _ in range(GREENLETS)]
+        gevent.joinall(jobs, raise_error=True)
+
+        self.assertEqual(1, len(self.logins))
+        self.assertEqual({'token-1'}, {job.value['authorization'] for job in jobs})
+
+    def test_stale_renewal_single_flight(self):
+        provider = self.create_provider(access_token='expired')
+
+        gevent.joinall(
+            [gevent.spawn(provider.update_token, stale_token='expired') for _ in range(GREENLETS)], raise_error=True
+        )
+
+        self.assertEqual(1, provider.token_renewals)
+        self.assertEqual('token-1', provider.access_token)
+
+    def test_reset_after_fork(self):
+        provider = self.create_provider(access_token='token')
+        lock = provider._token_lock
+
+        provider.reset_after_fork()
+
+        self.assertIsNot(lock, provider._token_lock)
+        self.assertIsInstance(provider._token_lock, gevent.lock.Semaphore)
+
+    def test_default_transport(self):
+        with self.assertLogs('edenred.green', 'WARNING'):
+            provider = GreenAPIProvider(client_id='id', client_secret='secret', base_url='url', public_key=None)
+
+        self.assertIsInstance(provider.transport, GreenTransport)
+
+
+@unittest.skipIf(gevent is None, "gevent is not installed")
+class TestGreenTransport(unittest.TestCase):
+    def test_pool_waits_cooperatively(self):
+        with self.assertLogs('edenred.green', 'WARNING'):
+            transport = GreenTransport(pool_size=2)
+        pool = transport.pool_manager.connection_from_url('http://edenred')
+        first, second = pool._get_conn(), pool._get_conn()
+
+        waiting = gevent.spawn(pool._get_conn)
+        gevent.sleep(0.01)
+        self.assertFalse(waiting.ready())
+        pool._put_conn(first)
+
+        self.assertIs(first, waiting.get(timeout=1))
+        self.assertIsInstance(pool.pool, gevent.queue.LifoQueue)
+        pool._put_conn(second)
+
+    def test_concurrent_greenlets_against_stub(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output(
+            [sys.executable, '-c', STRESS_SCRIPT, str(GREENLETS)], cwd=root, timeout=300
+        )
+
+        result = json.loads(output.decode('utf-8').splitlines()[-1])
+        self.assertEqual(GREENLETS, result['completed'])
+        self.assertEqual(GREENLETS, result['charges'])
+        # the first Login and a single one after the expiry, however many greenlets saw the 403
+        self.assertEqual(2, result['logins'])
+        self.assertEqual(2, result['renewals'])
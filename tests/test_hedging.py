@@ -0,0 +1,165 @@
+import threading
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.hedging import Hedger, HedgeStats
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+from edenred.transport import RequestsTransport
+
+
+class TestHedgeStats(unittest.TestCase):
+    def test_rates_empty(self):
+        stats = HedgeStats()
+
+        self.assertEqual(0.0, stats.hedge_rate)
+        self.assertEqual(0.0, stats.win_rate)
+
+    def test_rates(self):
+        stats = HedgeStats()
+        stats.calls = 10
+        stats.hedged = 4
+        stats.hedge_wins = 1
+
+        self.assertEqual(0.4, stats.hedge_rate)
+        self.assertEqual(0.25, stats.win_rate)
+
+
+class TestHedger(unittest.TestCase):
+    def setUp(self):
+        self.hedger = Hedger(initial_delay=0.05)
+
+    def tearDown(self):
+        self.hedger.shutdown()
+
+    def test_invalid_percentile(self):
+        with self.assertRaises(ValueError):
+            Hedger(percentile=0)
+
+    def test_delay_initial(self):
+        self.assertEqual(0.05, self.hedger.delay)
+
+    def test_delay_percentile(self):
+        hedger = Hedger(percentile=0.5, min_delay=0.0)
+        for _ in range(3):
+            hedger.call(lambda: None)
+
+        self.assertLess(hedger.delay, 0.05)
+        hedger.shutdown()
+
+    def test_delay_nearest_rank(self):
+        hedger = Hedger(percentile=0.95, min_delay=0.0, window=100)
+        hedger._latencies.extend(index / 1000.0 for index in range(1, 101))
+
+        self.assertEqual(0.095, hedger.delay)
+        hedger.shutdown()
+
+    def test_fast_call_not_hedged(self):
+        function = mock.Mock(return_value='token')
+
+        self.assertEqual('token', self.hedger.call(function, 1, key='value'))
+        function.assert_called_once_with(1, key='value')
+        self.assertEqual(1, self.hedger.stats.calls)
+        self.assertEqual(0, self.hedger.stats.hedged)
+
+    def test_slow_call_hedged_and_hedge_wins(self):
+        calls = []
+        release = threading.Event()
+
+        def login():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(1)
+                return 'slow'
+            return 'fast'
+
+        self.assertEqual('fast', self.hedger.call(login))
+        release.set()
+        self.assertEqual(2, len(calls))
+        self.assertEqual(1, self.hedger.stats.hedged)
+        self.assertEqual(1, self.hedger.stats.hedge_wins)
+        # timed from the primary's send, not from the hedge's
+        self.assertGreaterEqual(self.hedger._latencies[-1], 0.05)
+
+    def test_slow_call_hedged_and_primary_wins(self):
+        calls = []
+
+        def login():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return 'primary'
+            time.sleep(1)
+            return 'hedge'
+
+        self.assertEqual('primary', self.hedger.call(login))
+        self.assertEqual(1, self.hedger.stats.hedged)
+        self.assertEqual(0, self.hedger.stats.hedge_wins)
+
+    def test_failed_primary_uses_hedge(self):
+        calls = []
+
+        def login():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise RuntimeError("primary")
+            time.sleep(0.2)
+            return 'hedge'
+
+        self.assertEqual('hedge', self.hedger.call(login))
+        self.assertEqual(1, self.hedger.stats.hedge_wins)
+
+    def test_both_fail(self):
+        def login():
+            time.sleep(0.1)
+            raise RuntimeError("login")
+
+        with self.assertRaises(RuntimeError):
+            self.hedger.call(login)
+        self.assertEqual(0, self.hedger.stats.hedge_wins)
+
+    def test_error_without_hedge(self):
+        with self.assertRaises(RuntimeError):
+            self.hedger.call(mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(1, len(self.hedger._latencies))
+
+    def test_max_workers(self):
+        hedger = Hedger(max_workers=1)
+        self.addCleanup(hedger.shutdown)
+
+        self.assertEqual(1, hedger._executor._max_workers)
+        hedger.reset_after_fork()
+        self.assertEqual(1, hedger._executor._max_workers)
+
+
+class TestProviderHedgedLogin(unittest.TestCase):
+    def test_warns_without_timeout(self):
+        for transport, warns in ((RequestsTransport(), True), (RequestsTransport(timeout=5), False)):
+            with mock.patch('edenred.provider.logger') as logger:
+                APIProvider(
+                    client_id='id', client_secret='secret', base_url='url', public_key=None,
+                    login_hedger=mock.Mock(spec=Hedger), transport=transport
+                )
+
+            self.assertEqual(warns, logger.warning.called)
+
+    @mock.patch('edenred.provider.APIProvider.create_access_token')
+    def test_update_token_hedged(self, create_access_token):
+        hedger = mock.Mock(spec=Hedger)
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=mock.Mock(spec=PublicKey),
+            login_hedger=hedger
+        )
+
+        provider.update_token()
+
+        self.assertEqual(hedger.call.return_value, provider.access_token)
+        hedger.call.assert_called_once_with(
+            create_access_token, client_id='id', client_secret='secret', public_key=provider.public_key,
+            base_url='url', transport=None
+        )
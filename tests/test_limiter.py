@@ -0,0 +1,166 @@
+import threading
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from concurrent import futures
+
+from edenred.client import Edenred
+from edenred.exceptions import APIError, InvalidCredentials, TransactionErrors
+from edenred.limiter import AdaptiveLimiter
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey, StubServer
+from edenred.transport import Urllib3Transport
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.limiter = AdaptiveLimiter(initial_limit=4, max_limit=6, clock=lambda: self.now[0])
+
+    def run_round(self, latency):
+        # fill the limit, then complete every request with the given latency
+        started = [self.limiter.acquire() for _ in range(self.limiter.limit)]
+        self.now[0] += latency
+        for start in started:
+            self.limiter.release(start, latency)
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(initial_limit=0)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(initial_limit=10, max_limit=5)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(backoff=1)
+
+    def test_increase_while_saturated(self):
+        self.run_round(0.1)
+        self.run_round(0.1)
+        self.assertEqual(4, self.limiter.limit)
+
+        self.run_round(0.1)
+
+        self.assertEqual(5, self.limiter.limit)
+        self.assertEqual(1, self.limiter.increases)
+        self.assertEqual(0, self.limiter.in_flight)
+
+    def test_increase_bounded(self):
+        for _ in range(10):
+            self.run_round(0.1)
+
+        self.assertEqual(6, self.limiter.limit)
+
+    def test_no_increase_when_idle(self):
+        for _ in range(10):
+            started = self.limiter.acquire()
+            self.now[0] += 0.1
+            self.limiter.release(started, 0.1)
+
+        self.assertEqual(4, self.limiter.limit)
+
+    def test_decrease_on_latency(self):
+        self.run_round(0.1)
+
+        self.run_round(0.5)
+
+        self.assertEqual(3, self.limiter.limit)
+        self.assertEqual(1, self.limiter.decreases)
+
+    def test_one_decrease_per_round(self):
+        self.run_round(0.1)
+        started = [self.limiter.acquire() for _ in range(4)]
+        self.now[0] += 1
+
+        for start in started:
+            self.limiter.release(start, 1, overloaded=True)
+
+        self.assertEqual(3, self.limiter.limit)
+
+    def test_decrease_bounded(self):
+        for _ in range(20):
+            started = self.limiter.acquire()
+            self.now[0] += 1
+            self.limiter.release(started, 1, overloaded=True)
+
+        self.assertEqual(1, self.limiter.limit)
+
+    def test_is_overload(self):
+        self.assertTrue(AdaptiveLimiter.is_overload(APIError(503, 'Service Unavailable')))
+        self.assertTrue(AdaptiveLimiter.is_overload(IOError('reset')))
+        self.assertFalse(AdaptiveLimiter.is_overload(None))
+        self.assertFalse(AdaptiveLimiter.is_overload(InvalidCredentials()))
+        self.assertFalse(AdaptiveLimiter.is_overload(TransactionErrors([{'Code': 'ER101', 'Message': 'Saldo'}])))
+
+    def test_slot(self):
+        with self.assertRaises(APIError):
+            with self.limiter.slot():
+                raise APIError(502, 'Bad Gateway')
+
+        self.assertEqual(0, self.limiter.in_flight)
+        self.assertEqual(2, self.limiter.limit)
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = AdaptiveLimiter(initial_limit=2)
+        started = [limiter.acquire(), limiter.acquire()]
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        thread.start()
+
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release(started[0], 0.0)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+class TestProviderLimiter(unittest.TestCase):
+    @mock.patch('edenred.provider.APIProvider.do_request')
+    def test_request_resource(self, do_request):
+        limiter = mock.MagicMock(spec=AdaptiveLimiter)
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=StubPublicKey(),
+            access_token='token', limiter=limiter
+        )
+        do_request.return_value = {'Success': True, 'Pay': {'AuthorizeIdentifier': '1'}}
+
+        provider.pay('card', 100, 'description')
+
+        limiter.slot.assert_called_once_with()
+        limiter.slot.return_value.__enter__.assert_called_once_with()
+
+
+class TestStubLatency(unittest.TestCase):
+    THREADS = 24
+
+    def test_adapts_to_latency(self):
+        latency = [0.02]
+        limiter = AdaptiveLimiter(initial_limit=4, max_limit=self.THREADS)
+        with StubServer(latency=lambda: latency[0]) as stub:
+            transport = Urllib3Transport(pool_size=self.THREADS)
+            provider = APIProvider(
+                client_id='id', client_secret='secret', base_url=stub.url, public_key=StubPublicKey(),
+                transport=transport, limiter=limiter
+            )
+            card = Edenred(provider).retrieve_card('card')
+
+            def drive(seconds):
+                deadline = time.time() + seconds
+
+                def work(index):
+                    while time.time() < deadline:
+                        card.capture('1.00', 'limiter')
+                with futures.ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+                    list(executor.map(work, range(self.THREADS)))
+
+            drive(1.0)
+            healthy = limiter.limit
+            # Edenred slows down by a factor of 10
+            latency[0] = 0.2
+            drive(1.0)
+            transport.close()
+
+        self.assertGreater(healthy, 4)
+        self.assertLess(limiter.limit, healthy)
+        self.assertGreater(limiter.decreases, 0)
@@ -0,0 +1,97 @@
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.client import Edenred
+from edenred.exceptions import APIError, TransactionErrors
+from edenred.loadtest import LoadGenerator, error_key, main, parse_mix
+from edenred.provider import APIProvider
+from edenred.stubserver import StubPublicKey, StubServer
+from edenred.transport import Urllib3Transport
+
+
+class TestHelpers(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(
+            [('authorize', 4.0), ('refund', 1.0)],
+            list(parse_mix('authorize=4, refund').items())
+        )
+
+    def test_parse_mix_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            parse_mix('authorize=1,void=1')
+
+    def test_parse_mix_no_weight(self):
+        with self.assertRaises(ValueError):
+            parse_mix('authorize=0')
+
+    def test_error_key(self):
+        self.assertEqual('ER201', error_key(TransactionErrors([{'Code': 'ER201', 'Message': 'Monto'}])))
+        self.assertEqual('HTTP 502', error_key(APIError(502, 'Bad Gateway')))
+        self.assertEqual('RuntimeError', error_key(RuntimeError('boom')))
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def setUp(self):
+        self.provider = mock.Mock(spec=APIProvider)
+        self.provider.create_payment_method.return_value = {'CardToken': 'card-1'}
+        self.provider.authorize.return_value = {'AuthorizeIdentifier': '1', 'Amount': 100}
+        self.provider.capture.return_value = {'AuthorizeIdentifier': '1', 'Amount': 100}
+        self.provider.pay.return_value = {'AuthorizeIdentifier': '1', 'Amount': 100}
+        self.provider.refund.return_value = {'AuthorizeIdentifier': '1', 'Amount': 100}
+        self.generator = LoadGenerator(Edenred(self.provider), seed=1)
+
+    def test_run_operations(self):
+        stats = self.generator.run_concurrency(4, operations=50)
+
+        summary = stats.summary()
+        self.assertEqual(50, summary['operations'])
+        self.assertEqual(50, sum(entry['count'] for entry in summary['by_operation'].values()))
+
+    def test_errors_by_code(self):
+        self.provider.authorize.side_effect = TransactionErrors([{'Code': 'ER101', 'Message': 'Sin saldo'}])
+        generator = LoadGenerator(Edenred(self.provider), mix='authorize=1')
+
+        summary = generator.run_concurrency(2, operations=6).summary()
+
+        self.assertEqual({'ER101': 6}, summary['by_operation']['authorize']['errors'])
+
+    def test_capture_without_authorization_authorizes_first(self):
+        self.generator.run_once('capture')
+
+        self.provider.authorize.assert_called_once()
+        self.provider.capture.assert_called_once()
+
+    def test_requires_bound(self):
+        with self.assertRaises(ValueError):
+            self.generator.run_concurrency(1)
+
+
+class TestStub(unittest.TestCase):
+    def test_run_against_stub(self):
+        with StubServer(token_ttl=0.05) as stub:
+            transport = Urllib3Transport()
+            provider = APIProvider(
+                client_id='id', client_secret='secret', base_url=stub.url, public_key=StubPublicKey(),
+                transport=transport
+            )
+            generator = LoadGenerator(Edenred(provider), seed=1)
+            summary = generator.run_rate(500, operations=100).summary(token_renewals=provider.token_renewals)
+            transport.close()
+
+        self.assertEqual(100, summary['operations'])
+        self.assertFalse(any(entry['errors'] for entry in summary['by_operation'].values()))
+        self.assertGreaterEqual(summary['token_renewals'], 1)
+
+    @mock.patch('edenred.loadtest.print')
+    def test_main(self, print):
+        self.assertEqual(0, main(['--stub', '--operations', '20', '--concurrency', '2', '--json']))
+        self.assertIn('"operations": 20', print.call_args[0][0])
+
+    @mock.patch('edenred.loadtest.print')
+    def test_main_fake(self, print):
+        self.assertEqual(0, main(['--fake', '--operations', '200', '--concurrency', '2', '--json']))
+        self.assertIn('"operations": 200', print.call_args[0][0])
+        self.assertNotIn('FAKE', print.call_args[0][0])
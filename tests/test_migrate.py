@@ -0,0 +1,195 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+import Crypto.PublicKey.RSA
+
+from edenred.exceptions import APIError, TransactionErrors
+from edenred.migrate import CardMigration, main
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+from edenred.stubserver import StubServer
+from edenred.transport import Urllib3Transport
+
+
+class MigrationTestMixin(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='edenred-migrate-')
+        self.output_path = os.path.join(self.directory, 'tokens.jsonl')
+        self.failures_path = os.path.join(self.directory, 'failures.jsonl')
+        self.public_key = mock.Mock(spec=PublicKey)
+        self.public_key.encrypt.side_effect = lambda data: 'enc:' + data
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_records(self, count):
+        return [
+            {
+                'card_number': '41111111111111{:02d}'.format(index), 'cvv': '123', 'expiration_month': '12',
+                'expiration_year': '2030', 'username': 'user{}'.format(index), 'user_id': str(index)
+            }
+            for index in range(count)
+        ]
+
+    def read_results(self, path):
+        with io.open(path, 'r', encoding='utf-8') as results:
+            return [json.loads(line) for line in results]
+
+
+class TestCardMigration(MigrationTestMixin, unittest.TestCase):
+    def setUp(self):
+        super(TestCardMigration, self).setUp()
+        self.provider = mock.Mock(spec=APIProvider)
+        self.provider.public_key = self.public_key
+        self.provider.create_encrypted_payment_method.side_effect = \
+            lambda **kwargs: {'CardToken': 'card-' + kwargs['user_id']}
+
+    def create_migration(self):
+        return CardMigration(self.provider, self.output_path, self.failures_path, threads=4, window=4)
+
+    def test_run(self):
+        registered, failed, skipped = self.create_migration().run(self.create_records(10))
+
+        self.assertEqual((10, 0, 0), (registered, failed, skipped))
+        results = sorted(self.read_results(self.output_path), key=lambda result: result['index'])
+        self.assertEqual(list(range(10)), [result['index'] for result in results])
+        self.assertEqual('card-3', results[3]['card_token'])
+        self.provider.create_encrypted_payment_method.assert_any_call(
+            card_number='enc:4111111111111100', cvv='enc:123', expiration_month='enc:12',
+            expiration_year='enc:2030', username='user0', user_id='0'
+        )
+
+    def test_resume(self):
+        records = self.create_records(10)
+        self.create_migration().run(records[:4])
+        self.provider.create_encrypted_payment_method.reset_mock()
+
+        registered, failed, skipped = self.create_migration().run(records)
+
+        self.assertEqual((6, 0, 4), (registered, failed, skipped))
+        self.assertEqual(6, self.provider.create_encrypted_payment_method.call_count)
+        self.assertEqual(10, len(self.read_results(self.output_path)))
+
+    def test_failures(self):
+        errors = {
+            '1': TransactionErrors([{'Code': 'ER101', 'Message': 'Tarjeta invalida'}]),
+            '2': APIError(500, 'Internal Server Error'),
+            '3': ValueError('boom'),
+        }
+
+        def register(**kwargs):
+            if kwargs['user_id'] in errors:
+                raise errors[kwargs['user_id']]
+            return {'CardToken': 'card-' + kwargs['user_id']}
+        self.provider.create_encrypted_payment_method.side_effect = register
+
+        registered, failed, skipped = self.create_migration().run(self.create_records(5))
+
+        self.assertEqual((2, 3, 0), (registered, failed, skipped))
+        failures = {failure['user_id']: failure for failure in self.read_results(self.failures_path)}
+        self.assertEqual(['ER101'], failures['1']['codes'])
+        self.assertEqual(500, failures['2']['status_code'])
+        self.assertIn('boom', failures['3']['error'])
+        for failure in failures.values():
+            self.assertNotIn('card_number', failure)
+
+    def test_malformed_records(self):
+        records = self.create_records(4)
+        del records[1]['cvv']
+        records[2]['expiration_month'] = 12
+
+        registered, failed, skipped = self.create_migration().run(records)
+
+        self.assertEqual((2, 2, 0), (registered, failed, skipped))
+        failures = sorted(self.read_results(self.failures_path), key=lambda failure: failure['index'])
+        self.assertEqual([1, 2], [failure['index'] for failure in failures])
+        self.assertEqual(['1', '2'], [failure['user_id'] for failure in failures])
+        self.assertIn('cvv', failures[0]['error'])
+        self.assertIn('TypeError', failures[1]['error'])
+
+    def test_failures_retried_on_resume(self):
+        self.provider.create_encrypted_payment_method.side_effect = APIError(500, 'Internal Server Error')
+        self.create_migration().run(self.create_records(3))
+        self.provider.create_encrypted_payment_method.side_effect = lambda **kwargs: {'CardToken': 'card'}
+
+        registered, failed, skipped = self.create_migration().run(self.create_records(3))
+
+        self.assertEqual((3, 0, 0), (registered, failed, skipped))
+
+
+class TestCardMigrationProcesses(MigrationTestMixin, unittest.TestCase):
+    def setUp(self):
+        super(TestCardMigrationProcesses, self).setUp()
+        self.public_key_path = os.path.join(self.directory, 'public.pem')
+        with open(self.public_key_path, 'wb') as public_key_file:
+            public_key_file.write(Crypto.PublicKey.RSA.generate(1024).publickey().exportKey('PEM'))
+        self.stub = StubServer().start()
+        self.transport = Urllib3Transport()
+
+    def tearDown(self):
+        self.transport.close()
+        self.stub.stop()
+        super(TestCardMigrationProcesses, self).tearDown()
+
+    def test_run_against_stub(self):
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url,
+            public_key=PublicKey(self.public_key_path), transport=self.transport
+        )
+        migration = CardMigration(
+            provider, self.output_path, self.failures_path, public_key_path=self.public_key_path,
+            processes=2, threads=4, window=8
+        )
+
+        registered, failed, skipped = migration.run(self.create_records(20))
+
+        self.assertEqual((20, 0, 0), (registered, failed, skipped))
+        self.assertTrue(all(result['card_token'].startswith('card-')
+                            for result in self.read_results(self.output_path)))
+
+    def test_malformed_record_in_process(self):
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url,
+            public_key=PublicKey(self.public_key_path), transport=self.transport
+        )
+        migration = CardMigration(
+            provider, self.output_path, self.failures_path, public_key_path=self.public_key_path,
+            processes=2, threads=4, window=4
+        )
+        records = self.create_records(10)
+        records[3]['expiration_month'] = 12
+
+        registered, failed, skipped = migration.run(records)
+
+        self.assertEqual((9, 1, 0), (registered, failed, skipped))
+        failure, = self.read_results(self.failures_path)
+        self.assertEqual((3, '3'), (failure['index'], failure['user_id']))
+
+
+class TestMain(MigrationTestMixin, unittest.TestCase):
+
+    @mock.patch('edenred.migrate.CardMigration')
+    @mock.patch('edenred.migrate.Edenred')
+    def test_main(self, Edenred, CardMigration):
+        records_path = os.path.join(self.directory, 'cards.jsonl')
+        CardMigration.return_value.run.return_value = (5, 0, 2)
+        environ = {'EDENREDPAYMENTS_PUBLIC_KEY': 'public.pem'}
+
+        with mock.patch.dict('edenred.migrate.os.environ', environ):
+            result = main([records_path, '--output', self.output_path, '--failures', self.failures_path,
+                           '--processes', '0'])
+
+        self.assertEqual(0, result)
+        CardMigration.assert_called_once_with(
+            Edenred.create_client_from_env.return_value.api_provider, output_path=self.output_path,
+            failures_path=self.failures_path, public_key_path='public.pem', testing=False, processes=0,
+            threads=8, window=256
+        )
@@ -0,0 +1,196 @@
+import threading
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.client import Card, Charge
+from edenred.exceptions import APIError, TransactionErrors
+from edenred.negativecache import NegativeCache
+from edenred.provider import APIProvider
+
+BLOCKED = [{'Code': 'ER102', 'Message': 'Tarjeta bloqueada'}]
+INSUFFICIENT = [{'Code': 'ER101', 'Message': 'Saldo insuficiente'}]
+OTHER = [{'Code': 'ER999', 'Message': 'Error'}]
+
+
+class TestNegativeCache(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.cache = NegativeCache(codes=('ER101', 'ER102'), ttl=60, max_entries=2, clock=lambda: self.now[0])
+
+    def test_invalid_ttl(self):
+        with self.assertRaises(ValueError):
+            NegativeCache(codes=(), ttl=0)
+
+    def test_sticky_codes(self):
+        self.assertTrue(self.cache.add('card', TransactionErrors(BLOCKED)))
+        self.assertFalse(self.cache.add('other', TransactionErrors(OTHER)))
+
+        error = self.cache.get('card')
+        self.assertEqual(('ER102',), error.codes)
+        self.assertIsNone(self.cache.get('other'))
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_entry_per_code(self):
+        cache = NegativeCache(codes=('ER102',), amount_codes=('ER101',), clock=lambda: self.now[0])
+        cache.add('card', TransactionErrors(INSUFFICIENT), amount=1000)
+        self.now[0] = 30
+        cache.add('card', TransactionErrors(BLOCKED), amount=500)
+        self.now[0] = 61
+
+        # the balance entry expired on its own, the blocked card is still cached
+        self.assertEqual(('ER102',), cache.get('card', 100).codes)
+        self.assertEqual(1, len(cache))
+
+    def test_amount_codes(self):
+        cache = NegativeCache(codes=('ER102',), amount_codes=('ER101',))
+        cache.add('card', TransactionErrors(INSUFFICIENT), amount=1000)
+
+        self.assertEqual(('ER101',), cache.get('card', 1000).codes)
+        self.assertEqual(('ER101',), cache.get('card', 2000).codes)
+        self.assertEqual(('ER101',), cache.get('card').codes)
+        self.assertIsNone(cache.get('card', 999))
+
+    def test_keeps_error_class(self):
+        class Blocked(TransactionErrors):
+            pass
+        self.cache.add('card', Blocked(BLOCKED))
+
+        self.assertIsInstance(self.cache.get('card'), Blocked)
+        self.assertIsNot(self.cache.get('card'), self.cache.get('card'))
+
+    def test_ttl(self):
+        self.cache.add('card', TransactionErrors(INSUFFICIENT))
+        self.now[0] = 59.9
+        self.assertIsNotNone(self.cache.get('card'))
+
+        self.now[0] = 60
+        self.assertIsNone(self.cache.get('card'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_max_entries(self):
+        for card_token in ('first', 'second', 'third'):
+            self.cache.add(card_token, TransactionErrors(BLOCKED))
+
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get('first'))
+
+    def test_forget(self):
+        self.cache.add('card', TransactionErrors(BLOCKED))
+
+        self.cache.forget('card')
+        self.cache.forget('unknown')
+
+        self.assertIsNone(self.cache.get('card'))
+
+    def test_call(self):
+        function = mock.Mock(side_effect=TransactionErrors(BLOCKED))
+
+        for _ in range(3):
+            with self.assertRaises(TransactionErrors):
+                self.cache.call('card', function, 1, amount=2)
+
+        function.assert_called_once_with(1, amount=2)
+
+    def test_call_smaller_amount(self):
+        cache = NegativeCache(codes=(), amount_codes=('ER101',))
+        function = mock.Mock(side_effect=[TransactionErrors(INSUFFICIENT), 'paid'])
+
+        with self.assertRaises(TransactionErrors):
+            cache.call('card', function, amount=1000)
+        with self.assertRaises(TransactionErrors):
+            cache.call('card', function, amount=1000)
+
+        self.assertEqual('paid', cache.call('card', function, amount=500))
+        self.assertEqual(2, function.call_count)
+
+    def test_call_api_error(self):
+        function = mock.Mock(side_effect=APIError(503, 'Service Unavailable'))
+
+        for _ in range(2):
+            with self.assertRaises(APIError):
+                self.cache.call('card', function)
+
+        self.assertEqual(2, function.call_count)
+
+    def test_concurrent_get(self):
+        cache = NegativeCache(codes=('ER102',))
+        cache.add('card', TransactionErrors(BLOCKED))
+        errors = []
+
+        def run():
+            for _ in range(1000):
+                errors.append(cache.get('card'))
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(4000, cache.hits)
+        self.assertTrue(all(error.codes == ('ER102',) for error in errors))
+
+
+class TestCardNegativeCache(unittest.TestCase):
+    def setUp(self):
+        self.provider = mock.Mock(spec=APIProvider)
+        self.provider.validate = True
+        self.provider.negative_cache = NegativeCache(codes=('ER102',), amount_codes=('ER101',))
+        self.card = Card('card', self.provider)
+
+    def test_authorize(self):
+        self.provider.authorize.side_effect = TransactionErrors(INSUFFICIENT)
+
+        for _ in range(3):
+            with self.assertRaises(TransactionErrors):
+                self.card.authorize('10.00', 'order')
+
+        self.assertEqual(1, self.provider.authorize.call_count)
+
+    def test_capture_shares_entry(self):
+        self.provider.authorize.side_effect = TransactionErrors(INSUFFICIENT)
+        with self.assertRaises(TransactionErrors):
+            self.card.authorize('10.00', 'order')
+
+        with self.assertRaises(TransactionErrors):
+            self.card.capture('10.00', 'order')
+
+        self.provider.pay.assert_not_called()
+
+    def test_smaller_amount(self):
+        self.provider.authorize.side_effect = [TransactionErrors(INSUFFICIENT), {'AuthorizeIdentifier': '1'}]
+        with self.assertRaises(TransactionErrors):
+            self.card.authorize('10.00', 'order')
+
+        self.assertEqual(500, self.card.authorize('5.00', 'order').amount)
+        self.assertEqual(2, self.provider.authorize.call_count)
+
+    def test_other_code_not_cached(self):
+        self.provider.authorize.side_effect = [TransactionErrors(OTHER), {'AuthorizeIdentifier': '1'}]
+        with self.assertRaises(TransactionErrors):
+            self.card.authorize('10.00', 'order')
+
+        self.card.authorize('10.00', 'order')
+        self.assertEqual(2, self.provider.authorize.call_count)
+
+    def test_other_cards(self):
+        self.provider.authorize.side_effect = TransactionErrors(INSUFFICIENT)
+        with self.assertRaises(TransactionErrors):
+            self.card.authorize('10.00', 'order')
+        self.provider.authorize.side_effect = None
+        self.provider.authorize.return_value = {'AuthorizeIdentifier': '1'}
+
+        Card('other', self.provider).authorize('10.00', 'order')
+
+    def test_refund_forgets(self):
+        self.provider.pay.side_effect = TransactionErrors(INSUFFICIENT)
+        with self.assertRaises(TransactionErrors):
+            self.card.capture('10.00', 'order')
+        self.provider.refund.return_value = {'Amount': 500}
+
+        Charge('1', self.card, self.provider).refund('5.00', 'order')
+
+        self.assertIsNone(self.provider.negative_cache.get('card'))
@@ -0,0 +1,161 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.client import Edenred
+from edenred.profiling import Profiler, profiled
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='edenred-profile-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def list_profiles(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.prof'))
+
+    def test_init_invalid(self):
+        with self.assertRaises(ValueError):
+            Profiler(self.directory, sample_rate=0)
+        with self.assertRaises(ValueError):
+            Profiler(self.directory, max_files=0)
+
+    def test_init_creates_directory(self):
+        directory = os.path.join(self.directory, 'nested')
+
+        Profiler(directory)
+
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_init_directory_created_concurrently(self):
+        # another worker creates the directory between a check and the creation
+        directory = os.path.join(self.directory, 'nested')
+        makedirs = os.makedirs
+
+        def create_first(path, *args, **kwargs):
+            makedirs(path)
+            return makedirs(path, *args, **kwargs)
+        with mock.patch('os.makedirs', side_effect=create_first):
+            Profiler(directory)
+
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_profile_dumps_stats(self):
+        profiler = Profiler(self.directory)
+
+        with profiler.profile('authorize'):
+            sum(range(1000))
+
+        profiles = self.list_profiles()
+        self.assertEqual(1, len(profiles))
+        self.assertTrue(profiles[0].startswith('authorize-'))
+        pstats.Stats(os.path.join(self.directory, profiles[0]))
+
+    @mock.patch('edenred.profiling.random.random', return_value=0.5)
+    def test_profile_not_sampled(self, random):
+        profiler = Profiler(self.directory, sample_rate=0.1)
+
+        with profiler.profile('authorize'):
+            pass
+
+        self.assertEqual([], self.list_profiles())
+
+    def test_profile_nested_skipped(self):
+        profiler = Profiler(self.directory)
+
+        with profiler.profile('outer'):
+            with profiler.profile('inner'):
+                pass
+
+        profiles = self.list_profiles()
+        self.assertEqual(1, len(profiles))
+        self.assertTrue(profiles[0].startswith('outer-'))
+
+    def test_profile_bounded_files(self):
+        profiler = Profiler(self.directory, max_files=3)
+
+        for index in range(6):
+            with profiler.profile('operation{}'.format(index)):
+                pass
+
+        self.assertEqual(3, len(self.list_profiles()))
+
+    def test_create_from_env_disabled(self):
+        with mock.patch.dict('edenred.profiling.os.environ', {}, clear=True):
+            self.assertIsNone(Profiler.create_from_env())
+
+    def test_create_from_env(self):
+        environ = {
+            'EDENREDPAYMENTS_PROFILE_DIR': self.directory,
+            'EDENREDPAYMENTS_PROFILE_SAMPLE_RATE': '0.25',
+            'EDENREDPAYMENTS_PROFILE_MAX_FILES': '7',
+        }
+        with mock.patch.dict('edenred.profiling.os.environ', environ):
+            profiler = Profiler.create_from_env()
+
+        self.assertEqual(self.directory, profiler.directory)
+        self.assertEqual(0.25, profiler.sample_rate)
+        self.assertEqual(7, profiler.max_files)
+
+
+class TestProfiled(unittest.TestCase):
+    class Operations(object):
+        def __init__(self, profiler):
+            self.profiler = profiler
+
+        @profiled
+        def authorize(self, value):
+            return value
+
+    def test_disabled(self):
+        self.assertEqual(1, self.Operations(None).authorize(1))
+
+    def test_enabled(self):
+        profiler = mock.Mock(spec=Profiler)
+        profiler.profile.return_value = mock.MagicMock()
+
+        self.assertEqual(1, self.Operations(profiler).authorize(1))
+        profiler.profile.assert_called_once_with('authorize')
+
+
+class TestClientProfiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='edenred-profile-')
+        self.provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=mock.Mock(spec=PublicKey)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_enable_disable(self):
+        client = Edenred(self.provider)
+
+        profiler = client.enable_profiling(self.directory, sample_rate=0.5, max_files=10)
+
+        self.assertIs(profiler, self.provider.profiler)
+        self.assertEqual(0.5, profiler.sample_rate)
+        client.disable_profiling()
+        self.assertIsNone(self.provider.profiler)
+
+    @mock.patch('edenred.provider.APIProvider.request_resource')
+    def test_profiled_operation(self, request_resource):
+        request_resource.return_value = {'Authorize': {'AuthorizeIdentifier': '1'}}
+        client = Edenred(self.provider)
+        client.enable_profiling(self.directory)
+
+        client.retrieve_card('token').authorize('1.00', 'description')
+
+        profiles = os.listdir(self.directory)
+        self.assertEqual(1, len(profiles))
+        self.assertTrue(profiles[0].startswith('authorize-'))
@@ -0,0 +1,108 @@
+import json
+import random
+import unittest
+
+from edenred import protocol
+from edenred.exceptions import InvalidResponse, TransactionErrors
+
+
+class TestOperations(unittest.TestCase):
+    def test_login(self):
+        operation = protocol.login('id', 'secret')
+
+        self.assertEqual('url/Login', operation.url('url'))
+        self.assertEqual({'Security': {'ClientIdentifier': 'id', 'ClientSecret': 'secret'}}, operation.payload)
+        self.assertEqual('token', operation.result({'Success': True, 'access_token': 'token'}))
+
+    def test_authorize(self):
+        operation = protocol.authorize('card', 100, 'description')
+
+        self.assertEqual('url/Payment/Authorize', operation.url('url'))
+        self.assertEqual(
+            {'Authorize': {'CardToken': 'card', 'Amount': 100, 'Description': 'description'}}, operation.payload
+        )
+        self.assertEqual('Authorize', operation.result_key)
+
+    def test_refund(self):
+        operation = protocol.refund('card', '42', 100, 'description')
+
+        self.assertEqual('url/Payment/42/Refund', operation.url('url'))
+        self.assertEqual('42', operation.payload['Pay']['PayIdentifier'])
+        self.assertEqual('Pay', operation.result_key)
+
+    def test_equal(self):
+        self.assertEqual(protocol.pay('card', 100, 'a'), protocol.pay('card', 100, 'a'))
+        self.assertNotEqual(protocol.pay('card', 100, 'a'), protocol.pay('card', 200, 'a'))
+
+
+class TestParse(unittest.TestCase):
+    def setUp(self):
+        self.operation = protocol.capture('card', '1', 100, 'description')
+
+    def test_round_trip(self):
+        body = protocol.encode({'Success': True, 'ErrorList': [], 'Capture': {'AuthorizeIdentifier': '1'}})
+
+        self.assertEqual({'AuthorizeIdentifier': '1'}, self.operation.parse(body))
+
+    def test_encode(self):
+        self.assertEqual(self.operation.payload, json.loads(self.operation.encode().decode('utf-8')))
+
+    def test_transaction_errors(self):
+        body = protocol.encode({'Success': False, 'ErrorList': [{'Code': 'ER101', 'Message': 'Sin saldo'}]})
+
+        with self.assertRaises(TransactionErrors) as context:
+            self.operation.parse(body)
+        self.assertEqual(('ER101',), context.exception.codes)
+
+    def test_no_errors(self):
+        with self.assertRaises(TransactionErrors):
+            self.operation.parse(b'{"Success": false, "ErrorList": null}')
+
+    def test_invalid_bodies(self):
+        for body in (b'', b'\xff\xfe', b'[1, 2]', b'{"Success": true}', b'{"Success": false, "ErrorList": [1]}',
+                     b'{"Success": false, "ErrorList": {"Code": "ER1"}}'):
+            with self.assertRaises(InvalidResponse):
+                self.operation.parse(body)
+
+
+class TestFuzz(unittest.TestCase):
+    ITERATIONS = 2000
+
+    def setUp(self):
+        self.random = random.Random(1234)
+        self.operation = protocol.authorize('card', 100, 'description')
+        self.seeds = [
+            protocol.encode({'Success': True, 'ErrorList': [], 'Authorize': {'AuthorizeIdentifier': '1'}}),
+            protocol.encode({'Success': False, 'ErrorList': [{'Code': 'ER104', 'Message': 'Error 104'}]}),
+            protocol.encode({'Success': True, 'access_token': 'token', 'ErrorList': None}),
+        ]
+
+    def mutate(self, body):
+        body = bytearray(body)
+        for _ in range(self.random.randint(1, 4)):
+            choice = self.random.random()
+            position = self.random.randrange(len(body) + 1)
+            if choice < 0.4 and body:
+                body[min(position, len(body) - 1)] = self.random.randrange(256)
+            elif choice < 0.7:
+                body[position:position] = bytes([self.random.randrange(256)])
+            else:
+                del body[position:position + self.random.randint(1, 8)]
+        return bytes(body)
+
+    def assert_parses_or_rejects(self, body):
+        try:
+            self.operation.parse(body)
+        except (InvalidResponse, TransactionErrors):
+            pass
+
+    def test_mutated_responses(self):
+        for _ in range(self.ITERATIONS):
+            self.assert_parses_or_rejects(self.mutate(self.random.choice(self.seeds)))
+
+    def test_random_json(self):
+        values = [None, True, False, 0, -1, 1.5, '', 'ER104', [], {}, [{}], [{'Code': 1}], [{'Code': 'ER1'}]]
+        keys = ['Success', 'ErrorList', 'Authorize', 'Code', 'Message']
+        for _ in range(self.ITERATIONS):
+            data = {key: self.random.choice(values) for key in self.random.sample(keys, self.random.randint(0, 5))}
+            self.assert_parses_or_rejects(protocol.encode(data))
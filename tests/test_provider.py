@@ -5,11 +5,10 @@ try:
 except ImportError:
     import mock
 
-import requests.exceptions
-
 from edenred.provider import APIProvider
 from edenred.publickey import PublicKey
-from edenred.exceptions import APIError, TransactionErrors, Unauthorized
+from edenred.exceptions import TransactionErrors, Unauthorized
+from edenred.transport import Transport
 
 
 class TestAPIProvider(unittest.TestCase):
@@ -87,9 +86,33 @@ class TestAPIProvider(unittest.TestCase):
         self.assertEqual(expected, provider._get_headers())
         self.assertEqual(create_access_token.return_value, provider.access_token)
         create_access_token.assert_called_once_with(
-            client_id=client_id, client_secret=client_secret, public_key=public_key, base_url=base_url
+            client_id=client_id, client_secret=client_secret, public_key=public_key, base_url=base_url,
+            transport=None
+        )
+
+    def test_get_headers_shared(self):
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=mock.Mock(spec=PublicKey),
+            access_token='token'
         )
 
+        headers = provider._get_headers()
+
+        self.assertIs(headers, provider._get_headers())
+        provider.access_token = 'renewed'
+        self.assertEqual('token', headers['authorization'])
+        self.assertEqual('renewed', provider._get_headers()['authorization'])
+
+    def test_base_url_update(self):
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url='url', public_key=mock.Mock(spec=PublicKey)
+        )
+
+        provider.base_url = 'other'
+
+        self.assertEqual('other', provider.base_url)
+        self.assertEqual('other/Payment/Pay', provider._urls[('Payment', 'Pay')])
+
     def test_get_endpoint_url(self):
         base_url = mock.Mock(spec=str)
         resource = mock.Mock(spec=str)
@@ -136,36 +159,35 @@ class TestAPIProvider(unittest.TestCase):
         do_request.assert_called_once_with(
             url=get_endpoint_url.return_value,
             payload=payload,
-            headers={'Content-Type': 'application/json; charset=utf-8'}
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+            transport=None
         )
         get_endpoint_url.assert_called_once_with(resource=None, action='Login', base_url=base_url)
 
 
 class TestDoRequest(unittest.TestCase):
 
-    @mock.patch('edenred.provider.requests')
-    def test_do_request(self, requests):
+    @mock.patch('edenred.provider.default_transport')
+    def test_do_request(self, default_transport):
         payload = mock.Mock(spec=dict)
         headers = mock.Mock(spec=dict)
         url = mock.Mock(spec=str)
-        response = requests.post.return_value
 
         result = APIProvider.do_request(url=url, headers=headers, payload=payload)
 
-        self.assertEqual(requests.post.return_value.json.return_value, result)
-        requests.post.assert_called_once_with(url, json=payload, headers=headers)
-        response.raise_for_status.assert_called_once_with()
+        self.assertEqual(default_transport.post.return_value, result)
+        default_transport.post.assert_called_once_with(url=url, headers=headers, payload=payload)
 
-    @mock.patch('edenred.provider.requests.post')
-    def test_do_request_http_error(self, requests_post):
+    def test_do_request_transport(self):
         payload = mock.Mock(spec=dict)
         headers = mock.Mock(spec=dict)
         url = mock.Mock(spec=str)
-        response = requests_post.return_value
-        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+        transport = mock.Mock(spec=Transport)
 
-        with self.assertRaises(APIError):
-            APIProvider.do_request(url=url, headers=headers, payload=payload)
+        result = APIProvider.do_request(url=url, headers=headers, payload=payload, transport=transport)
+
+        self.assertEqual(transport.post.return_value, result)
+        transport.post.assert_called_once_with(url=url, headers=headers, payload=payload)
 
 
 class ProviderBaseMixin(object):
@@ -198,10 +220,25 @@ class TestRequestResource(ProviderBaseMixin, unittest.TestCase):
 
         self.assertEqual(do_request.return_value, result)
         do_request.assert_called_once_with(
-            url=get_endpoint_url.return_value, payload=payload, headers=_get_headers.return_value
+            url=get_endpoint_url.return_value, payload=payload, headers=_get_headers.return_value, transport=None
         )
         get_endpoint_url.assert_called_once_with(resource=resource, action=action, base_url=self.provider.base_url)
 
+    @mock.patch('edenred.provider.APIProvider.do_request')
+    @mock.patch('edenred.provider.APIProvider.get_endpoint_url')
+    @mock.patch('edenred.provider.APIProvider._get_headers')
+    def test_request_resource_static_endpoint(self, _get_headers, get_endpoint_url, do_request):
+        payload = mock.Mock(spec=dict)
+        do_request.return_value = {'Success': True}
+
+        self.provider.request_resource(resource='Payment', action='Authorize', payload=payload)
+
+        get_endpoint_url.assert_not_called()
+        do_request.assert_called_once_with(
+            url="{}/Payment/Authorize".format(self.provider.base_url), payload=payload,
+            headers=_get_headers.return_value, transport=None
+        )
+
     @mock.patch('edenred.provider.APIProvider.update_token')
     @mock.patch('edenred.provider.APIProvider.do_request')
     @mock.patch('edenred.provider.APIProvider.get_endpoint_url')
@@ -235,7 +272,7 @@ class TestRequestResource(ProviderBaseMixin, unittest.TestCase):
     @mock.patch('edenred.provider.APIProvider.validate_response')
     @mock.patch('edenred.provider.APIProvider.do_request')
     def test_request_resource_invalid_response(self, do_request, validate_response):
-        validate_response.side_effect = TransactionErrors({}, [])
+        validate_response.side_effect = TransactionErrors([])
         resource = mock.Mock(spec=str)
         action = mock.Mock(spec=str)
         payload = mock.Mock(spec=dict)
@@ -456,7 +493,7 @@ class TestRefund(ProviderBaseMixin, unittest.TestCase):
         }
 
         request_resource.return_value = {
-            "Pay": mock.Mock(spec=dict),
+            "Pay": {"PayIdentifier": payment_identifier, "Amount": amount},
             "Success": True,
             "ErrorList": []
         }
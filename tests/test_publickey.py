@@ -10,7 +10,9 @@ except ImportError:
 
 import Crypto.PublicKey.RSA
 import Crypto.Cipher.PKCS1_v1_5
+import Crypto.Random
 
+from edenred import ciphers
 from edenred.publickey import PublicKey
 
 PRIVATE_KEY = """\
@@ -40,11 +42,11 @@ class TestPublicKey(unittest.TestCase):
 
     def setUp(self):
         _, self.private_path = tempfile.mkstemp(suffix='.pem', prefix='private-')
-        with open(self.private_path, 'w') as private_key_file:
+        with open(self.private_path, 'wb') as private_key_file:
             private_key_file.write(self.private.exportKey('PEM'))
 
         _, self.public_path = tempfile.mkstemp(suffix='.pem', prefix='public-')
-        with open(self.public_path, 'w') as public_key_file:
+        with open(self.public_path, 'wb') as public_key_file:
             public_key_file.write(self.public.exportKey('PEM'))
 
     def tearDown(self):
@@ -58,22 +60,37 @@ class TestPublicKey(unittest.TestCase):
 
         decrypted = cipher.decrypt(encrypted, sentinel)
 
-        self.assertEqual(message, decrypted)
+        self.assertEqual(message.encode(), decrypted)
 
     def test_init(self):
         key = PublicKey(self.public_path)
 
-        self.assertEqual(self.public, key.rsa)
+        self.assertEqual((self.public.n, self.public.e), key.cipher.public_numbers)
+        self.assertEqual(ciphers.available_backends()[0], key.backend)
         self.assertFalse(key.testing)
 
     def test_init_testing(self):
         testing = mock.Mock(spec=bool)
 
-        key = PublicKey(self.public_path, testing)
+        key = PublicKey(self.public_path, testing, backend='pycrypto')
 
         self.assertEqual(self.public, key.rsa)
         self.assertEqual(testing, key.testing)
 
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            PublicKey(self.public_path, backend='rot13')
+
+    @mock.patch('edenred.ciphers.CryptographyCipher.available', return_value=False)
+    def test_missing_backend(self, available):
+        with self.assertRaises(ImportError):
+            PublicKey(self.public_path, backend='cryptography')
+
+    @mock.patch('edenred.ciphers.BACKENDS', ())
+    def test_no_backend(self):
+        with self.assertRaises(ImportError):
+            PublicKey(self.public_path)
+
     def test_encrypt_testing(self):
         key = PublicKey(self.public_path, testing=True)
 
@@ -95,3 +112,24 @@ class TestPublicKey(unittest.TestCase):
         key2 = PublicKey(self.public_path, testing)
 
         self.assertEqual(key1, key2)
+
+    def test_equal_across_backends(self):
+        backends = ciphers.available_backends()
+        key1 = PublicKey(self.public_path, backend=backends[0].name)
+        key2 = PublicKey(self.public_path, backend=backends[-1].name)
+
+        self.assertEqual(key1, key2)
+
+    def test_encrypt_all_backends(self):
+        message = "4111111111111111"
+        for backend in ciphers.BACKENDS:
+            with self.subTest(backend=backend.name):
+                if not backend.available():
+                    self.skipTest("{} is not installed".format(backend.name))
+                key = PublicKey(self.public_path, backend=backend.name)
+
+                encrypted = key.encrypt(message)
+
+                # 1024 bit key
+                self.assertEqual(128, len(base64.b64decode(encrypted)))
+                self.assert_pkcs1_b64_encrypted(message, encrypted)
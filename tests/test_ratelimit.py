@@ -0,0 +1,39 @@
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.ratelimit import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.sleep = mock.Mock(side_effect=lambda delay: self.now.__setitem__(0, self.now[0] + delay))
+        self.limiter = RateLimiter(4, clock=lambda: self.now[0], sleep=self.sleep)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+    def test_first_call_immediate(self):
+        self.limiter.acquire()
+
+        self.sleep.assert_not_called()
+
+    def test_spacing(self):
+        for _ in range(3):
+            self.limiter.acquire()
+
+        self.assertEqual([mock.call(0.25), mock.call(0.25)], self.sleep.call_args_list)
+        self.assertEqual(100.5, self.now[0])
+
+    def test_idle_does_not_bank(self):
+        self.limiter.acquire()
+        self.now[0] += 10
+
+        self.limiter.acquire()
+        self.limiter.acquire()
+
+        self.sleep.assert_called_once_with(0.25)
@@ -0,0 +1,44 @@
+import unittest
+
+from edenred.redaction import Redactor
+from edenred.responses import AuthorizeResult
+
+
+class TestRedactor(unittest.TestCase):
+    def setUp(self):
+        self.redactor = Redactor(key=b'key')
+
+    def test_redact(self):
+        payload = {
+            'PaymentMethod': {
+                'CardNumber': 'encrypted', 'CardCVV': 'encrypted', 'CardExpirationMonth': '12',
+                'CardExpirationYear': '2099', 'UserLogin': 'user', 'UserIdentifier': 1, 'CardToken': '',
+            },
+            'ErrorList': [{'Code': 'ER101', 'Message': 'Saldo'}],
+        }
+
+        redacted = self.redactor.redact(payload)
+
+        method = redacted['PaymentMethod']
+        self.assertEqual(Redactor.REDACTED, method['CardNumber'])
+        self.assertEqual(Redactor.REDACTED, method['CardExpirationYear'])
+        self.assertEqual('', method['CardToken'])
+        self.assertNotIn('user', method['UserLogin'])
+        self.assertEqual(payload['ErrorList'], redacted['ErrorList'])
+        self.assertEqual('encrypted', payload['PaymentMethod']['CardNumber'])
+
+    def test_pseudonyms_are_stable(self):
+        first = self.redactor.redact({'Pay': {'CardToken': 'card-1'}})
+        second = self.redactor.redact({'Capture': {'CardToken': 'card-1'}})
+        other = Redactor(key=b'other').redact({'Pay': {'CardToken': 'card-1'}})
+
+        self.assertEqual(first['Pay']['CardToken'], second['Capture']['CardToken'])
+        self.assertNotEqual(first['Pay']['CardToken'], other['Pay']['CardToken'])
+
+    def test_redact_records(self):
+        result = AuthorizeResult({'AuthorizeIdentifier': '1', 'Amount': 100, 'CardToken': 'card-1'})
+
+        redacted = self.redactor.redact({'Authorize': result})
+
+        self.assertEqual('1', redacted['Authorize']['AuthorizeIdentifier'])
+        self.assertEqual(self.redactor.pseudonym('card-1'), redacted['Authorize']['CardToken'])
@@ -0,0 +1,237 @@
+import decimal
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+import requests.exceptions
+
+from edenred.client import Edenred
+from edenred.exceptions import APIError, TransactionErrors
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+from edenred.refunds import BulkRefund, aggregate_refunds, main
+from edenred.stubserver import StubServer
+from edenred.transport import Urllib3Transport
+
+
+class TestAggregateRefunds(unittest.TestCase):
+    def test_aggregate(self):
+        records = [
+            {'card_token': 'card-1', 'payment_identifier': '10', 'amount': '1.50'},
+            {'card_token': 'card-1', 'payment_identifier': '10', 'amount': '2.25'},
+            {'card_token': 'card-2', 'payment_identifier': '20', 'amount': 3},
+        ]
+
+        self.assertEqual(
+            [(('card-1', '10'), decimal.Decimal('3.75')), (('card-2', '20'), decimal.Decimal('3'))],
+            list(aggregate_refunds(records))
+        )
+
+    def test_streams(self):
+        def records():
+            yield {'card_token': 'card-1', 'payment_identifier': '10', 'amount': '1.00'}
+            yield {'card_token': 'card-2', 'payment_identifier': '20', 'amount': '1.00'}
+            raise AssertionError("read past the first charge")
+
+        self.assertEqual((('card-1', '10'), decimal.Decimal('1.00')), next(aggregate_refunds(records())))
+
+
+class RefundTestMixin(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='edenred-refunds-')
+        self.output_path = os.path.join(self.directory, 'refunds.jsonl')
+        self.failures_path = os.path.join(self.directory, 'failures.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_results(self, path):
+        with io.open(path, 'r', encoding='utf-8') as results:
+            return [json.loads(line) for line in results]
+
+    def create_records(self, count):
+        return [
+            {'card_token': 'card-{}'.format(index), 'payment_identifier': str(index), 'amount': '1.00'}
+            for index in range(count)
+        ]
+
+
+class TestBulkRefund(RefundTestMixin, unittest.TestCase):
+    def setUp(self):
+        super(TestBulkRefund, self).setUp()
+        self.provider = mock.Mock(spec=APIProvider)
+        self.provider.refund.side_effect = lambda **kwargs: {'Amount': kwargs['amount']}
+        self.client = Edenred(self.provider)
+
+    def create_runner(self):
+        return BulkRefund(self.client, self.output_path, self.failures_path, rate=1000, threads=4)
+
+    def test_run(self):
+        refunded, failed, skipped = self.create_runner().run(self.create_records(5))
+
+        self.assertEqual((5, 0, 0), (refunded, failed, skipped))
+        results = {result['payment_identifier']: result for result in self.read_results(self.output_path)}
+        self.assertEqual('1.00', results['3']['amount'])
+        self.assertEqual(decimal.Decimal('1'), decimal.Decimal(results['3']['refunded']))
+        self.provider.refund.assert_any_call(
+            card_token='card-3', payment_identifier='3', amount=100, description='Refund'
+        )
+
+    def test_partial_refunds_aggregated(self):
+        records = self.create_records(1) * 3
+
+        refunded, failed, skipped = self.create_runner().run(records)
+
+        self.assertEqual((1, 0, 0), (refunded, failed, skipped))
+        self.provider.refund.assert_called_once_with(
+            card_token='card-0', payment_identifier='0', amount=300, description='Refund'
+        )
+
+    def test_rerun_skips_completed(self):
+        self.create_runner().run(self.create_records(3))
+        self.provider.refund.reset_mock()
+
+        refunded, failed, skipped = self.create_runner().run(self.create_records(5))
+
+        self.assertEqual((2, 0, 3), (refunded, failed, skipped))
+        self.assertEqual(2, self.provider.refund.call_count)
+
+    def test_rerun_with_new_partial_refund(self):
+        self.create_runner().run(self.create_records(2))
+        self.provider.refund.reset_mock()
+        records = self.create_records(2)
+        records.insert(1, dict(records[0], amount='0.50'))
+
+        refunded, failed, skipped = self.create_runner().run(records)
+
+        self.assertEqual((0, 1, 1), (refunded, failed, skipped))
+        self.provider.refund.assert_not_called()
+        failure, = self.read_results(self.failures_path)
+        self.assertEqual(('0', '1.50'), (failure['payment_identifier'], failure['amount']))
+        self.assertIn('1.00', failure['error'])
+
+    def test_unsorted_records(self):
+        records = self.create_records(3)
+        records.append(records[0])
+
+        refunded, failed, skipped = self.create_runner().run(records)
+
+        self.assertEqual((3, 1, 0), (refunded, failed, skipped))
+        self.assertEqual(3, self.provider.refund.call_count)
+        failure, = self.read_results(self.failures_path)
+        self.assertIn('not sorted', failure['error'])
+
+    def test_failures(self):
+        errors = {
+            '1': TransactionErrors([{'Code': 'ER201', 'Message': 'Monto mayor al pagado'}]),
+            '2': APIError(400, 'Bad Request'),
+            '3': RuntimeError('boom'),
+        }
+
+        def refund(**kwargs):
+            if kwargs['payment_identifier'] in errors:
+                raise errors[kwargs['payment_identifier']]
+            return {'Amount': kwargs['amount']}
+        self.provider.refund.side_effect = refund
+
+        refunded, failed, skipped = self.create_runner().run(self.create_records(4))
+
+        self.assertEqual((1, 3, 0), (refunded, failed, skipped))
+        failures = {failure['payment_identifier']: failure for failure in self.read_results(self.failures_path)}
+        self.assertEqual(['ER201'], failures['1']['codes'])
+        self.assertEqual(400, failures['2']['status_code'])
+        self.assertIn('boom', failures['3']['error'])
+
+    def test_unknown_outcome(self):
+        errors = {
+            '1': APIError(502, 'Bad Gateway'),
+            '2': requests.exceptions.ConnectionError('reset'),
+        }
+
+        def refund(**kwargs):
+            if kwargs['payment_identifier'] in errors:
+                raise errors.pop(kwargs['payment_identifier'])
+            return {'Amount': kwargs['amount']}
+        self.provider.refund.side_effect = refund
+        runner = self.create_runner()
+
+        self.assertEqual((1, 0, 0), runner.run(self.create_records(3)))
+        self.assertEqual(2, runner.unknown)
+        self.assertEqual([], self.read_results(self.failures_path))
+        states = {result['payment_identifier']: result['state'] for result in self.read_results(self.output_path)}
+        self.assertEqual({'0': 'refunded', '1': 'unknown', '2': 'unknown'}, states)
+
+        # the refunds may have gone through, so a re-run does not send them again
+        self.provider.refund.reset_mock()
+        runner = self.create_runner()
+        self.assertEqual((0, 0, 1), runner.run(self.create_records(3)))
+        self.assertEqual(2, runner.unknown)
+        self.provider.refund.assert_not_called()
+
+    def test_reconciled_unknown_outcome(self):
+        self.provider.refund.side_effect = APIError(504, 'Gateway Timeout')
+        self.create_runner().run(self.create_records(1))
+        # found not applied at Edenred: the line is removed
+        os.remove(self.output_path)
+        self.provider.refund.side_effect = lambda **kwargs: {'Amount': kwargs['amount']}
+
+        self.assertEqual((1, 0, 0), self.create_runner().run(self.create_records(1)))
+
+    @mock.patch('edenred.refunds.RateLimiter')
+    def test_rate_limited(self, RateLimiter):
+        self.create_runner().run(self.create_records(4))
+
+        RateLimiter.assert_called_once_with(1000)
+        self.assertEqual(4, RateLimiter.return_value.acquire.call_count)
+
+
+class TestBulkRefundStub(RefundTestMixin, unittest.TestCase):
+    def test_run_against_stub(self):
+        with StubServer() as stub:
+            transport = Urllib3Transport()
+            provider = APIProvider(
+                client_id='id', client_secret='secret', base_url=stub.url, public_key=mock.Mock(spec=PublicKey),
+                transport=transport
+            )
+            refunded, failed, skipped = BulkRefund(
+                Edenred(provider), self.output_path, self.failures_path, rate=1000
+            ).run(self.create_records(10))
+            transport.close()
+
+        self.assertEqual((10, 0, 0), (refunded, failed, skipped))
+
+
+class TestMain(RefundTestMixin, unittest.TestCase):
+
+    @mock.patch('edenred.refunds.BulkRefund')
+    @mock.patch('edenred.refunds.Edenred')
+    def test_main(self, Edenred, BulkRefund):
+        BulkRefund.return_value.run.return_value = (3, 1, 0)
+        BulkRefund.return_value.unknown = 0
+
+        result = main([os.path.join(self.directory, 'refunds.csv'), '--output', self.output_path,
+                       '--failures', self.failures_path, '--rate', '5'])
+
+        self.assertEqual(1, result)
+        BulkRefund.assert_called_once_with(
+            Edenred.create_client_from_env.return_value, output_path=self.output_path,
+            failures_path=self.failures_path, rate=5.0, threads=8, description='Refund'
+        )
+
+    @mock.patch('edenred.refunds.BulkRefund')
+    @mock.patch('edenred.refunds.Edenred')
+    def test_main_unknown(self, Edenred, BulkRefund):
+        BulkRefund.return_value.run.return_value = (3, 0, 0)
+        BulkRefund.return_value.unknown = 1
+
+        result = main([os.path.join(self.directory, 'refunds.csv'), '--output', self.output_path,
+                       '--failures', self.failures_path])
+
+        self.assertEqual(1, result)
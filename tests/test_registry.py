@@ -0,0 +1,101 @@
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.client import Edenred
+from edenred.publickey import PublicKey
+from edenred.registry import EdenredRegistry
+from edenred.transport import RequestsTransport, Transport
+
+
+class TestEdenredRegistry(unittest.TestCase):
+    def setUp(self):
+        self.public_key = mock.Mock(spec=PublicKey)
+        self.base_url = mock.Mock(spec=str)
+        self.transport = mock.Mock(spec=Transport)
+        self.registry = EdenredRegistry(
+            public_key=self.public_key, base_url=self.base_url, max_tenants=2, transport=self.transport
+        )
+
+    def test_init_invalid_max_tenants(self):
+        with self.assertRaises(ValueError):
+            EdenredRegistry(public_key=self.public_key, base_url=self.base_url, max_tenants=0)
+
+    def test_init_default_transport(self):
+        registry = EdenredRegistry(public_key=self.public_key, base_url=self.base_url)
+
+        self.assertIsInstance(registry.transport, RequestsTransport)
+        self.assertIsNotNone(registry.transport.session)
+
+    @mock.patch('edenred.registry.PublicKey')
+    def test_create_registry(self, PublicKey):
+        public_key_path = mock.Mock(spec=str)
+
+        registry = EdenredRegistry.create_registry(public_key_path, self.base_url, testing=True, max_tenants=5)
+
+        PublicKey.assert_called_once_with(public_key_path, testing=True)
+        self.assertEqual(PublicKey.return_value, registry.public_key)
+        self.assertEqual(5, registry.max_tenants)
+
+    def test_get_client(self):
+        client = self.registry.get_client('tenant', 'secret')
+
+        self.assertIsInstance(client, Edenred)
+        self.assertEqual('tenant', client.api_provider.client_id)
+        self.assertEqual('secret', client.api_provider.client_secret)
+        self.assertEqual(self.base_url, client.api_provider.base_url)
+        self.assertIsNone(client.api_provider.access_token)
+        self.assertIn('tenant', self.registry)
+
+    def test_get_client_shares_key_and_transport(self):
+        client1 = self.registry.get_client('tenant1', 'secret')
+        client2 = self.registry.get_client('tenant2', 'secret')
+
+        self.assertIs(self.public_key, client1.api_provider.public_key)
+        self.assertIs(self.public_key, client2.api_provider.public_key)
+        self.assertIs(self.transport, client1.api_provider.transport)
+        self.assertIs(self.transport, client2.api_provider.transport)
+        self.assertIsNot(client1.api_provider, client2.api_provider)
+
+    def test_get_client_cached(self):
+        client = self.registry.get_client('tenant', 'secret')
+
+        self.assertIs(client, self.registry.get_client('tenant', 'secret'))
+
+    def test_get_client_secret_changed(self):
+        client = self.registry.get_client('tenant', 'secret')
+
+        renewed = self.registry.get_client('tenant', 'other-secret')
+
+        self.assertIsNot(client, renewed)
+        self.assertEqual('other-secret', renewed.api_provider.client_secret)
+        self.assertEqual(1, len(self.registry))
+
+    def test_lru_eviction(self):
+        self.registry.get_client('tenant1', 'secret')
+        self.registry.get_client('tenant2', 'secret')
+        self.registry.get_client('tenant1', 'secret')
+
+        self.registry.get_client('tenant3', 'secret')
+
+        self.assertEqual(2, len(self.registry))
+        self.assertIn('tenant1', self.registry)
+        self.assertNotIn('tenant2', self.registry)
+        self.assertIn('tenant3', self.registry)
+
+    def test_evict(self):
+        self.registry.get_client('tenant', 'secret')
+
+        self.assertTrue(self.registry.evict('tenant'))
+        self.assertFalse(self.registry.evict('tenant'))
+        self.assertNotIn('tenant', self.registry)
+
+    def test_close(self):
+        self.registry.get_client('tenant', 'secret')
+
+        self.registry.close()
+
+        self.assertEqual(0, len(self.registry))
+        self.transport.close.assert_called_once_with()
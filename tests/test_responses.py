@@ -0,0 +1,72 @@
+import pickle
+import unittest
+
+from edenred import protocol
+from edenred.exceptions import InvalidResponse
+from edenred.responses import AuthorizeResult, PaymentMethodResult, RefundResult
+
+
+class TestRecord(unittest.TestCase):
+    def test_fields(self):
+        result = AuthorizeResult({'AuthorizeIdentifier': '1', 'Amount': 100})
+
+        self.assertEqual('1', result.authorize_identifier)
+        self.assertEqual(100, result.amount)
+        self.assertEqual('1', result['AuthorizeIdentifier'])
+        self.assertIsNone(result._extra)
+
+    def test_extra_fields(self):
+        data = {'AuthorizeIdentifier': '1', 'Amount': 100, 'CardToken': 'card', 'Description': 'description'}
+        result = AuthorizeResult(data)
+
+        self.assertEqual('card', result['CardToken'])
+        self.assertEqual(data, result)
+        self.assertEqual(data, result.to_dict())
+        self.assertEqual(4, len(result))
+
+    def test_missing_fields(self):
+        result = RefundResult({'Amount': 100, 'Description': 'description'})
+
+        self.assertIsNone(result.pay_identifier)
+        self.assertNotIn('PayIdentifier', result)
+        self.assertEqual({'Amount': 100, 'Description': 'description'}, result)
+        with self.assertRaises(KeyError):
+            result['PayIdentifier']
+
+    def test_get(self):
+        result = PaymentMethodResult({'CardToken': 'card'})
+
+        self.assertEqual('card', result.get('CardToken'))
+        self.assertIsNone(result.get('Other'))
+
+    def test_slotted(self):
+        result = PaymentMethodResult({'CardToken': 'card'})
+
+        with self.assertRaises(AttributeError):
+            result.other = 1
+
+    def test_not_an_object(self):
+        with self.assertRaises(InvalidResponse):
+            AuthorizeResult(['AuthorizeIdentifier'])
+
+    def test_pickle(self):
+        result = AuthorizeResult({'AuthorizeIdentifier': '1', 'Amount': 100, 'CardToken': 'card'})
+
+        copy = pickle.loads(pickle.dumps(result))
+
+        self.assertIsInstance(copy, AuthorizeResult)
+        self.assertEqual(result, copy)
+
+
+class TestProtocolRecords(unittest.TestCase):
+    def test_authorize(self):
+        body = protocol.encode({'Success': True, 'Authorize': {'AuthorizeIdentifier': '7', 'Amount': 100}})
+
+        result = protocol.authorize('card', 100, 'description').parse(body)
+
+        self.assertIsInstance(result, AuthorizeResult)
+        self.assertEqual('7', result.authorize_identifier)
+
+    def test_result_not_an_object(self):
+        with self.assertRaises(InvalidResponse):
+            protocol.refund('card', '1', 100, 'description').parse(b'{"Success": true, "Pay": null}')
@@ -0,0 +1,263 @@
+import decimal
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+import requests
+
+from edenred import scheduler
+from edenred.client import Edenred
+from edenred.exceptions import APIError, InvalidResponse
+from edenred.fake import FakeAPIProvider
+from edenred.scheduler import CaptureScheduler
+
+
+class SchedulerMixin(object):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'captures.sqlite')
+        self.now = [1000.0]
+        self.provider = FakeAPIProvider(balance=100000)
+        self.client = Edenred(self.provider)
+        self.card = self.client.register_card('4111111111111111', '123', '12', '2099', 'user', '1')
+        self.scheduler = self.create_scheduler()
+        self.addCleanup(lambda: self.scheduler.close())
+
+    def create_scheduler(self, **kwargs):
+        kwargs.setdefault('retry_delay', 10)
+        return CaptureScheduler(self.client, self.path, clock=lambda: self.now[0], **kwargs)
+
+    def authorize(self, amount='10.00'):
+        return self.card.authorize(amount, 'order')
+
+
+class TestCaptureScheduler(SchedulerMixin, unittest.TestCase):
+    def test_captures_when_due(self):
+        first = self.authorize()
+        second = self.authorize()
+        self.scheduler.schedule(first, due_at=1010)
+        self.scheduler.schedule(second, due_at=1020, amount='7.50')
+
+        self.now[0] = 1015
+        self.assertEqual({scheduler.CAPTURED: 1}, self.scheduler.run_pending())
+        self.assertEqual(scheduler.CAPTURED, self.scheduler.get(first.charge_id).state)
+        self.assertEqual(scheduler.PENDING, self.scheduler.get(second.charge_id).state)
+
+        self.now[0] = 1020
+        self.scheduler.run_pending()
+
+        self.assertEqual({scheduler.CAPTURED: 2}, self.scheduler.counts())
+        self.assertEqual(100000 - 1000 - 750, self.provider.balance(self.card.card_token))
+
+    def test_due_order(self):
+        authorizations = [self.authorize() for _ in range(3)]
+        for authorization, due_at in zip(authorizations, (1003, 1001, 1002)):
+            self.scheduler.schedule(authorization, due_at=due_at)
+        self.now[0] = 1003
+
+        due = self.scheduler.due()
+
+        self.assertEqual([1001, 1002, 1003], [capture.due_at for capture in due])
+        self.assertEqual(1001, self.scheduler.next_due_at())
+        self.assertEqual(decimal.Decimal('10.00'), decimal.Decimal(due[0].amount))
+        self.assertEqual(1000, due[0].authorized_amount)
+
+    def test_amount_required(self):
+        authorization = self.card.retrieve_authorization('1')
+
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule(authorization)
+
+    def test_reschedule_and_cancel(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization, due_at=2000)
+        self.scheduler.schedule(authorization, due_at=1000, amount='5.00')
+
+        self.assertEqual('5.00', self.scheduler.get(authorization.charge_id).amount)
+        self.assertTrue(self.scheduler.cancel(authorization.charge_id))
+        self.assertFalse(self.scheduler.cancel(authorization.charge_id))
+        self.assertEqual({}, self.scheduler.run_pending())
+
+    def test_persists_across_restarts(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization, due_at=1100)
+        self.scheduler.close()
+
+        self.scheduler = self.create_scheduler()
+        self.now[0] = 1100
+        self.scheduler.run_pending()
+
+        self.assertEqual(scheduler.CAPTURED, self.scheduler.get(authorization.charge_id).state)
+
+    def test_interrupted_capture_is_retried(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        self.scheduler.close()
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("UPDATE captures SET state = 'capturing'")
+        connection.close()
+
+        self.scheduler = self.create_scheduler()
+
+        self.assertEqual(scheduler.PENDING, self.scheduler.get(authorization.charge_id).state)
+
+    def test_rejection_after_interrupted_capture(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        self.scheduler.close()
+        # the process died after Edenred captured but before the result was stored
+        authorization.capture('10.00', 'order')
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("UPDATE captures SET state = 'capturing', attempts = 1")
+        connection.close()
+
+        self.scheduler = self.create_scheduler()
+
+        self.assertEqual({scheduler.UNKNOWN: 1}, self.scheduler.run_pending())
+        self.assertEqual(100000 - 1000, self.provider.balance(self.card.card_token))
+
+    def test_retried_capture_expires_as_unknown(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization, expires_at=1005)
+        self.provider.fail_next('capture', APIError(503, 'Service Unavailable'))
+        self.scheduler.run_pending()
+
+        self.now[0] = 1010
+        with mock.patch('edenred.scheduler.logger') as logger:
+            self.scheduler.run_pending()
+
+        self.assertEqual(scheduler.UNKNOWN, self.scheduler.get(authorization.charge_id).state)
+        logger.warning.assert_called_once_with(
+            "%d authorizations expired after a capture attempt of unknown outcome", 1
+        )
+
+    def test_nothing_expired(self):
+        with mock.patch('edenred.scheduler.logger') as logger:
+            self.scheduler.run_pending()
+
+        logger.warning.assert_not_called()
+
+    def test_transient_failure_backoff(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        self.provider.fail_next('capture', APIError(503, 'Service Unavailable'), count=2)
+
+        self.assertEqual({scheduler.PENDING: 1}, self.scheduler.run_pending())
+        capture = self.scheduler.get(authorization.charge_id)
+        self.assertEqual((1, 1010), (capture.attempts, capture.due_at))
+        self.assertIn('503', capture.error)
+
+        self.now[0] = 1010
+        self.scheduler.run_pending()
+        self.assertEqual(1030, self.scheduler.get(authorization.charge_id).due_at)
+
+        self.now[0] = 1030
+        self.scheduler.run_pending()
+        self.assertEqual(scheduler.CAPTURED, self.scheduler.get(authorization.charge_id).state)
+
+    def test_max_attempts(self):
+        self.scheduler.close()
+        self.scheduler = self.create_scheduler(max_attempts=2, retry_delay=0)
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        self.provider.fail_next('capture', APIError(503, 'Service Unavailable'), count=2)
+
+        self.scheduler.run_pending()
+
+        capture = self.scheduler.get(authorization.charge_id)
+        self.assertEqual((scheduler.UNKNOWN, 2), (capture.state, capture.attempts))
+
+    def test_connection_error_is_retried(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        self.provider.fail_next('capture', requests.exceptions.ConnectionError('reset'))
+
+        self.assertEqual({scheduler.PENDING: 1}, self.scheduler.run_pending())
+
+    def test_final_errors(self):
+        for error in (APIError(400, 'Bad Request'), InvalidResponse(), TypeError('bug')):
+            authorization = self.authorize()
+            self.scheduler.schedule(authorization)
+            self.provider.fail_next('capture', error)
+
+            self.assertEqual({scheduler.FAILED: 1}, self.scheduler.run_pending())
+            self.assertEqual(1, self.scheduler.get(authorization.charge_id).attempts)
+
+    def test_rejection_is_final(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization, amount='10.01')
+
+        self.assertEqual({scheduler.FAILED: 1}, self.scheduler.run_pending())
+        self.assertIn('LOCAL05', self.scheduler.get(authorization.charge_id).error)
+
+    def test_expiring_and_expired(self):
+        self.scheduler.close()
+        self.scheduler = self.create_scheduler(expires_after=3600)
+        soon = self.authorize()
+        later = self.authorize()
+        self.scheduler.schedule(soon, due_at=5000)
+        self.scheduler.schedule(later, due_at=5000, expires_at=9000)
+
+        self.now[0] = 4000
+        self.assertEqual([soon.charge_id], [capture.charge_id for capture in self.scheduler.expiring(within=1000)])
+
+        self.now[0] = 5000
+        with mock.patch('edenred.scheduler.logger') as logger:
+            self.scheduler.run_pending()
+
+        self.assertEqual(scheduler.EXPIRED, self.scheduler.get(soon.charge_id).state)
+        logger.warning.assert_called_once_with("%d authorizations expired before capture", 1)
+        self.assertEqual(scheduler.CAPTURED, self.scheduler.get(later.charge_id).state)
+
+    def test_concurrent_batches(self):
+        self.scheduler.close()
+        self.scheduler = self.create_scheduler(batch_size=4, max_workers=4)
+        for _ in range(8):
+            self.scheduler.schedule(self.authorize())
+        barrier = threading.Barrier(4, timeout=5)
+        capture = self.provider.capture
+
+        def concurrent_capture(*args, **kwargs):
+            # fails with BrokenBarrierError unless four captures are in flight together
+            barrier.wait()
+            return capture(*args, **kwargs)
+
+        with mock.patch.object(self.provider, 'capture', side_effect=concurrent_capture):
+            self.assertEqual({scheduler.CAPTURED: 8}, self.scheduler.run_pending())
+
+    def test_schedule_while_running_in_another_thread(self):
+        stop_event = threading.Event()
+        worker = threading.Thread(target=self.scheduler.run, args=(stop_event,), kwargs={'poll_interval': 0.01})
+        worker.start()
+        try:
+            for _ in range(5):
+                self.scheduler.schedule(self.authorize())
+            deadline = time.time() + 5
+            while self.scheduler.counts().get(scheduler.CAPTURED) != 5 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            stop_event.set()
+            worker.join()
+
+        self.assertEqual({scheduler.CAPTURED: 5}, self.scheduler.counts())
+
+    def test_run_until_stopped(self):
+        authorization = self.authorize()
+        self.scheduler.schedule(authorization)
+        stop_event = threading.Event()
+
+        with mock.patch.object(self.scheduler, 'run_pending', side_effect=lambda: stop_event.set()) as run_pending:
+            self.scheduler.run(stop_event, poll_interval=0.01)
+
+        run_pending.assert_called_once_with()
@@ -0,0 +1,21 @@
+import unittest
+
+from edenred.stats import percentile
+
+
+class TestPercentile(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 1001))
+
+        self.assertEqual(500, percentile(values, 0.5))
+        self.assertEqual(990, percentile(values, 0.99))
+        self.assertEqual(999, percentile(values, 0.999))
+        self.assertEqual(1000, percentile(values, 1))
+        self.assertEqual(1, percentile(values, 0))
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_percentile_nearest_rank(self):
+        self.assertEqual(7, percentile(list(range(1, 101)), 0.07))
+        self.assertEqual(2, percentile([1, 2, 3, 4], 0.5))
+        self.assertEqual(3, percentile([1, 2, 3], 0.95))
+        self.assertEqual(5, percentile([5], 0.5))
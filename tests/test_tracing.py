@@ -0,0 +1,159 @@
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+from edenred.client import Edenred
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+from edenred.stubserver import StubServer
+from edenred.tracing import InMemoryCollector, Tracer, current_span, phase, traced
+from edenred.transport import RequestsTransport, Urllib3Transport
+
+
+class TestPhase(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+
+    def test_phase_without_span(self):
+        with phase('encrypt'):
+            pass
+
+        self.assertIsNone(current_span())
+
+    def test_span_collected(self):
+        with self.tracer.span('authorize') as span:
+            self.assertIs(span, current_span())
+
+        self.assertIsNone(current_span())
+        self.assertEqual([span], self.tracer.collector.spans)
+        self.assertEqual('authorize', span.operation)
+        self.assertGreaterEqual(span.duration, 0)
+
+    def test_span_error(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span('authorize'):
+                raise ValueError()
+
+        span = self.tracer.collector.spans[0]
+        self.assertIsInstance(span.error, ValueError)
+
+    def test_nested_span_reuses_parent(self):
+        with self.tracer.span('register_card') as outer:
+            with self.tracer.span('create_payment_method') as inner:
+                self.assertIs(outer, inner)
+
+        self.assertEqual(1, len(self.tracer.collector.spans))
+
+    def test_phases_accumulate(self):
+        with self.tracer.span('authorize') as span:
+            for _ in range(2):
+                with phase('serialize'):
+                    time.sleep(0.001)
+
+        self.assertGreaterEqual(span.phases['serialize'], 0.002)
+        self.assertGreaterEqual(span.unaccounted, 0)
+
+    def test_phases_exclusive(self):
+        with self.tracer.span('authorize') as span:
+            with phase('ttfb'):
+                with phase('connect'):
+                    time.sleep(0.02)
+
+        self.assertGreaterEqual(span.phases['connect'], 0.02)
+        self.assertLess(span.phases['ttfb'], 0.02)
+
+    def test_opaque_phase(self):
+        with self.tracer.span('authorize') as span:
+            with phase('token_renewal', opaque=True):
+                with phase('ttfb'):
+                    time.sleep(0.01)
+
+        self.assertEqual(['token_renewal'], list(span.phases))
+        self.assertGreaterEqual(span.phases['token_renewal'], 0.01)
+
+    def test_collector_clear(self):
+        collector = InMemoryCollector()
+        collector.collect(mock.Mock())
+
+        collector.clear()
+
+        self.assertEqual([], collector.spans)
+
+
+class TestTraced(unittest.TestCase):
+    class Operations(object):
+        def __init__(self, tracer):
+            self.tracer = tracer
+
+        @traced
+        def authorize(self):
+            return current_span()
+
+    def test_disabled(self):
+        self.assertIsNone(self.Operations(None).authorize())
+
+    def test_enabled(self):
+        tracer = Tracer()
+
+        span = self.Operations(tracer).authorize()
+
+        self.assertEqual('authorize', span.operation)
+        self.assertEqual([span], tracer.collector.spans)
+
+
+class TracingStubMixin(object):
+    def create_transport(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.stub = StubServer().start()
+        self.transport = self.create_transport()
+        public_key = mock.Mock(spec=PublicKey)
+        public_key.encrypt.side_effect = lambda data: data
+        self.tracer = Tracer()
+        self.provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url, public_key=public_key,
+            transport=self.transport, tracer=self.tracer
+        )
+
+    def tearDown(self):
+        self.transport.close()
+        self.stub.stop()
+
+    def test_register_card_phases(self):
+        self.provider.access_token = APIProvider.create_access_token(
+            client_id='id', client_secret='secret', public_key=None, base_url=self.stub.url
+        )
+
+        Edenred(self.provider).register_card('4111111111111111', '123', '12', '2030', 'user', 1)
+
+        span, = self.tracer.collector.spans
+        self.assertEqual('create_payment_method', span.operation)
+        self.assertEqual(
+            {'encrypt', 'serialize', 'pool_wait', 'connect', 'ttfb', 'read', 'decode'},
+            set(span.phases)
+        )
+        self.assertLessEqual(sum(span.phases.values()), span.duration)
+
+    def test_reused_connection(self):
+        card = Edenred(self.provider).retrieve_card('card')
+        card.authorize('1.00', 'first')
+        card.authorize('1.00', 'second')
+
+        first, second = self.tracer.collector.spans
+        self.assertIn('token_renewal', first.phases)
+        self.assertNotIn('token_renewal', second.phases)
+        self.assertNotIn('connect', second.phases)
+
+
+class TestRequestsTracing(TracingStubMixin, unittest.TestCase):
+    def create_transport(self):
+        return RequestsTransport.create_pooled()
+
+
+class TestUrllib3Tracing(TracingStubMixin, unittest.TestCase):
+    def create_transport(self):
+        return Urllib3Transport()
@@ -0,0 +1,228 @@
+import socket
+import time
+import unittest
+try:
+    from unitttest import mock
+except ImportError:
+    import mock
+
+import requests.exceptions
+
+from edenred.client import Edenred
+from edenred.exceptions import APIError, Unauthorized
+from edenred.provider import APIProvider
+from edenred.publickey import PublicKey
+from edenred.stubserver import StubServer
+from edenred.transport import HTTP2Transport, RequestsTransport, Transport, Urllib3Transport, is_connection_error
+
+from concurrent import futures
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+STRESS_REQUESTS = 2000
+
+
+class TestTransport(unittest.TestCase):
+    def test_post_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            Transport().post(url='url', headers={}, payload={})
+
+    def test_encode_decode(self):
+        payload = {'Pay': {'Amount': 100}}
+
+        self.assertEqual(payload, Transport.decode(Transport.encode(payload)))
+
+
+class TestRequestsTransport(unittest.TestCase):
+
+    @mock.patch('edenred.transport.Transport.decode')
+    @mock.patch('edenred.transport.Transport.encode')
+    @mock.patch('edenred.transport.requests')
+    def test_post(self, requests, encode, decode):
+        payload = mock.Mock(spec=dict)
+        headers = mock.Mock(spec=dict)
+        url = mock.Mock(spec=str)
+        response = requests.post.return_value
+
+        result = RequestsTransport().post(url=url, headers=headers, payload=payload)
+
+        self.assertEqual(decode.return_value, result)
+        requests.post.assert_called_once_with(
+            url, data=encode.return_value, headers=headers, stream=True, timeout=None
+        )
+        response.raise_for_status.assert_called_once_with()
+        encode.assert_called_once_with(payload)
+        decode.assert_called_once_with(response.content)
+
+    @mock.patch('edenred.transport.requests.post')
+    def test_post_http_error(self, requests_post):
+        payload = {}
+        headers = mock.Mock(spec=dict)
+        url = mock.Mock(spec=str)
+        response = requests_post.return_value
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+
+        with self.assertRaises(APIError):
+            RequestsTransport().post(url=url, headers=headers, payload=payload)
+
+    @mock.patch('edenred.transport.Transport.decode')
+    def test_post_session(self, decode):
+        payload = {'Pay': {}}
+        headers = mock.Mock(spec=dict)
+        url = mock.Mock(spec=str)
+        session = mock.Mock(spec=requests.Session)
+
+        result = RequestsTransport(session).post(url=url, headers=headers, payload=payload)
+
+        self.assertEqual(decode.return_value, result)
+        session.post.assert_called_once_with(url, data=b'{"Pay": {}}', headers=headers, stream=True, timeout=None)
+
+    def test_create_pooled(self):
+        transport = RequestsTransport.create_pooled(pool_size=3)
+
+        self.assertIsInstance(transport.session, requests.Session)
+        self.assertEqual(3, transport.session.get_adapter('https://example.com')._pool_maxsize)
+
+
+class TransportStubMixin(object):
+    def create_transport(self, timeout=None):
+        raise NotImplementedError
+
+    def create_stub(self):
+        return StubServer()
+
+    def setUp(self):
+        self.stub = self.create_stub().start()
+        self.transport = self.create_transport()
+
+    def tearDown(self):
+        self.transport.close()
+        self.stub.stop()
+
+    def test_login(self):
+        token = APIProvider.create_access_token(
+            client_id='id', client_secret='secret', public_key=None, base_url=self.stub.url,
+            transport=self.transport
+        )
+
+        self.assertTrue(token.startswith('token-'))
+
+    def test_unauthorized(self):
+        with self.assertRaises(Unauthorized):
+            self.transport.post(
+                url=self.stub.url + '/Payment/Pay', headers={'authorization': 'invalid'}, payload={}
+            )
+
+    def test_timeout(self):
+        self.stub.latency = 0.5
+        self.transport.close()
+        self.transport = self.create_transport(timeout=0.05)
+
+        with self.assertRaises(Exception) as context:
+            self.transport.post(url=self.stub.url + '/Login', headers={}, payload={})
+
+        self.assertTrue(is_connection_error(context.exception))
+
+    def test_connection_error(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()
+
+        with self.assertRaises(Exception) as context:
+            self.transport.post(url='http://127.0.0.1:{}/Payment/Pay'.format(port), headers={}, payload={})
+
+        self.assertTrue(is_connection_error(context.exception))
+        self.assertFalse(is_connection_error(APIError(500, 'Internal Server Error')))
+        # a failed send leaves the transport usable
+        self.assertTrue(self.transport.post(url=self.stub.url + '/Login', headers={}, payload={})['Success'])
+
+    def test_client_flow(self):
+        public_key = mock.Mock(spec=PublicKey)
+        public_key.encrypt.side_effect = lambda data: data
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url, public_key=public_key,
+            transport=self.transport
+        )
+        client = Edenred(provider)
+
+        card = client.register_card('4111111111111111', '123', '12', '2030', 'user', 1)
+        authorization = card.authorize('10.00', 'order')
+        charge = authorization.capture('10.00', 'order')
+        refund = charge.refund('5.00', 'refund')
+
+        self.assertTrue(card.card_token.startswith('card-'))
+        self.assertEqual(authorization.charge_id, charge.charge_id)
+        self.assertEqual(refund.amount, 5)
+        self.assertEqual(1, self.stub.logins)
+
+
+class TestRequestsTransportStub(TransportStubMixin, unittest.TestCase):
+    def create_transport(self, timeout=None):
+        return RequestsTransport.create_pooled(timeout=timeout)
+
+
+class TestUrllib3TransportStub(TransportStubMixin, unittest.TestCase):
+    def create_transport(self, timeout=None):
+        return Urllib3Transport(timeout=timeout)
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestHTTP2TransportStub(TransportStubMixin, unittest.TestCase):
+    def create_transport(self, timeout=5.0):
+        return HTTP2Transport(timeout=timeout)
+
+
+@unittest.skipIf(httpx is None or h2 is None, "httpx[http2] is not installed")
+class TestHTTP2PriorKnowledgeStub(TransportStubMixin, unittest.TestCase):
+    def create_stub(self):
+        return StubServer(http2=True)
+
+    def create_transport(self, timeout=5.0):
+        return HTTP2Transport(prior_knowledge=True, timeout=timeout)
+
+    def test_multiplexed(self):
+        self.stub.latency = 0.2
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url, public_key=None,
+            access_token=APIProvider.create_access_token(
+                client_id='id', client_secret='secret', public_key=None, base_url=self.stub.url,
+                transport=self.transport
+            ),
+            transport=self.transport
+        )
+        card = Edenred(provider).retrieve_card('card-1')
+
+        started = time.time()
+        with futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda index: card.authorize('1.00', 'order'), range(8)))
+        elapsed = time.time() - started
+
+        self.assertEqual(8, len({authorization.charge_id for authorization in results}))
+        # eight requests answered concurrently over the one connection
+        self.assertEqual(1, self.stub.connections)
+        self.assertLess(elapsed, 8 * 0.2 / 2)
+
+    def test_threads_share_connection(self):
+        token = APIProvider.create_access_token(
+            client_id='id', client_secret='secret', public_key=None, base_url=self.stub.url, transport=self.transport
+        )
+        provider = APIProvider(
+            client_id='id', client_secret='secret', base_url=self.stub.url, public_key=None, access_token=token,
+            transport=self.transport
+        )
+        card = Edenred(provider).retrieve_card('card-1')
+
+        with futures.ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(lambda index: card.capture('1.00', 'order'), range(STRESS_REQUESTS)))
+
+        self.assertEqual(STRESS_REQUESTS, len({charge.charge_id for charge in results}))
+        self.assertEqual(1, self.stub.connections)
@@ -0,0 +1,64 @@
+# encoding=UTF-8
+import datetime
+import unittest
+
+from edenred import validation
+from edenred.exceptions import TransactionErrors
+from edenred.validation import ValidationErrors
+
+TODAY = datetime.date(2024, 6, 15)
+
+
+class TestCardNumber(unittest.TestCase):
+    def test_valid(self):
+        for number in ('4111111111111111', '5555555555554444', '378282246310005', '6011111111111117'):
+            self.assertTrue(validation.is_valid_card_number(number), number)
+
+    def test_invalid(self):
+        for number in ('4111111111111112', '41111111111', '4111-1111-1111-1111', '', '41111111111111111111',
+                       '41111111111111\u06611', '411111111111111\uff11'):
+            self.assertFalse(validation.is_valid_card_number(number), number)
+
+
+class TestCheckCard(unittest.TestCase):
+    def assert_errors(self, codes, card_number, month, year):
+        self.assertEqual(codes, validation.card_errors(card_number, month, year, today=TODAY))
+
+    def test_valid(self):
+        self.assert_errors([], '4111111111111111', '06', '2024')
+        self.assert_errors([], '4111111111111111', '1', '30')
+
+    def test_expired(self):
+        self.assert_errors([validation.CARD_EXPIRED], '4111111111111111', '05', '2024')
+        self.assert_errors([validation.CARD_EXPIRED], '4111111111111111', '12', '23')
+
+    def test_invalid_expiration(self):
+        for month, year in (('13', '2030'), ('0', '2030'), ('ab', '2030'), ('12', '203'), ('12', ''),
+                            ('\u0661\u0662', '2030')):
+            self.assert_errors([validation.INVALID_EXPIRATION], '4111111111111111', month, year)
+
+    def test_all_errors(self):
+        with self.assertRaises(ValidationErrors) as context:
+            validation.check_card('1234', '12', '2001', today=TODAY)
+
+        self.assertEqual((validation.INVALID_CARD_NUMBER, validation.CARD_EXPIRED), context.exception.codes)
+        self.assertEqual("Número de tarjeta inválido", context.exception.message)
+
+
+class TestCheckAmount(unittest.TestCase):
+    def test_amount(self):
+        validation.check_amount(1)
+        with self.assertRaises(ValidationErrors):
+            validation.check_amount(0)
+
+    def test_capture(self):
+        validation.check_capture(100, 100)
+        validation.check_capture(100, None)
+        with self.assertRaises(ValidationErrors) as context:
+            validation.check_capture(101, 100)
+        self.assertEqual((validation.CAPTURE_EXCEEDS_AUTHORIZED,), context.exception.codes)
+
+    def test_registered_codes(self):
+        error = TransactionErrors.create([{'Code': validation.INVALID_AMOUNT, 'Message': 'Monto'}])
+
+        self.assertIsInstance(error, ValidationErrors)